@@ -0,0 +1,214 @@
+"""API uç noktaları için gecikme ve verim ölçümü.
+
+Kullanım (backend dizininde):
+    python -m benchmark                              # uygulama süreç içinde
+    python -m benchmark --url http://127.0.0.1:8000 --pid 12345
+    python -m benchmark --endpoints oneriler saglik_test --warm 10
+    python -m benchmark --compare benchmarks/onceki.json
+
+Her uç nokta 81 ilin tamamı için çağrılır. İlk tur "soğuk" (her URL'nin ilk
+isteği; süreç içi modda açılış süresi de ölçülür), sonraki turlar "ılık"
+durumdur. Her aşama için p50/p95/p99 gecikme, saniyedeki istek sayısı ve
+tepe RSS raporlanır; sonuç JSON olarak yazılır. --url ile çalışırken soğuk
+ölçüm için sunucu yeni başlatılmış olmalıdır; RSS yalnızca --pid verilirse
+okunur.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import urllib.parse
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+BENCHMARK_PATH = Path(__file__).parent / "benchmarks"
+
+# Uç nokta adı -> il adından yol üreten fonksiyon (None: ilden bağımsız tek istek)
+ENDPOINTS = {
+    "gsyh": lambda il: f"/gsyh/{il}",
+    "gsyh_reel": lambda il: f"/gsyh_reel/{il}",
+    "oneri": lambda il: f"/oneri/{il}",
+    "oneriler": lambda il: f"/oneriler/{il}",
+    "ozet": lambda il: f"/il/{il}/ozet",
+    "saglik_test_il": lambda il: f"/saglik_test?il_adi={il}",
+    "oneriler_tumu": None,
+    "saglik_test": None,
+}
+GLOBAL_PATHS = {"oneriler_tumu": "/oneriler_tumu", "saglik_test": "/saglik_test"}
+
+
+def _peak_rss_mb(pid: int | None) -> float | None:
+    """Sürecin tepe bellek kullanımı (VmHWM); Linux dışında yalnızca kendi süreci için."""
+    status = Path(f"/proc/{pid or 'self'}/status")
+    try:
+        for line in status.read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if pid is None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS bayt, Linux KiB döner
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    return None
+
+
+def _summary(samples: list[float], errors: int, wall: float) -> dict:
+    ms = np.asarray(samples) * 1000
+    if not len(ms):
+        return {"istek": 0, "hata": errors}
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "istek": int(len(ms)),
+        "hata": errors,
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "ort_ms": round(float(ms.mean()), 2),
+        "max_ms": round(float(ms.max()), 2),
+        "rps": round(len(ms) / wall, 1) if wall > 0 else None,
+    }
+
+
+async def _run_phase(client: httpx.AsyncClient, requests: list[tuple[str, str]], concurrency: int, pid: int | None) -> dict:
+    """İstekleri en fazla `concurrency` eşzamanlılıkla gönderir, uç nokta başına özet döner."""
+    samples: dict[str, list[float]] = {name: [] for name, _ in requests}
+    errors: dict[str, int] = {name: 0 for name, _ in requests}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(name: str, path: str) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.get(path)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            samples[name].append(time.perf_counter() - start)
+            if not ok:
+                errors[name] += 1
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one(name, path) for name, path in requests))
+    wall = time.perf_counter() - wall_start
+
+    # Uç nokta satırlarında rps, isteklerin kendi süreleri toplamından hesaplanır (karışık
+    # yükte duvar saati paylaşıldığı için); aşamanın gerçek verimi _toplam satırındadır
+    result = {name: _summary(samples[name], errors[name], sum(samples[name])) for name in samples}
+    result["_toplam"] = _summary([s for v in samples.values() for s in v], sum(errors.values()), wall)
+    result["_toplam"]["sure_s"] = round(wall, 3)
+    result["_toplam"]["tepe_rss_mb"] = _peak_rss_mb(pid)
+    return result
+
+
+def _build_requests(provinces: list[str], endpoints: list[str]) -> list[tuple[str, str]]:
+    requests = []
+    for name in endpoints:
+        make = ENDPOINTS[name]
+        if make is None:
+            requests.append((name, GLOBAL_PATHS[name]))
+            continue
+        for il in provinces:
+            requests.append((name, make(urllib.parse.quote(il))))
+    return requests
+
+
+async def _bench(args: argparse.Namespace) -> dict:
+    report: dict = {
+        "meta": {
+            "mod": "http" if args.url else "surec_ici",
+            "hedef": args.url or "main:app",
+            "baslangic": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu": os.cpu_count(),
+            "eszamanlilik": args.concurrency,
+            "ilik_tur": args.warm,
+            "uc_noktalar": args.endpoints,
+        },
+    }
+
+    if args.url:
+        # İl listesi yerel veri dosyasından okunur; sunucuya ölçüm dışı istek gitmez
+        from main import province_names
+        provinces = province_names()
+        async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+            report["meta"]["il_sayisi"] = len(provinces)
+            await _run_all(client, provinces, args, report, args.pid)
+        return report
+
+    start = time.perf_counter()
+    import main  # içe aktarma da soğuk açılışın parçası
+    async with main.app.router.lifespan_context(main.app):
+        report["acilis_s"] = round(time.perf_counter() - start, 3)
+        report["meta"]["kod"] = main._CODE_VERSION
+        provinces = main.province_names()
+        report["meta"]["il_sayisi"] = len(provinces)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=args.timeout) as client:
+            await _run_all(client, provinces, args, report, None)
+    return report
+
+
+async def _run_all(client: httpx.AsyncClient, provinces: list[str], args: argparse.Namespace, report: dict, pid: int | None) -> None:
+    requests = _build_requests(provinces, args.endpoints)
+    report["soguk"] = await _run_phase(client, requests, args.concurrency, pid)
+    warm = [r for _ in range(args.warm) for r in requests]
+    report["ilik"] = await _run_phase(client, warm, args.concurrency, pid)
+
+
+def _print_report(report: dict, baseline: dict | None) -> None:
+    if "acilis_s" in report:
+        print(f"açılış: {report['acilis_s']:.3f} sn")
+    for phase in ("soguk", "ilik"):
+        rows = report[phase]
+        total = rows["_toplam"]
+        print(f"\n[{phase}] {total['istek']} istek, {total['sure_s']} sn, "
+              f"{total['rps']} istek/sn, tepe RSS {total['tepe_rss_mb']} MB")
+        print(f"{'uç nokta':16s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'hata':>5s}")
+        for name, row in rows.items():
+            if name == "_toplam" or not row.get("istek"):
+                continue
+            line = f"{name:16s} {row['p50_ms']:9.2f} {row['p95_ms']:9.2f} {row['p99_ms']:9.2f} {row['hata']:5d}"
+            old = (baseline or {}).get(phase, {}).get(name)
+            if old and old.get("p50_ms"):
+                line += f"   p50 {row['p50_ms'] / old['p50_ms']:.2f}x önceki"
+            print(line)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="API uç noktalarının soğuk/ılık gecikme ve verimini ölçer.")
+    parser.add_argument("--url", help="Çalışan sunucunun adresi (verilmezse uygulama süreç içinde çalışır)")
+    parser.add_argument("--pid", type=int, help="--url ile ölçülen sunucunun süreç kimliği (RSS için)")
+    parser.add_argument("--endpoints", nargs="+", default=list(ENDPOINTS), metavar="UC_NOKTA",
+                        help=f"Ölçülecek uç noktalar (varsayılan: hepsi). Seçenekler: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--warm", type=int, default=5, help="Ilık durumda tüm isteklerin kaç tur tekrarlanacağı")
+    parser.add_argument("--concurrency", type=int, default=1, help="Aynı anda açık istek sayısı")
+    parser.add_argument("--timeout", type=float, default=120.0, help="İstek zaman aşımı (sn)")
+    parser.add_argument("--out", type=Path, help="Sonuç dosyası (varsayılan: benchmarks/<zaman>.json)")
+    parser.add_argument("--compare", type=Path, help="Karşılaştırılacak önceki sonuç dosyası")
+    args = parser.parse_args(argv)
+    unknown = [e for e in args.endpoints if e not in ENDPOINTS]
+    if unknown:
+        parser.error(f"Bilinmeyen uç nokta: {', '.join(unknown)}")
+
+    report = asyncio.run(_bench(args))
+    baseline = json.loads(args.compare.read_text(encoding="utf-8")) if args.compare else None
+    _print_report(report, baseline)
+
+    out = args.out or BENCHMARK_PATH / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n{out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""TÜİK çalışma kitaplarını Arrow IPC anlık görüntüsüne dönüştürür.
+
+Kullanım (backend dizininde):
+    python -m build_snapshot                 # tüm veri setleri
+    python -m build_snapshot cari reel       # yalnızca verilenler
+    python -m build_snapshot --out /tmp/snap
+
+API açılışta manifest.json içindeki kaynak özetleri tutan tabloları bellek
+eşlemli okur; tutmayanlar için Excel dosyalarına döner.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from main import DATASET_SOURCES, SNAPSHOT_PATH, write_snapshot
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="TÜİK verilerinden Arrow anlık görüntüsü üretir.")
+    parser.add_argument("datasets", nargs="*", metavar="veri_seti",
+                        help=f"Yazılacak veri setleri (varsayılan: hepsi). Seçenekler: {', '.join(DATASET_SOURCES)}")
+    parser.add_argument("--out", type=Path, default=SNAPSHOT_PATH, help="Çıktı dizini")
+    args = parser.parse_args(argv)
+    unknown = [d for d in args.datasets if d not in DATASET_SOURCES]
+    if unknown:
+        parser.error(f"Bilinmeyen veri seti: {', '.join(unknown)}")
+
+    start = time.perf_counter()
+    manifest = write_snapshot(args.datasets or None, out_dir=args.out)
+    for name in (args.datasets or DATASET_SOURCES):
+        entry = manifest["datasets"][name]
+        print(f"{name:18s} {entry['rows']:6d} satır  {entry['source']}")
+    print(f"{args.out} ({time.perf_counter() - start:.1f} sn)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,123 @@
-from fastapi import FastAPI
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from email.utils import formatdate
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 import pandas as pd
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Awaitable, Callable, Iterable, NamedTuple
+import asyncio
+import bisect
+import cProfile
+import functools
+import gzip
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import pstats
+import threading
 import unicodedata
 import re
+import shutil
+import struct
+import tempfile
+import time
+import urllib.parse
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except ImportError:  # anlık görüntü desteği isteğe bağlı, yoksa Excel'den okunur
+    pa = None
+
+try:
+    import orjson
+except ImportError:  # hızlı JSON isteğe bağlı, yoksa FastAPI'nin kodlayıcısı ve json kullanılır
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # yoksa yalnızca gzip sunulur
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:  # harita görsellerinin küçültülmüş sürümleri isteğe bağlı, yoksa özgün PNG verilir
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------- JSON --------------------
+
+def _json_default(obj: Any) -> Any:
+    """orjson'un doğrudan yazamadığı türler: NumPy/pandas skalerleri, eksik değerler, kümeler."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if obj is pd.NaT or obj is pd.NA:
+        return None
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    return jsonable_encoder(obj)
+
+
+_NUMPY_ENCODERS = {np.generic: lambda x: x.item()}
+
+
+def render_json(content: Any) -> bytes:
+    """Yanıt gövdesini sıkışık UTF-8 JSON olarak üretir (orjson varsa onunla).
+
+    NumPy skalerleri ve dizileri doğrudan yazılır; orjson NaN/inf değerlerini null yazar.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            content, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(
+        jsonable_encoder(content, custom_encoder=_NUMPY_ENCODERS),
+        ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"),
+    ).encode("utf-8")
+
 
-app = FastAPI()
+class FastJSONResponse(JSONResponse):
+    """Uygulamanın varsayılan yanıt sınıfı; gövdeyi render_json ile üretir."""
+
+    def render(self, content: Any) -> bytes:
+        return render_json(content)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Tüm TÜİK çalışma kitapları açılışta bir kez okunur, istekler bellekten beslenir
+    load_datasets()
+    # Ara tablolar da açılışta kurulur; ilk istekler beklemez
+    for name, error in rebuild_affected(DATASET_SOURCES).items():
+        logger.warning("%s tablosu kurulamadı: %s", name, error)
+    # Süreç havuzunun işçileri veriyi anlık görüntüden yükler; açılış hepsi hazır olana kadar bekler
+    if FANOUT_WORKERS > 0:
+        start_fanout_executor()
+    start_heavy_executor()
+    yield
+    shutdown_fanout_executor()
+    shutdown_heavy_executor()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # CORS ayarları
 origins = [
@@ -24,16 +134,43 @@ app.add_middleware(
 )
 
 DATA_PATH = Path(__file__).parent.parent / "teknofest tuik"
+SNAPSHOT_PATH = Path(os.environ.get("SNAPSHOT_PATH", Path(__file__).parent / "snapshot"))
 CITY_IMAGES_PATH = Path(__file__).parent.parent / "cities"
 
+
+class CachedStaticFiles(StaticFiles):
+    """Yanıtlara (304 dahil) sabit bir Cache-Control başlığı ekleyen StaticFiles."""
+
+    def __init__(self, *args, cache_control: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_control = cache_control
+
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        response.headers.setdefault("Cache-Control", self.cache_control)
+        return response
+
+
 if CITY_IMAGES_PATH.exists():
-    app.mount("/cities", StaticFiles(directory=str(CITY_IMAGES_PATH)), name="cities")
-CITY_IMAGES_PATH = Path(__file__).parent.parent / "cities"
+    # Harita görselleri il başına sabittir; tarayıcı ve CDN bir yıl tutabilir
+    app.mount(
+        "/cities",
+        CachedStaticFiles(directory=str(CITY_IMAGES_PATH), cache_control="public, max-age=31536000, immutable"),
+        name="cities",
+    )
+
+MAP_CACHE_PATH = Path(os.environ.get("MAP_CACHE_PATH", Path(__file__).parent / "harita"))
+# Dosya adları içerik özetini taşır; içerik değişince URL de değişir
+app.mount(
+    "/harita_gorsel",
+    CachedStaticFiles(directory=str(MAP_CACHE_PATH), check_dir=False, cache_control="public, max-age=31536000, immutable"),
+    name="harita_gorsel",
+)
 
 
-def _pick_sheet_name(file_path: Path) -> str:
+def _pick_sheet_name(file_path: Path | pd.ExcelFile) -> str:
     """Pick a reasonable sheet name if an expected one is not found."""
-    xls = pd.ExcelFile(file_path)
+    xls = file_path if isinstance(file_path, pd.ExcelFile) else pd.ExcelFile(file_path)
     if not xls.sheet_names:
         raise ValueError("Excel dosyasında sayfa bulunamadı")
 
@@ -46,19 +183,65 @@ def _pick_sheet_name(file_path: Path) -> str:
     return xls.sheet_names[0]
 
 
+# -------------------- Okunmuş sayfa önbelleği --------------------
+# Anahtar: (dosya yolu, sayfa, başlık satırı). Dosyanın mtime/boyutu değişirse
+# kayıt geçersiz sayılır ve sayfa yeniden okunur; böylece TÜİK güncellemeleri
+# sunucu yeniden başlatılmadan devreye girer. Kayıtlar yalnızca bir veri setinin
+# okunması süresince tutulur (_parse_source): temizlenmiş tablo kurulunca ham
+# sayfa bırakılır, bellekte aynı verinin iki kopyası kalmaz.
+
+FileVersion = tuple[int, int]
+
+_EXCEL_CACHE: dict[tuple[str, Any, Any], tuple[FileVersion, pd.DataFrame]] = {}
+_EXCEL_CACHE_LOCK = threading.Lock()
+
+
+def _file_version(file_path: Path) -> FileVersion:
+    st = file_path.stat()
+    return st.st_mtime_ns, st.st_size
+
+
+def _read_sheet(file_path: Path, sheet: str | int | None = None, header=None) -> pd.DataFrame:
+    """Sayfayı okur, aynı dosya sürümü için önbellekteki DataFrame'i döner.
+
+    sheet=None ise _pick_sheet_name ile seçilir. Dönen DataFrame paylaşımlıdır,
+    çağıran taraf değiştirmemelidir.
+    """
+    version = _file_version(file_path)
+    key = (str(file_path), sheet, tuple(header) if isinstance(header, list) else header)
+    cached = _EXCEL_CACHE.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    start = time.perf_counter()
+    with pd.ExcelFile(file_path) as xls:
+        sheet_name = _pick_sheet_name(xls) if sheet is None else sheet
+        df = xls.parse(sheet_name, header=header)
+    record_timing("excel", file_path.name, time.perf_counter() - start)
+    with _EXCEL_CACHE_LOCK:
+        _EXCEL_CACHE[key] = (version, df)
+    return df
+
+
+def clear_excel_cache(file_path: Path | None = None) -> int:
+    """Önbelleği (veya yalnızca verilen dosyanın kayıtlarını) boşaltır, silinen kayıt sayısını döner."""
+    with _EXCEL_CACHE_LOCK:
+        keys = [k for k in _EXCEL_CACHE if file_path is None or k[0] == str(file_path)]
+        for k in keys:
+            del _EXCEL_CACHE[k]
+    return len(keys)
+
+
 def _read_excel_flexible(file_path: Path) -> pd.DataFrame:
     """Read Excel allowing for varying sheet names and header rows."""
-    sheet = _pick_sheet_name(file_path)
-
     try:
-        return pd.read_excel(file_path, sheet_name=sheet, header=[4])
+        return _read_sheet(file_path, header=[4])
     except Exception:
-        return pd.read_excel(file_path, sheet_name=sheet, header=0)
+        return _read_sheet(file_path, header=0)
 
 
 def _read_with_header_row(file_path: Path, header_row_index: int = 3) -> pd.DataFrame:
-    sheet = _pick_sheet_name(file_path)
-    df_raw = pd.read_excel(file_path, sheet_name=sheet, header=None)
+    df_raw = _read_sheet(file_path, header=None)
 
     df_raw = df_raw.dropna(axis=0, how='all').dropna(axis=1, how='all')
     if header_row_index >= len(df_raw):
@@ -72,6 +255,7 @@ def _read_with_header_row(file_path: Path, header_row_index: int = 3) -> pd.Data
     return df
 
 
+@functools.lru_cache(maxsize=8192)
 def _normalize_text(s: str) -> str:
     s = str(s)
     s = unicodedata.normalize("NFD", s)
@@ -79,6 +263,9 @@ def _normalize_text(s: str) -> str:
     return s.strip().lower()
 
 
+_YEAR_RE = re.compile(r"(19|20)\d{2}")
+
+
 def _extract_year(value) -> int | None:
 
     try:
@@ -90,10 +277,9 @@ def _extract_year(value) -> int | None:
     except Exception:
         pass
     try:
-        import re
         s = str(value)
 
-        m = re.search(r"(19|20)\d{2}", s)
+        m = _YEAR_RE.search(s)
         if m:
             return int(m.group(0))
     except Exception:
@@ -126,6 +312,82 @@ def _to_number(value) -> float | None:
     except Exception:
         return None
 
+
+# -------------------- Sütun bazlı sayı ayrıştırma --------------------
+# _to_number ve _extract_year'ın bütün bir sütunu tek geçişte işleyen
+# karşılıkları; hücre hücre çağrılmalarıyla aynı sonucu verir (None -> NaN).
+
+def _number_cells(values: pd.Series) -> np.ndarray:
+    """Skaler fonksiyonların sayı olarak ele aldığı (int/float alt sınıfı) hücrelerin maskesi."""
+    if values.dtype.kind in "biuf":
+        return np.ones(len(values), dtype=bool)
+    types = values.map(type)
+    kinds = {t: issubclass(t, (int, float)) for t in types.unique()}
+    return types.map(kinds).to_numpy(dtype=bool)
+
+
+def _cell_texts(values: np.ndarray) -> pd.Series:
+    # Skaler fonksiyonlardaki str(value) ile aynı metin
+    return pd.Series(values.tolist(), dtype=object).map(str)
+
+
+def parse_numbers(values: pd.Series) -> np.ndarray:
+    """_to_number'ın sütun karşılığı: float dizisi, sayıya çevrilemeyen hücre NaN.
+
+    Metinlerde % ve boşluklar (NBSP dahil) atılır; hem nokta hem virgül varsa nokta
+    binlik, virgül ondalık ayırıcı sayılır, yalnız virgül varsa ondalık ayırıcıdır.
+    """
+    if values.dtype.kind in "biuf":
+        # Kopya: pandas 3 (copy-on-write) sütun görünümünü salt okunur verir, çağıran yazabilir
+        return values.to_numpy(dtype=float, copy=True)
+    cells = values.to_numpy()
+    out = np.full(len(cells), np.nan)
+    is_number = _number_cells(values)
+    out[is_number] = cells[is_number].astype(float)
+    rest = np.flatnonzero(~is_number)
+    if not len(rest):
+        return out
+
+    text = _cell_texts(cells[rest]).str.strip()
+    text = text.str.replace("%", "", regex=False).str.replace("\u00a0", " ", regex=False)
+    text = text.str.strip().str.replace(" ", "", regex=False)
+    both = text.str.contains(",", regex=False) & text.str.contains(".", regex=False)
+    text = text.where(~both, text.str.replace(".", "", regex=False)).str.replace(",", ".", regex=False)
+    # Aşağıda yerinde yazıldığı için kopya alınır (pandas 3'te görünüm salt okunurdur)
+    parsed = pd.to_numeric(text, errors="coerce").to_numpy(dtype=float, copy=True)
+    # to_numeric uzun ondalıklarda son basamakta yuvarlama farkı yapabilir; değerler
+    # float() ile aynı (doğru yuvarlanan) NumPy dönüşümüyle yeniden alınır
+    valid = ~np.isnan(parsed)
+    parsed[valid] = text[valid].to_numpy(dtype=str).astype(float)
+    # to_numeric'in reddedip float()'un kabul edebileceği az sayıdaki rakamlı metin (1_000, 1e400 ...)
+    retry = ~valid & text.str.contains(r"\d", regex=True).to_numpy()
+    for i in np.flatnonzero(retry):
+        try:
+            parsed[i] = float(text.iloc[i])
+        except ValueError:
+            pass
+    out[rest] = parsed
+    return out
+
+
+def extract_years(values: pd.Series) -> np.ndarray:
+    """_extract_year'ın sütun karşılığı: yıl dizisi (float), yıl bulunamayan hücre NaN."""
+    cells = values.to_numpy()
+    out = np.full(len(cells), np.nan)
+    number_pos = np.flatnonzero(_number_cells(values))
+    with np.errstate(invalid="ignore"):
+        rounded = np.round(cells[number_pos].astype(float))
+        in_range = (rounded >= 1900) & (rounded <= 2100)
+    out[number_pos[in_range]] = rounded[in_range]
+
+    # Sayı olmayan ya da aralık dışı hücrelerde metindeki ilk 19xx/20xx
+    rest = np.ones(len(cells), dtype=bool)
+    rest[number_pos[in_range]] = False
+    if rest.any():
+        found = _cell_texts(cells[rest]).str.extract(r"((?:19|20)\d{2})", expand=False)
+        out[rest] = pd.to_numeric(found, errors="coerce").to_numpy(dtype=float)
+    return out
+
 # Lazım olmayan sektörleri atlar
 def olmayacak_sector_name(name: str) -> bool:
     n = _normalize_text(name)
@@ -140,59 +402,2381 @@ def olmayacak_sector_name(name: str) -> bool:
         return True
     if re.fullmatch(r"[a-z]{1,5}", n) and n.isalpha() and n == n.lower():
 
-        return n in excluded_codes
-    return False
+        return n in excluded_codes
+    return False
+
+
+# -------------------- Veri seti kayıt defteri --------------------
+# Her çalışma kitabı bir kez okunur ve temizlenmiş DataFrame bellekte tutulur.
+# Uç noktalar dosyaları tekrar açmak yerine _dataset(ad) ile buradan okur.
+
+def _read_first_sheet(file_path: Path) -> pd.DataFrame:
+    """İlk sayfayı başlıksız okur, tamamen boş satır/sütunları atar."""
+    df = _read_sheet(file_path, sheet=0, header=None)
+    return df.dropna(axis=0, how='all').dropna(axis=1, how='all')
+
+
+def _load_reel(file_path: Path) -> pd.DataFrame:
+    return _read_sheet(file_path, header=3)
+
+
+def _load_tarim(file_path: Path) -> pd.DataFrame:
+    # A=il, B=toplam alan. İl hücreleri İBBS koduyla başlar ("TR521 Konya"); kod atılır
+    tarim_df = _read_first_sheet(file_path)
+    tarim_df.columns = [*(f"c{i}" for i in range(len(tarim_df.columns)))]
+    tarim_df["_il"] = tarim_df.iloc[:, 0].astype(str).str.replace(r"^\s*TR[0-9A-Z]*\s+", "", regex=True)
+    tarim_df["_alan"] = pd.to_numeric(tarim_df.iloc[:, 1], errors="coerce")
+    tarim_df = tarim_df.dropna(subset=["_alan"])
+    return tarim_df
+
+
+# get_oneriler ve sıralamalardaki işsizlik oranının yılı
+ISSIZLIK_YILI = 2023
+
+
+def _load_issizlik(file_path: Path) -> pd.DataFrame:
+    # A=İBBS kodu, B=il. Yıl başlıkları üst satırlarda, her yılın ilk sütunu oran;
+    # boş sütunlar atıldığından oran sütunu konumla değil yıl başlığıyla bulunur
+    iss_df = _read_first_sheet(file_path)
+    header = iss_df.head(6)
+    rate_col = next(
+        (i for i in range(2, iss_df.shape[1]) if (extract_years(header.iloc[:, i]) == ISSIZLIK_YILI).any()),
+        None,
+    )
+    if rate_col is None:
+        raise ValueError(f"İşsizlik dosyasında {ISSIZLIK_YILI} sütunu bulunamadı")
+    iss_df["_il"] = iss_df.iloc[:, 1].astype(str).str.strip()
+    iss_df["_rate"] = pd.to_numeric(iss_df.iloc[:, rate_col], errors="coerce")
+    # Yalnızca il satırları (İBBS 3. düzey kodu, "TR100"); "TR Türkiye" satırı alınmaz
+    is_province = iss_df.iloc[:, 0].astype(str).str.fullmatch(r"\s*TR[0-9A-Z]{3}\s*")
+    iss_df = iss_df[is_province].dropna(subset=["_rate"])
+    return iss_df
+
+
+def _load_yabanci_konut(file_path: Path) -> pd.DataFrame:
+    # B=il, C=toplam
+    ydf = _read_first_sheet(file_path)
+    ydf["_il"] = ydf.iloc[:, 1].astype(str)
+    ydf["_toplam"] = pd.to_numeric(ydf.iloc[:, 2], errors="coerce")
+    return ydf
+
+
+def _load_saglik_personeli(file_path: Path) -> pd.DataFrame:
+    # İl blokları satır düzenine göre ayrıştırıldığından (_build_saglik_kupu) boş satırlar atılmaz
+    return _read_sheet(file_path, sheet=0, header=None)
+
+
+# -------------------- İl indeksi --------------------
+# Normalize il adı -> konum listesi. Satır bazlı sayfalarda satır konumları,
+# geniş (il başına sütun) sayfalarda sütun konumları tutulur. Veri seti
+# yüklenirken bir kez kurulur; aramalar sözlük erişimine iner.
+
+ProvinceIndex = dict[str, list[int]]
+
+
+def _build_index(values: Iterable, offset: int = 0) -> ProvinceIndex:
+    index: ProvinceIndex = {}
+    for pos, value in enumerate(values):
+        index.setdefault(_normalize_text(str(value)), []).append(offset + pos)
+    return index
+
+
+def _index_rows(col: int | str) -> Callable[[pd.DataFrame], ProvinceIndex]:
+    """İl adı `col` sütununda olan sayfalar için satır indeksi kurucusu."""
+    def build(df: pd.DataFrame) -> ProvinceIndex:
+        series = df[col] if isinstance(col, str) else df.iloc[:, col]
+        return _build_index(series.astype(str))
+    return build
+
+
+def _index_columns(row: int, start_col: int) -> Callable[[pd.DataFrame], ProvinceIndex]:
+    """İl adları `row` satırında, `start_col` sütunundan itibaren dizili geniş sayfalar için."""
+    def build(df: pd.DataFrame) -> ProvinceIndex:
+        if row >= len(df):
+            return {}
+        return _build_index(df.iloc[row, start_col:].astype(str), offset=start_col)
+    return build
+
+
+class DatasetSource(NamedTuple):
+    file_name: str
+    loader: Callable[[Path], pd.DataFrame]
+    indexer: Callable[[pd.DataFrame], ProvinceIndex]
+
+
+DATASET_SOURCES: dict[str, DatasetSource] = {
+    # B=il
+    "cari": DatasetSource("cari fiyatli .xls", lambda p: _read_with_header_row(p, header_row_index=3), _index_rows(1)),
+    "reel": DatasetSource("zincir hacim.xls", _load_reel, _index_rows(1)),
+    "oneri": DatasetSource("yenilenebilir_enerji_onerileri.xlsx", _read_first_sheet, _index_rows(1)),
+    "tarim": DatasetSource("toplam tarın alanı.xls", _load_tarim, _index_rows("_il")),
+    "issizlik": DatasetSource("işsizlik.xls", _load_issizlik, _index_rows("_il")),
+    # Şehirler 3. satırda D'den başlar
+    "konut": DatasetSource("illere göre konut satış.xls", _read_first_sheet, _index_columns(2, 3)),
+    "yabanci_konut": DatasetSource("illere göre yabancıya konut satış.xls", _load_yabanci_konut, _index_rows("_il")),
+    # A=il; her ilin 46 satırlık bloğu il adının ilk geçtiği satırdan başlar
+    "saglik_personeli": DatasetSource("illere göre sağlık personeli.xls", _load_saglik_personeli, _index_rows(0)),
+    # Şehirler 3. satırda E'den başlar
+    "nufus": DatasetSource("il yaş cinsiyet nufus.xls", _read_first_sheet, _index_columns(2, 4)),
+}
+
+
+# -------------------- Arrow anlık görüntüsü --------------------
+# `python -m build_snapshot` temizlenmiş tabloları SNAPSHOT_PATH altına Arrow IPC
+# dosyaları olarak yazar, manifest.json kaynak dosyaların sha256 özetini tutar.
+# Yükleme sırasında özet tutuyorsa tablo bellek eşlemli olarak okunur; görüntü
+# yoksa ya da kaynak değişmişse Excel'e dönülür.
+
+# Yükleyicilerin ürettiği tablo yapısı ya da görüntü kodlaması değişirse artırılmalı;
+# eski görüntüler bayat sayılır
+SNAPSHOT_FORMAT = 4
+
+# Karışık tipli (object) sütunlarda hücre türleri
+_CELL_NULL, _CELL_INT, _CELL_FLOAT, _CELL_STR, _CELL_DATETIME = range(5)
+
+
+def _file_sha256(file_path: Path) -> str:
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _encode_object_column(values: Iterable) -> list:
+    """object sütununu (tür, sayı, metin) üçlüsüne ayırır; Python tipleri geri dönüşte korunur."""
+    kinds, nums, texts = [], [], []
+    for v in values:
+        if isinstance(v, str):
+            kinds.append(_CELL_STR); nums.append(None); texts.append(v)
+        elif isinstance(v, datetime):
+            kinds.append(_CELL_DATETIME); nums.append(None); texts.append(v.isoformat())
+        elif isinstance(v, bool) or not isinstance(v, (int, float)):
+            raise ValueError(f"Desteklenmeyen hücre tipi: {type(v).__name__}")
+        elif isinstance(v, float) and pd.isna(v):
+            kinds.append(_CELL_NULL); nums.append(None); texts.append(None)
+        elif isinstance(v, int):
+            if abs(v) >= 2 ** 53:
+                raise ValueError("Tam sayı float64 ile temsil edilemiyor")
+            kinds.append(_CELL_INT); nums.append(float(v)); texts.append(None)
+        else:
+            kinds.append(_CELL_FLOAT); nums.append(float(v)); texts.append(None)
+    return [pa.array(kinds, pa.int8()), pa.array(nums, pa.float64()), pa.array(texts, pa.string())]
+
+
+def _decode_object_column(kinds: np.ndarray, nums: np.ndarray, texts: np.ndarray) -> np.ndarray:
+    # Listeden atama Python int/float/datetime tiplerini korur (parse_numbers int/float ayrımı yapar)
+    out = np.full(len(kinds), np.nan, dtype=object)
+    mask = kinds == _CELL_INT
+    out[mask] = nums[mask].astype(np.int64).tolist()
+    mask = kinds == _CELL_FLOAT
+    out[mask] = nums[mask].tolist()
+    mask = kinds == _CELL_STR
+    out[mask] = texts[mask]
+    mask = kinds == _CELL_DATETIME
+    out[mask] = [datetime.fromisoformat(t) for t in texts[mask]]
+    return out
+
+
+def _encode_frame(df: pd.DataFrame) -> "pa.Table":
+    arrays, names, columns = [], [], []
+    for i in range(df.shape[1]):
+        col = df.iloc[:, i]
+        label = df.columns[i]
+        if isinstance(label, np.generic):
+            label = label.item()
+        if not isinstance(label, (str, int, float)):
+            raise ValueError(f"Desteklenmeyen sütun etiketi: {label!r}")
+        if col.dtype == object:
+            arrays.extend(_encode_object_column(col))
+            names.extend([f"{i}.k", f"{i}.n", f"{i}.s"])
+            columns.append({"label": label, "enc": "mixed"})
+        else:
+            arrays.append(pa.array(col.to_numpy()))
+            names.append(str(i))
+            columns.append({"label": label, "enc": "native", "dtype": str(col.dtype)})
+    range_index = df.index.equals(pd.RangeIndex(len(df)))
+    if not range_index:
+        arrays.append(pa.array(df.index.to_numpy(dtype=np.int64)))
+        names.append("__index__")
+    metadata = {
+        "columns": json.dumps(columns, ensure_ascii=False),
+        "columns_name": json.dumps(df.columns.name),  # ör. başlık satırı numarası
+        "range_index": json.dumps(range_index),
+    }
+    return pa.Table.from_arrays(arrays, names=names).replace_schema_metadata(metadata)
+
+
+def _decode_frame(table: "pa.Table") -> pd.DataFrame:
+    metadata = table.schema.metadata
+    columns = json.loads(metadata[b"columns"])
+    data = {}
+    for i, spec in enumerate(columns):
+        if spec["enc"] == "mixed":
+            data[i] = _decode_object_column(
+                table.column(f"{i}.k").to_numpy(),
+                table.column(f"{i}.n").to_numpy(zero_copy_only=False),
+                table.column(f"{i}.s").to_numpy(zero_copy_only=False),
+            )
+        else:
+            data[i] = pd.Series(table.column(str(i)).to_numpy(zero_copy_only=False)).astype(spec["dtype"]).to_numpy()
+    if json.loads(metadata[b"range_index"]):
+        index = pd.RangeIndex(table.num_rows)
+    else:
+        index = pd.Index(table.column("__index__").to_numpy())
+    df = pd.DataFrame(data, index=index)
+    df.columns = pd.Index([c["label"] for c in columns], name=json.loads(metadata[b"columns_name"]))
+    return df
+
+
+def _read_manifest(snapshot_dir: Path = SNAPSHOT_PATH) -> dict | None:
+    try:
+        manifest = json.loads((snapshot_dir / "manifest.json").read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        return None
+    return manifest
+
+
+def _load_from_snapshot(name: str, file_path: Path) -> pd.DataFrame | None:
+    """Kaynak dosyanın özeti manifest ile eşleşiyorsa tabloyu görüntüden okur, değilse None."""
+    if pa is None:
+        return None
+    manifest = _read_manifest(SNAPSHOT_PATH)
+    entry = (manifest or {}).get("datasets", {}).get(name)
+    if entry is None:
+        return None
+    try:
+        if entry["sha256"] != _file_sha256(file_path):
+            logger.info("Anlık görüntü bayat, Excel'den okunuyor: %s", file_path.name)
+            return None
+        source = pa.memory_map(str(SNAPSHOT_PATH / entry["table"]), "r")
+        return _decode_frame(pa_ipc.open_file(source).read_all())
+    except Exception as e:
+        logger.warning("Anlık görüntü okunamadı (%s): %s", name, e)
+        return None
+
+
+def write_snapshot(
+    names: list[str] | None = None,
+    out_dir: Path = SNAPSHOT_PATH,
+    frames: dict[str, pd.DataFrame] | None = None,
+) -> dict:
+    """Veri setlerini Excel'den okuyup Arrow IPC olarak yazar, güncellenen manifesti döner.
+
+    frames içindeki veri setleri yeniden okunmaz, verilen (yüklü) tablolar yazılır.
+    """
+    if pa is None:
+        raise RuntimeError("Anlık görüntü için pyarrow gerekli")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest = _read_manifest(out_dir) or {"format": SNAPSHOT_FORMAT, "datasets": {}}
+    for name in (names or list(DATASET_SOURCES)):
+        source = DATASET_SOURCES[name]
+        file_path = DATA_PATH / source.file_name
+        df = frames[name] if frames and name in frames else _parse_source(name, file_path)
+        table = _encode_frame(df)
+        table_name = f"{name}.arrow"
+        tmp_path = out_dir / f"{table_name}.tmp"
+        with pa.OSFile(str(tmp_path), "wb") as sink, pa_ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, out_dir / table_name)
+        manifest["datasets"][name] = {
+            "source": source.file_name,
+            "sha256": _file_sha256(file_path),
+            "size": file_path.stat().st_size,
+            "table": table_name,
+            "rows": int(df.shape[0]),
+            "columns": int(df.shape[1]),
+        }
+    manifest["built_at"] = datetime.now().isoformat(timespec="seconds")
+    tmp_manifest = out_dir / "manifest.json.tmp"
+    tmp_manifest.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp_manifest, out_dir / "manifest.json")
+    return manifest
+
+
+def _stale_snapshot_entries() -> list[str]:
+    """Görüntüde olmayan ya da kaynak özeti tutmayan veri setleri (kaynağı eksik olanlar hariç)."""
+    entries = (_read_manifest(SNAPSHOT_PATH) or {}).get("datasets", {})
+    stale = []
+    for name, source in DATASET_SOURCES.items():
+        file_path = DATA_PATH / source.file_name
+        entry = entries.get(name)
+        try:
+            if (entry is None or not (SNAPSHOT_PATH / entry["table"]).exists()
+                    or entry["sha256"] != _file_sha256(file_path)):
+                stale.append(name)
+        except FileNotFoundError:
+            continue
+    return stale
+
+
+@dataclass
+class LoadedDataset:
+    name: str
+    path: Path
+    version: FileVersion
+    df: pd.DataFrame
+    index: ProvinceIndex = field(default_factory=dict)
+    origin: str = "excel"
+    loaded_at: float = field(default_factory=time.time)
+
+    def positions(self, il_adi: str) -> list[int]:
+        """İlin satır (ya da geniş sayfalarda sütun) konumları; il yoksa boş liste."""
+        return self.index.get(_normalize_text(il_adi), [])
+
+    def first(self, il_adi: str) -> int | None:
+        positions = self.positions(il_adi)
+        return positions[0] if positions else None
+
+
+_DATASETS: dict[str, LoadedDataset] = {}
+_DATASETS_LOCK = threading.Lock()
+
+
+def _parse_source(name: str, file_path: Path) -> pd.DataFrame:
+    """Veri setini Excel'den okur; ham sayfalar okuma bitince önbellekten düşürülür."""
+    try:
+        return DATASET_SOURCES[name].loader(file_path)
+    finally:
+        clear_excel_cache(file_path)
+
+
+def _load_dataset(name: str) -> LoadedDataset:
+    source = DATASET_SOURCES[name]
+    file_path = DATA_PATH / source.file_name
+    version = _file_version(file_path)
+    df = _load_from_snapshot(name, file_path)
+    origin = "snapshot"
+    if df is None:
+        df = _parse_source(name, file_path)
+        origin = "excel"
+    return LoadedDataset(
+        name=name, path=file_path, version=version, df=df, index=source.indexer(df), origin=origin,
+    )
+
+
+def load_datasets() -> None:
+    """Kayıtlı tüm veri setlerini okuyup belleğe alır. Okunamayanlar ilk erişimde tekrar denenir."""
+    for name in DATASET_SOURCES:
+        try:
+            ds = _load_dataset(name)
+        except Exception as e:
+            logger.warning("Veri seti yüklenemedi (%s): %s", name, e)
+            continue
+        with _DATASETS_LOCK:
+            _DATASETS[name] = ds
+
+
+def _get_dataset(name: str) -> LoadedDataset:
+    """Güncel veri setini döner.
+
+    Kaynak dosyanın mtime/boyutu yüklendiği andan farklıysa (TÜİK güncellemesi)
+    ya da veri seti hiç yüklenmemişse burada yeniden okunur.
+    """
+    file_path = DATA_PATH / DATASET_SOURCES[name].file_name
+    version = _file_version(file_path)
+    ds = _DATASETS.get(name)
+    if ds is not None and ds.version == version:
+        return ds
+    with _DATASETS_LOCK:
+        ds = _DATASETS.get(name)
+        if ds is None or ds.version != version:
+            if ds is not None:
+                logger.info("Veri dosyası değişti, yeniden yükleniyor: %s", file_path.name)
+            ds = _load_dataset(name)
+            _DATASETS[name] = ds
+        return ds
+
+
+def _dataset(name: str) -> pd.DataFrame:
+    """Bellekteki veri setinin DataFrame'ini döner.
+
+    Dönen DataFrame paylaşımlıdır, çağıran taraf değiştirmemelidir.
+    """
+    return _get_dataset(name).df
+
+
+def invalidate_datasets(names: list[str] | None = None) -> list[str]:
+    """Verilen (veya tüm) veri setlerini ve kaynak dosyalarının önbellek kayıtlarını düşürür.
+
+    Veri setleri bir sonraki erişimde yeniden okunur. Düşürülen adları döner.
+    """
+    targets = list(DATASET_SOURCES) if names is None else names
+    with _DATASETS_LOCK:
+        for name in targets:
+            _DATASETS.pop(name, None)
+            clear_excel_cache(DATA_PATH / DATASET_SOURCES[name].file_name)
+    return targets
+
+
+# -------------------- Ölçüm: aşama süreleri ve /metrics --------------------
+# Hesaplamalar aşama sürelerini record_timing ile bildirir. Ağır iş havuzunda
+# çalışan bir işin süreleri işle birlikte geri taşınır (süreç havuzunda da);
+# ana süreçte histogramlara yazılır ve isteğin Server-Timing başlığına eklenir.
+# İş dışında (açılışta yükleme gibi) ölçülen süreler doğrudan histograma gider.
+
+_TIMING_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PROFILE_TOP_N = int(os.environ.get("PROFILE_TOP_N", 40))
+
+
+class Histogram:
+    """Tek etiketli, Prometheus metin biçiminde yazılabilen süre histogramı."""
+
+    def __init__(self, name: str, help_text: str, label: str, buckets: tuple[float, ...] = _TIMING_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self._series: dict[str, list] = {}  # etiket -> [kova sayıları, toplam, adet]
+        self._lock = threading.Lock()
+
+    def observe(self, label_value: str, seconds: float) -> None:
+        with self._lock:
+            series = self._series.setdefault(label_value, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[0][i] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for value, (counts, total, count) in sorted(self._series.items()):
+                label = f'{self.label}="{value.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                for bound, n in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{{{label},le="{bound:g}"}} {n}')
+                lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {count}')
+                lines.append(f"{self.name}_sum{{{label}}} {total:.6f}")
+                lines.append(f"{self.name}_count{{{label}}} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("anka_stage_seconds", "Hesaplama aşamalarının süresi (sn)", "stage")
+EXCEL_PARSE_SECONDS = Histogram("anka_excel_parse_seconds", "Excel sayfası ayrıştırma süresi (sn)", "file")
+REQUEST_SECONDS = Histogram("anka_request_seconds", "Veri uç noktalarının yanıt süresi (sn)", "route")
+_TIMING_METRICS = {"stage": STAGE_SECONDS, "excel": EXCEL_PARSE_SECONDS}
+
+# İşçide çalışan işin ölçümleri: (tür, etiket, sn) listesi
+_JOB_TIMINGS: ContextVar[list | None] = ContextVar("job_timings", default=None)
+# İsteğin Server-Timing için topladığı aşama -> sn
+_REQUEST_TIMINGS: ContextVar[dict | None] = ContextVar("request_timings", default=None)
+# ?profile=1 isteklerinde profil özetlerinin toplandığı liste
+_PROFILE_OUTPUT: ContextVar[list | None] = ContextVar("profile_output", default=None)
+# İşçide profil altında çalışılıyor mu (yanıt önbelleği atlanır)
+_JOB_PROFILING: ContextVar[bool] = ContextVar("job_profiling", default=False)
+
+
+def record_timing(kind: str, label: str, seconds: float) -> None:
+    """Bir ölçümü (kind: "stage" ya da "excel") içinde bulunulan işe ya da doğrudan histograma yazar."""
+    events = _JOB_TIMINGS.get()
+    if events is not None:
+        events.append((kind, label, seconds))
+    else:
+        _TIMING_METRICS[kind].observe(label, seconds)
+
+
+class StageTimer:
+    """Ardışık aşamaları ölçer: her çağrı, bir önceki çağrıdan bu yana geçen süreyi o aşamaya yazar."""
+
+    def __init__(self) -> None:
+        self._last = time.perf_counter()
+
+    def __call__(self, stage: str) -> None:
+        now = time.perf_counter()
+        record_timing("stage", stage, now - self._last)
+        self._last = now
+
+
+def _timed_call(func: Callable[..., Any], args: tuple, profile: bool = False) -> tuple[Any, list, str | None]:
+    """func(*args)'ı ölçümleri toplayarak (ve istenirse cProfile altında) çalıştırır."""
+    events: list = []
+    token = _JOB_TIMINGS.set(events)
+    profiling_token = _JOB_PROFILING.set(profile)
+    profiler = cProfile.Profile() if profile else None
+    try:
+        if profiler is not None:
+            profiler.enable()
+        try:
+            result = func(*args)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+    finally:
+        _JOB_TIMINGS.reset(token)
+        _JOB_PROFILING.reset(profiling_token)
+    summary = None
+    if profiler is not None:
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(PROFILE_TOP_N)
+        summary = stream.getvalue()
+    return result, events, summary
+
+
+def _note_timings(events: list) -> None:
+    """İşin ölçümlerini isteğin Server-Timing toplamlarına ekler."""
+    timings = _REQUEST_TIMINGS.get()
+    if timings is None:
+        return
+    for kind, label, seconds in events:
+        name = label if kind == "stage" else kind
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+def _server_timing(timings: dict[str, float], total: float) -> str:
+    parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items()]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+@app.get("/metrics")
+def metrics():
+    lines = []
+    for histogram in (REQUEST_SECONDS, STAGE_SECONDS, EXCEL_PARSE_SECONDS):
+        lines.extend(histogram.render())
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# -------------------- Ağır işler için yürütme katmanı --------------------
+# Excel ayrıştırma ve pandas hesapları olay döngüsünü ve Starlette'in varsayılan
+# iş parçacığı havuzunu (statik dosyalar da onu kullanır) tıkamasın diye ayrı bir
+# havuzda, eşzamanlılığı semaforla sınırlanarak çalıştırılır.
+#   HEAVY_EXECUTOR=thread|process   havuz türü (varsayılan thread)
+#   HEAVY_WORKERS                   havuzdaki işçi sayısı
+#   HEAVY_MAX_CONCURRENCY           aynı anda çalışan/bekleyen ağır iş sınırı
+
+HEAVY_EXECUTOR = os.environ.get("HEAVY_EXECUTOR", "thread")
+HEAVY_WORKERS = int(os.environ.get("HEAVY_WORKERS", min(8, os.cpu_count() or 4)))
+HEAVY_MAX_CONCURRENCY = int(os.environ.get("HEAVY_MAX_CONCURRENCY", HEAVY_WORKERS))
+
+_HEAVY_EXECUTOR: Executor | None = None
+_HEAVY_SEMAPHORE: asyncio.Semaphore | None = None
+_HEAVY_EXECUTOR_LOCK = threading.Lock()
+
+
+def _worker_context() -> multiprocessing.context.BaseContext:
+    # Süreç havuzları forkserver (yoksa spawn) ile açılır: sunucu çok iş parçacıklı
+    # çalışırken fork edilen alt süreç başka bir iş parçacığının tuttuğu kilitte kalabilir
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def _heavy_executor() -> Executor:
+    global _HEAVY_EXECUTOR
+    if _HEAVY_EXECUTOR is None:
+        with _HEAVY_EXECUTOR_LOCK:
+            if _HEAVY_EXECUTOR is None:
+                if HEAVY_EXECUTOR == "process":
+                    _HEAVY_EXECUTOR = ProcessPoolExecutor(
+                        max_workers=HEAVY_WORKERS, mp_context=_worker_context(), initializer=_init_heavy_worker,
+                    )
+                else:
+                    _HEAVY_EXECUTOR = ThreadPoolExecutor(max_workers=HEAVY_WORKERS, thread_name_prefix="heavy")
+    return _HEAVY_EXECUTOR
+
+
+def start_heavy_executor() -> None:
+    """Havuzu açar; süreç havuzunda tüm işçiler veriyi yükleyene kadar bekler (açılışta ve veri yenilemede).
+
+    Süreç havuzunun işçileri veriyi anlık görüntüden yükler; görüntü önce güncellenir.
+    """
+    if HEAVY_EXECUTOR == "process":
+        ensure_snapshot()
+    executor = _heavy_executor()
+    if HEAVY_EXECUTOR == "process":
+        for future in [executor.submit(int) for _ in range(HEAVY_WORKERS)]:
+            future.result()
+
+
+def restart_heavy_executor() -> None:
+    """Süreç havuzunu yenilenen veriyi yükleyen yeni işçilerle değiştirir.
+
+    Süren ve kuyruktaki işler eski işçilerde tamamlanır, yeni işler yeni havuza
+    gider. İş parçacığı havuzu veriyi API süreciyle paylaştığından yenilenmez.
+    """
+    global _HEAVY_EXECUTOR
+    if HEAVY_EXECUTOR != "process":
+        return
+    with _HEAVY_EXECUTOR_LOCK:
+        old, _HEAVY_EXECUTOR = _HEAVY_EXECUTOR, None
+    if old is not None:
+        old.shutdown(wait=False)
+    start_heavy_executor()
+
+
+def _init_heavy_worker() -> None:
+    # forkserver/spawn ile açılan işçi veriyi kendisi yükler (anlık görüntü güncelse oradan)
+    load_datasets()
+
+
+def shutdown_heavy_executor() -> None:
+    global _HEAVY_EXECUTOR, _HEAVY_SEMAPHORE
+    with _HEAVY_EXECUTOR_LOCK:
+        if _HEAVY_EXECUTOR is not None:
+            _HEAVY_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+        _HEAVY_EXECUTOR = None
+        _HEAVY_SEMAPHORE = None
+
+
+async def _run_heavy_timed(func: Callable[..., Any], args: tuple, profile: bool = False) -> tuple[Any, list, str | None]:
+    global _HEAVY_SEMAPHORE
+    if _HEAVY_SEMAPHORE is None:
+        _HEAVY_SEMAPHORE = asyncio.Semaphore(HEAVY_MAX_CONCURRENCY)
+    async with _HEAVY_SEMAPHORE:
+        loop = asyncio.get_running_loop()
+        result, events, summary = await loop.run_in_executor(
+            _heavy_executor(), functools.partial(_timed_call, func, args, profile),
+        )
+    # Histogramlara iş başına bir kez yazılır (single-flight bekleyenleri tekrar yazmaz)
+    for kind, label, seconds in events:
+        _TIMING_METRICS[kind].observe(label, seconds)
+    return result, events, summary
+
+
+async def run_heavy(func: Callable[..., Any], *args: Any) -> Any:
+    """Bloklayan işi ağır iş havuzunda çalıştırır ve sonucunu bekler.
+
+    Süreç havuzunda func modül düzeyinde tanımlı, argümanlar ve sonuç pickle'lanabilir olmalıdır.
+    """
+    profile_output = _PROFILE_OUTPUT.get()
+    result, events, summary = await _run_heavy_timed(func, args, profile=profile_output is not None)
+    _note_timings(events)
+    if summary is not None:
+        profile_output.append(summary)
+    return result
+
+
+async def run_local_heavy(func: Callable[..., Any], *args: Any) -> Any:
+    """run_heavy gibi olay döngüsü dışında çalıştırır, ama her zaman bu süreçte.
+
+    Sonucu bu sürecin nesneleri olması gereken işler içindir (ör. önbellek
+    anahtarı olan veri seti ve ara tablo nesneleri); HEAVY_EXECUTOR=process iken
+    iş parçacığında çalışır.
+    """
+    if HEAVY_EXECUTOR != "process":
+        return await run_heavy(func, *args)
+    result, events, _ = await asyncio.to_thread(_timed_call, func, args)
+    for kind, label, seconds in events:
+        _TIMING_METRICS[kind].observe(label, seconds)
+    _note_timings(events)
+    return result
+
+
+# Aynı anahtarla eşzamanlı gelen istekler tek hesaplamayı bekler (single-flight).
+# Popüler bir il aynı anda çok kullanıcı tarafından açıldığında hesap bir kez yapılır.
+_IN_FLIGHT: dict[tuple, asyncio.Task] = {}
+
+
+async def run_single_flight(key: tuple, func: Callable[..., Any], *args: Any) -> Any:
+    """`key` için süren bir hesap varsa onun sonucunu paylaşır, yoksa run_heavy ile başlatır.
+
+    Hesap ayrı bir görevde yürür; isteği başlatan istemci bağlantıyı kesse de
+    bekleyen diğer istekler sonucu alır.
+    """
+    if _PROFILE_OUTPUT.get() is not None:
+        # Profil isteği kendi hesabını yapar, başkasının sonucunu paylaşmaz
+        return await run_heavy(func, *args)
+    task = _IN_FLIGHT.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_run_heavy_timed(func, args))
+        _IN_FLIGHT[key] = task
+
+        def _forget(done: asyncio.Task) -> None:
+            if _IN_FLIGHT.get(key) is done:
+                del _IN_FLIGHT[key]
+
+        task.add_done_callback(_forget)
+    result, events, _ = await asyncio.shield(task)
+    _note_timings(events)
+    return result
+
+
+# -------------------- Çok illi işlerin süreç havuzuna dağıtılması --------------------
+# /oneriler_tumu ve /saglik_test gibi uç noktalarda iller birbirinden bağımsızdır.
+# FANOUT_WORKERS > 0 iken iller parçalara bölünüp ayrı bir süreç havuzunda
+# hesaplanır. İşçiler forkserver (yoksa spawn) ile açılır (_worker_context) ve
+# veriyi Arrow anlık görüntüsünden bellek eşlemli yükler; görüntü eksik ya da
+# bayatsa havuz açılmadan önce ana süreçteki tablolardan yazılır (ensure_snapshot).
+# Havuz çöken işçiden ya da veri yenilemeden sonra yeniden açılır.
+# 0 ise (varsayılan) iş tek parça halinde ağır iş havuzunda çalışır.
+#   FANOUT_WORKERS   süreç sayısı (0: kapalı)
+#   FANOUT_CHUNK     bir işçiye tek seferde gönderilen il sayısı
+
+FANOUT_WORKERS = int(os.environ.get("FANOUT_WORKERS", 0))
+FANOUT_CHUNK = int(os.environ.get("FANOUT_CHUNK", 4))
+
+_FANOUT_EXECUTOR: ProcessPoolExecutor | None = None
+_FANOUT_EXECUTOR_LOCK = threading.Lock()
+
+
+def _fanout_executor() -> ProcessPoolExecutor:
+    """Havuzu gerekirse açar; işçiler ilk işlerle birlikte arka planda başlar, çağıran beklemez."""
+    global _FANOUT_EXECUTOR
+    if _FANOUT_EXECUTOR is None:
+        with _FANOUT_EXECUTOR_LOCK:
+            if _FANOUT_EXECUTOR is None:
+                _FANOUT_EXECUTOR = ProcessPoolExecutor(
+                    max_workers=FANOUT_WORKERS,
+                    mp_context=_worker_context(),
+                    initializer=_init_heavy_worker,
+                )
+    return _FANOUT_EXECUTOR
+
+
+def ensure_snapshot() -> list[str]:
+    """Anlık görüntüde eksik ya da bayat veri setlerini bellekteki tablolardan yazar; yazılanları döner.
+
+    Süreç havuzu işçileri veriyi görüntüden bellek eşlemli okur, Excel'i yeniden
+    ayrıştırmaz. Görüntü yazılamazsa (pyarrow yok, dizin salt okunur) işçiler Excel'e döner.
+    """
+    if pa is None:
+        logger.warning("pyarrow kurulu değil; süreç havuzu işçileri veriyi Excel'den okuyacak")
+        return []
+    frames = {}
+    for name in _stale_snapshot_entries():
+        try:
+            frames[name] = _get_dataset(name).df
+        except Exception as e:
+            logger.warning("Veri seti görüntüye yazılamadı (%s): %s", name, e)
+    if frames:
+        try:
+            write_snapshot(list(frames), SNAPSHOT_PATH, frames)
+        except OSError as e:
+            logger.warning("Anlık görüntü yazılamadı, işçiler Excel'den okuyacak: %s", e)
+            return []
+    return list(frames)
+
+
+def start_fanout_executor() -> None:
+    """Havuzu açar ve tüm işçiler veriyi yükleyene kadar bekler (açılışta ve veri yenilemede).
+
+    İşçiler açılmadan önce anlık görüntü güncellenir; her işçi veriyi oradan yükler.
+    """
+    written = ensure_snapshot()
+    if written:
+        logger.info("Süreç havuzu için anlık görüntü güncellendi: %s", ", ".join(written))
+    executor = _fanout_executor()
+    for future in [executor.submit(int) for _ in range(FANOUT_WORKERS)]:
+        future.result()
+
+
+def shutdown_fanout_executor() -> None:
+    global _FANOUT_EXECUTOR
+    with _FANOUT_EXECUTOR_LOCK:
+        if _FANOUT_EXECUTOR is not None:
+            _FANOUT_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+        _FANOUT_EXECUTOR = None
+
+
+def _fanout_chunk(func: Callable[..., Any], keys: list[str], args: tuple) -> list[Any]:
+    """İşçide bir parça ili sırayla hesaplar; bir ilin hatası yalnızca o ilin sonucu olur."""
+    rows = []
+    for key in keys:
+        try:
+            rows.append(func(key, *args))
+        except Exception as e:
+            rows.append({"il": key, "error": f"Bir hata oluştu: {str(e)}"})
+    return rows
+
+
+async def fan_out(func: Callable[..., Any], keys: list[str], *args: Any) -> list[Any]:
+    """func(key, *args) sonuçlarını keys sırasıyla döner.
+
+    Süreç havuzunda func modül düzeyinde tanımlı, argümanlar ve sonuç
+    pickle'lanabilir olmalıdır. İşçi süreci çökerse o parçanın illeri hata
+    satırı olur; havuz bir sonraki işte yeniden açılır (yeni işçiler veriyi yükler).
+    """
+    if not keys:
+        return []
+    if FANOUT_WORKERS <= 0:
+        return await run_heavy(_fanout_chunk, func, keys, args)
+    profile = _PROFILE_OUTPUT.get() is not None
+    executor = _fanout_executor()
+    loop = asyncio.get_running_loop()
+    chunks = [keys[i:i + FANOUT_CHUNK] for i in range(0, len(keys), max(1, FANOUT_CHUNK))]
+    done = await asyncio.gather(*(
+        loop.run_in_executor(executor, functools.partial(_timed_call, _fanout_chunk, (func, chunk, args), profile))
+        for chunk in chunks
+    ), return_exceptions=True)
+    rows: list[Any] = []
+    for chunk, outcome in zip(chunks, done):
+        if isinstance(outcome, BaseException):
+            logger.warning("Süreç havuzundaki iş başarısız (%s): %s", ", ".join(chunk), outcome)
+            if isinstance(outcome, BrokenProcessPool):
+                shutdown_fanout_executor()
+            rows.extend({"il": key, "error": f"Bir hata oluştu: {str(outcome)}"} for key in chunk)
+            continue
+        result, events, summary = outcome
+        for kind, label, seconds in events:
+            _TIMING_METRICS[kind].observe(label, seconds)
+        _note_timings(events)
+        if summary is not None:
+            _PROFILE_OUTPUT.get().append(summary)
+        rows.extend(result)
+    return rows
+
+
+# -------------------- NDJSON akışı --------------------
+# Çok illi uç noktaların ?stream=1 modu: iller ağır iş havuzunda eşzamanlı
+# hesaplanır, biten her il hemen bir satır olarak gönderilir. İstemci ilk ili
+# tüm liste bitmeden alır; sunucu tam yanıtı bellekte birleştirmez.
+
+
+def ndjson_response(
+    keys: list[str],
+    func: Callable[..., Any],
+    *args: Any,
+    summary: Callable[[list[Any]], Any] | None = None,
+) -> StreamingResponse:
+    """Her anahtar için func(key, *args) sonucunu (fan_out ile) tamamlanma sırasıyla NDJSON satırı olarak yazar.
+
+    Bir ilin hatası akışı kesmez, {"il": ..., "error": ...} satırı olur. summary
+    verilirse tüm satırlardan üretilen son satırı döner. İstemci bağlantıyı
+    keserse bekleyen işler iptal edilir.
+    """
+    async def one(key: str) -> Any:
+        return (await fan_out(func, [key], *args))[0]
+
+    async def lines():
+        tasks = [asyncio.ensure_future(one(key)) for key in keys]
+        rows = []
+        try:
+            for done in asyncio.as_completed(tasks):
+                row = await done
+                rows.append(row)
+                yield render_json(row) + b"\n"
+            if summary is not None:
+                yield render_json(summary(rows)) + b"\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers={"Cache-Control": "no-store"})
+
+
+# -------------------- HTTP önbellekleme --------------------
+# Yanıtlar yalnızca kaynak dosyalar (ve bu kod) değişince değişir. ETag, yanıtı
+# besleyen dosyaların sürümünden (mtime, boyut) türetilir; If-None-Match tutarsa
+# hiç hesaplama yapılmadan 304 döner.
+
+API_CACHE_MAX_AGE = int(os.environ.get("API_CACHE_MAX_AGE", 300))
+
+_CODE_VERSION = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()[:12]
+
+
+def _source_versions(deps: list[str]) -> list[FileVersion]:
+    return [_file_version(DATA_PATH / DATASET_SOURCES[name].file_name) for name in deps]
+
+
+def _response_etag(request: Request, versions: list[FileVersion]) -> str:
+    h = hashlib.sha256()
+    h.update(_CODE_VERSION.encode())
+    h.update(request.url.path.encode())
+    h.update(str(sorted(request.query_params.multi_items())).encode())
+    h.update(str(versions).encode())
+    # Sıkıştırma gibi dönüşümlerde de geçerli kalsın diye zayıf ETag
+    return f'W/"{h.hexdigest()[:24]}"'
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    """Yalnızca If-None-Match'e bakar. If-Modified-Since yok sayılır: Last-Modified veri
+    dosyalarının zamanıdır, çıktıyı değiştiren bir kod güncellemesini göremez."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def _is_error_payload(content: Any) -> bool:
+    return isinstance(content, dict) and "error" in content
+
+
+# Hata yanıtları geçici olabilir ("Bir hata oluştu: ..."): doğrulayıcı taşımaz, saklanmaz
+_ERROR_HEADERS = {"Cache-Control": "no-store"}
+
+
+# -------------------- Sıkıştırma --------------------
+# Eşikten büyük JSON gövdeleri istemcinin Accept-Encoding başlığına göre br ya
+# da gzip ile sıkıştırılır. Hesaplanan gövdeler ETag'leriyle birlikte bellekte
+# tutulur; sıkıştırılmış sürümleri de ilk istendiklerinde yanlarına eklenir.
+# Aynı ETag'li sonraki istekler ne hesaplama ne serileştirme ne sıkıştırma yapar.
+
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", 5))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", 6))
+BODY_CACHE_SIZE = int(os.environ.get("BODY_CACHE_SIZE", 256))
+
+
+@dataclass
+class EncodedBody:
+    identity: bytes
+    encoded: dict[str, bytes] = field(default_factory=dict)   # "br"/"gzip" -> gövde
+
+    def get(self, encoding: str) -> bytes:
+        body = self.encoded.get(encoding)
+        if body is None:
+            if encoding == "br":
+                body = brotli.compress(self.identity, quality=BROTLI_QUALITY)
+            else:
+                body = gzip.compress(self.identity, compresslevel=GZIP_LEVEL, mtime=0)
+            self.encoded[encoding] = body
+        return body
+
+
+# ETag -> gövde
+_BODIES: OrderedDict[str, EncodedBody] = OrderedDict()
+_BODIES_LOCK = threading.Lock()
+
+
+def _cached_body(etag: str) -> EncodedBody | None:
+    with _BODIES_LOCK:
+        body = _BODIES.get(etag)
+        if body is not None:
+            _BODIES.move_to_end(etag)
+        return body
+
+
+def _store_body(etag: str, body: EncodedBody) -> None:
+    with _BODIES_LOCK:
+        _BODIES[etag] = body
+        _BODIES.move_to_end(etag)
+        while len(_BODIES) > BODY_CACHE_SIZE:
+            _BODIES.popitem(last=False)
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    """Accept-Encoding başlığından kullanılacak kodlama: br (kuruluysa), gzip ya da None."""
+    if not accept_encoding:
+        return None
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    supported = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best = None
+    for encoding in supported:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > 0 and (best is None or q > best[1]):
+            best = (encoding, q)
+    return best[0] if best else None
+
+
+def encoded_response(request: Request, body: EncodedBody, headers: dict[str, str]) -> Response:
+    """Gövdeyi, eşikten büyükse istemcinin kabul ettiği kodlamayla döner."""
+    headers = {**headers, "Vary": "Accept-Encoding"}
+    encoding = negotiate_encoding(request.headers.get("accept-encoding")) \
+        if len(body.identity) >= COMPRESS_MIN_SIZE else None
+    if encoding is None:
+        return Response(body.identity, media_type="application/json", headers=headers)
+    headers["Content-Encoding"] = encoding
+    return Response(body.get(encoding), media_type="application/json", headers=headers)
+
+
+async def cached_json(
+    request: Request,
+    deps: list[str],
+    compute: Callable[[], Awaitable[Any]],
+    materialized: str | None = None,
+) -> Response:
+    """`compute()` sonucunu ETag/Last-Modified/Cache-Control ile döner.
+
+    deps yanıtı besleyen veri setleridir. İstemcideki sürüm güncelse compute çağrılmaz.
+    materialized, önceden üretilmiş paket içindeki dosyanın göreli yoludur; paket
+    modu açıksa ve paket güncelse yanıt hesaplanmadan dosyadan verilir.
+    Yanıt Server-Timing başlığında hesaplama aşamalarının sürelerini taşır;
+    ?profile=1 ile önbellekler atlanır ve hesaplamanın cProfile özeti döner.
+    """
+    start = time.perf_counter()
+    timings: dict[str, float] = {}
+    _REQUEST_TIMINGS.set(timings)
+    route = request.scope.get("route")
+    try:
+        if request.query_params.get("profile") == "1":
+            _check_admin_token(request.headers.get("x-admin-token"))
+            return await _profiled_response(compute, timings, start)
+        response = await _cached_json_response(request, deps, compute, materialized)
+    finally:
+        REQUEST_SECONDS.observe(route.path if route is not None else request.url.path, time.perf_counter() - start)
+    response.headers["Server-Timing"] = _server_timing(timings, time.perf_counter() - start)
+    return response
+
+
+async def _profiled_response(compute: Callable[[], Awaitable[Any]], timings: dict[str, float], start: float) -> Response:
+    summaries: list[str] = []
+    _PROFILE_OUTPUT.set(summaries)
+    await compute()
+    total = time.perf_counter() - start
+    lines = [f"Toplam: {total * 1000:.2f} ms", "Aşamalar (ms):"]
+    lines.extend(f"  {name:20s} {seconds * 1000:10.2f}" for name, seconds in timings.items())
+    body = "\n".join(lines) + "\n\n" + "\n".join(summaries)
+    return PlainTextResponse(body, headers={
+        "Cache-Control": "no-store",
+        "Server-Timing": _server_timing(timings, total),
+    })
+
+
+async def _cached_json_response(
+    request: Request,
+    deps: list[str],
+    compute: Callable[[], Awaitable[Any]],
+    materialized: str | None,
+) -> Response:
+    try:
+        versions = _source_versions(deps)
+    except FileNotFoundError:
+        # Kaynak eksik: hata yanıtı önbelleğe alınmasın
+        return encoded_response(request, EncodedBody(render_json(await compute())), _ERROR_HEADERS)
+
+    etag = _response_etag(request, versions)
+    last_modified = max(v[0] for v in versions) / 1e9 if versions else time.time()
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        "Cache-Control": f"public, max-age={API_CACHE_MAX_AGE}",
+    }
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={**headers, "Vary": "Accept-Encoding"})
+    encoded = _cached_body(etag)
+    if encoded is None:
+        body = _materialized_body(materialized, deps, versions) if materialized and SERVE_MATERIALIZED else None
+        if body is None:
+            content = await compute()
+            body = render_json(content)
+            error = _is_error_payload(content)
+        else:
+            error = body.startswith(b'{"error"')
+        encoded = EncodedBody(body)
+        if error:
+            # Sıkıştırılabilir ama ETag'le saklanmaz; sonraki istek yeniden hesaplar
+            return encoded_response(request, encoded, _ERROR_HEADERS)
+        _store_body(etag, encoded)
+    return encoded_response(request, encoded, headers)
+
+
+# -------------------- Önceden üretilmiş yanıtlar --------------------
+# `python -m materialize` tüm illerin yanıtlarını MATERIALIZED_PATH/<sürüm>/ altına
+# JSON olarak yazar ve CURRENT dosyasını o sürüme çevirir. SERVE_MATERIALIZED=1
+# iken uç noktalar, paket kaynak dosyaların güncel sürümünden üretilmişse yanıtı
+# dosyadan (önünde bir LRU ile) verir; değilse canlı hesaplamaya döner.
+
+MATERIALIZED_PATH = Path(os.environ.get("MATERIALIZED_PATH", Path(__file__).parent / "materialized"))
+SERVE_MATERIALIZED = os.environ.get("SERVE_MATERIALIZED", "0") == "1"
+MATERIALIZED_LRU_SIZE = int(os.environ.get("MATERIALIZED_LRU_SIZE", 512))
+
+_MATERIALIZED_MANIFEST: tuple[FileVersion, dict] | None = None
+
+
+def materialized_file(kind: str, key: str | None = None) -> str:
+    """Paket içindeki göreli dosya yolu: <tür>.json ya da <tür>/<il anahtarı>.json."""
+    if key is None:
+        return f"{kind}.json"
+    return f"{kind}/{urllib.parse.quote(key, safe='')}.json"
+
+
+def _materialized_manifest() -> dict | None:
+    """CURRENT'in gösterdiği paketin manifesti; CURRENT değişince yeniden okunur."""
+    global _MATERIALIZED_MANIFEST
+    current = MATERIALIZED_PATH / "CURRENT"
+    try:
+        version = _file_version(current)
+        if _MATERIALIZED_MANIFEST is None or _MATERIALIZED_MANIFEST[0] != version:
+            bundle = MATERIALIZED_PATH / current.read_text(encoding="utf-8").strip()
+            manifest = json.loads((bundle / "manifest.json").read_text(encoding="utf-8"))
+            manifest["path"] = str(bundle)
+            _MATERIALIZED_MANIFEST = (version, manifest)
+        return _MATERIALIZED_MANIFEST[1]
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+@functools.lru_cache(maxsize=MATERIALIZED_LRU_SIZE)
+def _read_materialized(path: str) -> bytes | None:
+    try:
+        return Path(path).read_bytes()
+    except FileNotFoundError:
+        return None
+
+
+def _materialized_body(rel_path: str, deps: list[str], versions: list[FileVersion]) -> bytes | None:
+    manifest = _materialized_manifest()
+    if manifest is None or manifest.get("code") != _CODE_VERSION:
+        return None
+    sources = manifest.get("sources", {})
+    if any(tuple(sources.get(name, ())) != version for name, version in zip(deps, versions)):
+        return None
+    return _read_materialized(str(Path(manifest["path"]) / rel_path))
+
+
+def write_materialized(out_dir: Path = MATERIALIZED_PATH, keep: int = 2) -> dict:
+    """Tüm illerin yanıtlarını yeni bir sürüm dizinine yazar ve CURRENT'i ona çevirir.
+
+    keep, diskte tutulacak en fazla paket sayısıdır (güncel paket dahil).
+    """
+    names = list(DATASET_SOURCES)
+    versions = _source_versions(names)
+    h = hashlib.sha256()
+    h.update(_CODE_VERSION.encode())
+    h.update(str(versions).encode())
+    version = h.hexdigest()[:16]
+    bundle = out_dir / version
+    tmp_bundle = out_dir / f"{version}.tmp"
+    shutil.rmtree(tmp_bundle, ignore_errors=True)
+
+    def write(rel_path: str, content: Any) -> None:
+        target = tmp_bundle / rel_path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(render_json(content))
+
+    count = 0
+    for il_adi in province_names():
+        key = _normalize_text(il_adi)
+        write(materialized_file("gsyh", key), get_gsyh(il_adi))
+        write(materialized_file("gsyh_reel", key), get_gsyh_reel(il_adi))
+        write(materialized_file("oneri", key), get_oneri(il_adi))
+        write(materialized_file("oneriler", il_adi), get_oneriler(il_adi))
+        write(materialized_file("ozet", il_adi), get_il_ozet(il_adi))
+        count += 1
+    write(materialized_file("oneriler_tumu"), get_oneriler_tumu())
+    write(materialized_file("saglik_test"), saglik_test())
+
+    if _source_versions(names) != versions:
+        shutil.rmtree(tmp_bundle, ignore_errors=True)
+        raise RuntimeError("Veri dosyaları üretim sırasında değişti; yeniden çalıştırın")
+    manifest = {
+        "version": version,
+        "code": _CODE_VERSION,
+        "sources": dict(zip(names, versions)),
+        "provinces": count,
+        "built_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    (tmp_bundle / "manifest.json").write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    shutil.rmtree(bundle, ignore_errors=True)
+    os.replace(tmp_bundle, bundle)
+    tmp_current = out_dir / "CURRENT.tmp"
+    tmp_current.write_text(version, encoding="utf-8")
+    os.replace(tmp_current, out_dir / "CURRENT")
+
+    # Eski paketleri temizle; CURRENT'i okumuş istekler için bir önceki sürüm kalır
+    old = sorted(
+        (d for d in out_dir.iterdir() if d.is_dir() and d.name != version and (d / "manifest.json").exists()),
+        key=lambda d: d.stat().st_mtime, reverse=True,
+    )
+    for d in old[max(keep - 1, 0):]:
+        shutil.rmtree(d, ignore_errors=True)
+    return manifest
+
+
+# Uç noktaları besleyen veri setleri
+ONERILER_SOURCES = ["cari", "reel", "tarim", "issizlik", "konut", "yabanci_konut", "saglik_personeli", "nufus"]
+SAGLIK_TEST_SOURCES = ["nufus", "saglik_personeli"]
+
+
+# -------------------- Türetilmiş tablolar --------------------
+# Tüm iller için tek seferde kurulan ara tablolar (DERIVED_TABLES). Her tablo
+# yalnızca bağlı olduğu veri setlerinin yüklü sürümleri için geçerlidir: bir
+# kaynak dosya değişince yalnızca ona bağlı tablolar yeniden kurulur, diğerleri
+# (ve onlardan üretilmiş il yanıtları) önbellekte kalır.
+
+class DerivedTable(NamedTuple):
+    deps: list[str]  # veri setleri; build(*deps) ile kurulur
+    build: Callable[..., Any]
+
+
+# ad -> (kurulduğu veri seti nesneleri, tablo, kurulma zamanı)
+_DERIVED: dict[str, tuple[tuple[LoadedDataset, ...], Any, float]] = {}
+_DERIVED_LOCK = threading.RLock()  # kurucular birbirinin tablosunu isteyebilir
+
+
+def _derived(name: str) -> Any:
+    """DERIVED_TABLES[name] tablosunu, bağlı veri setlerinin yüklü sürümleri için önbellekten döner."""
+    table = DERIVED_TABLES[name]
+    datasets = tuple(_get_dataset(d) for d in table.deps)
+    cached = _DERIVED.get(name)
+    if cached is not None and all(a is b for a, b in zip(cached[0], datasets)):
+        return cached[1]
+    with _DERIVED_LOCK:
+        cached = _DERIVED.get(name)
+        if cached is not None and all(a is b for a, b in zip(cached[0], datasets)):
+            return cached[1]
+        value = table.build(*datasets)
+        _DERIVED[name] = (datasets, value, time.time())
+        return value
+
+
+def affected_tables(datasets: Iterable[str]) -> list[str]:
+    """Verilen veri setlerinden beslenen ara tabloların adları."""
+    changed = set(datasets)
+    return [name for name, table in DERIVED_TABLES.items() if changed.intersection(table.deps)]
+
+
+def rebuild_affected(datasets: Iterable[str]) -> dict[str, str]:
+    """Veri setlerine bağlı ara tabloları hemen yeniden kurar; kurulamayanların hatasını döner."""
+    errors = {}
+    for name in affected_tables(datasets):
+        try:
+            _derived(name)
+        except Exception as e:
+            errors[name] = str(e)
+    return errors
+
+
+def _percentile_rank(series_values: list[float], value: float) -> float:
+    vals = [v for v in series_values if v is not None]
+    if not vals:
+        return 0.0
+    vals_sorted = sorted(vals)
+    pos = bisect.bisect_left(vals_sorted, value)
+    return pos / max(1, len(vals_sorted) - 1) if len(vals_sorted) > 1 else 1.0
+
+
+def _row_keys(ds: LoadedDataset) -> np.ndarray:
+    """Satır indeksinin tersi: her satır için normalize il adı."""
+    keys = np.empty(len(ds.df), dtype=object)
+    for key, rows in ds.index.items():
+        keys[rows] = key
+    return keys
+
+
+def _reel_sector_columns(df_reel: pd.DataFrame, skip_excluded: bool) -> list[tuple[int, str]]:
+    """D,H,L,P,... isim; F,J,N,R,... oran sütunları."""
+    sector_cols: list[tuple[int, str]] = []
+    for rate_idx in range(5, len(df_reel.columns), 4):
+        name_idx = rate_idx - 2
+        if name_idx < 0 or name_idx >= len(df_reel.columns):
+            continue
+        sector_name = str(df_reel.columns[name_idx]).strip()
+        if not sector_name or sector_name.lower() == "nan":
+            continue
+        if skip_excluded and olmayacak_sector_name(sector_name):
+            continue
+        sector_cols.append((rate_idx, sector_name))
+    return sector_cols
+
+
+def _numeric_block(df: pd.DataFrame, positions: list[int]) -> np.ndarray:
+    """Verilen sütunları parse_numbers ile float matrise çevirir (None -> NaN).
+
+    Sütunlar tek diziye açılıp birlikte ayrıştırılır; sütun başına sabit maliyet ödenmez.
+    """
+    if not positions:
+        return np.empty((len(df), 0))
+    cells = df.iloc[:, positions].to_numpy(dtype=object)
+    return parse_numbers(pd.Series(cells.ravel(), dtype=object)).reshape(cells.shape)
+
+
+def _sequential_nansum(stack: list[np.ndarray], shape: tuple[int, ...]) -> tuple[np.ndarray, np.ndarray]:
+    """NaN'leri atlayarak sırayla toplar; Python'daki sum() ile aynı sonucu (aynı sırayla) verir."""
+    total = np.zeros(shape)
+    count = np.zeros(total.shape, dtype=int)
+    for values in stack:
+        present = ~np.isnan(values)
+        total = total + np.where(present, values, 0.0)
+        count = count + present
+    return total, count
+
+
+def _minmax_rows(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Her satırı yalnızca mask'li hücreler üzerinden min-max ölçekler; sabit satırlar 0.5 olur."""
+    vmin = np.where(mask, values, np.inf).min(axis=1, keepdims=True)
+    vmax = np.where(mask, values, -np.inf).max(axis=1, keepdims=True)
+    span = vmax - vmin
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scaled = (values - vmin) / span
+    return np.where(span == 0, 0.5, scaled)
+
+
+@dataclass
+class ReelGrowthTable:
+    """zincir hacim değişim oranlarının uzun biçimi: her eleman bir (il, yıl, sektör, oran) gözlemi.
+
+    Oran sütunları F, J, N, R, ... (4'er atlayarak), sektör adları iki sütun solunda.
+    Gözlemler ile göre gruplu, il içinde dosyanın satır sırasıyla ve satır içinde
+    sütun sırasıyla dizilir; yılı okunamayan satırlar alınmaz. Boş/sayı olmayan
+    oranlar NaN olarak tutulur.
+    """
+    provinces: list[str]                 # il kodu -> normalize il adı
+    sectors: list[str]                   # sektör kodu -> ad (sütun sırası; ad tekrar edebilir)
+    province: np.ndarray
+    year: np.ndarray
+    sector: np.ndarray
+    rate: np.ndarray
+    spans: dict[str, tuple[int, int]]    # il -> gözlem dilimi [başlangıç, bitiş)
+    years: list[int]                     # yıl ekseni (artan)
+    year_sums: np.ndarray                # il × sektör × yıl dolu oran toplamı
+    year_counts: np.ndarray              # il × sektör × yıl dolu oran sayısı
+
+    def slice(self, il_adi: str) -> slice:
+        start, end = self.spans.get(_normalize_text(il_adi), (0, 0))
+        return slice(start, end)
+
+    def grouped_mean(self, years: Iterable[int]) -> np.ndarray:
+        """İl × sektör ortalama oran: yalnızca years içindeki dolu gözlemler, gözlem yoksa NaN.
+
+        Satırlar taranmaz; yıllık toplam/sayı dizileri pencere yılları boyunca (artan
+        sırada) toplanır, maliyet yalnızca pencere uzunluğuna bağlıdır. İl içinde her
+        yıl tek satır ve yıllar artan sırada olduğundan sonuç, satırları sırayla
+        toplayan hesapla birebir aynıdır.
+        """
+        position = {y: k for k, y in enumerate(self.years)}
+        shape = self.year_sums.shape[:2]
+        total = np.zeros(shape)
+        count = np.zeros(shape, dtype=int)
+        for y in sorted(set(years)):
+            k = position.get(y)
+            if k is not None:
+                total = total + self.year_sums[:, :, k]
+                count = count + self.year_counts[:, :, k]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+
+def _build_reel_growth(ds_reel: LoadedDataset) -> ReelGrowthTable:
+    df_reel = ds_reel.df
+    sector_cols = _reel_sector_columns(df_reel, skip_excluded=False)
+    years = extract_years(df_reel.iloc[:, 2])
+    values = _numeric_block(df_reel, [idx for idx, _ in sector_cols])
+
+    provinces = list(ds_reel.index)
+    rows: list[int] = []
+    codes: list[int] = []
+    spans: dict[str, tuple[int, int]] = {}
+    n_sectors = len(sector_cols)
+    for code, key in enumerate(provinces):
+        il_rows = [r for r in ds_reel.index[key] if not np.isnan(years[r])]
+        spans[key] = (len(rows) * n_sectors, (len(rows) + len(il_rows)) * n_sectors)
+        rows.extend(il_rows)
+        codes.extend([code] * len(il_rows))
+    rows_arr = np.asarray(rows, dtype=int)
+    province = np.repeat(np.asarray(codes, dtype=int), n_sectors)
+    year = np.repeat(years[rows_arr], n_sectors)
+    sector = np.tile(np.arange(n_sectors), len(rows_arr))
+    rate = values[rows_arr].ravel()
+
+    # Yıllık toplam/sayı küpü: herhangi bir yıl penceresinin ortalaması buradan kurulur
+    year_axis = np.unique(year).astype(int)
+    present = ~np.isnan(rate)
+    size = len(provinces) * n_sectors * len(year_axis)
+    groups = ((province * n_sectors + sector) * len(year_axis) + np.searchsorted(year_axis, year))[present]
+    shape = (len(provinces), n_sectors, len(year_axis))
+    return ReelGrowthTable(
+        provinces=provinces,
+        sectors=[name for _, name in sector_cols],
+        province=province,
+        year=year,
+        sector=sector,
+        rate=rate,
+        spans=spans,
+        years=year_axis.tolist(),
+        year_sums=np.bincount(groups, weights=rate[present], minlength=size).reshape(shape),
+        year_counts=np.bincount(groups, minlength=size).reshape(shape),
+    )
+
+
+@dataclass
+class NominalTable:
+    """Her ilin en güncel yılına ait cari sektör değerleri (il × sektör, eksik hücre NaN).
+
+    Toplam/GSYH/Vergi gibi agregalar hariçtir. Yıl verisi olmayan illerin satırı tümüyle NaN'dir.
+    """
+    sectors: list[str]
+    provinces: list[str]
+    years: dict[str, int]
+    values: np.ndarray
+
+    def row(self, il_adi: str) -> dict[str, float] | None:
+        """İlin sektör -> değer sözlüğü (sütun sırasıyla); il ya da yılı yoksa None."""
+        key = _normalize_text(il_adi)
+        if key not in self.years:
+            return None
+        values = self.values[self.provinces.index(key)]
+        return {name: float(v) for name, v in zip(self.sectors, values) if not np.isnan(v)}
+
+
+def _build_nominal_table(ds_cari: LoadedDataset) -> NominalTable:
+    """Her il için en güncel yılın ilk satırını seçip sektör değerlerini sayıya çevirir."""
+    lap = StageTimer()
+    df_cari = ds_cari.df
+    cari_sectors: dict[str, int] = {}
+    for pos in range(3, df_cari.shape[1]):
+        sektor_name = str(df_cari.columns[pos]).strip()
+        if not olmayacak_sector_name(sektor_name):
+            cari_sectors[sektor_name] = pos
+    nominal = _numeric_block(df_cari, list(cari_sectors.values()))
+
+    rows = pd.DataFrame({
+        "key": _row_keys(ds_cari),
+        "yil": extract_years(df_cari.iloc[:, 2]),
+        "pos": np.arange(len(df_cari)),
+    }).dropna(subset=["key", "yil"])
+    latest = rows[rows["yil"] == rows.groupby("key")["yil"].transform("max")].groupby("key").head(1)
+    latest_pos = dict(zip(latest["key"], latest["pos"]))
+
+    provinces = list(ds_cari.index)
+    values = np.full((len(provinces), len(cari_sectors)), np.nan)
+    for i, key in enumerate(provinces):
+        if key in latest_pos:
+            values[i] = nominal[latest_pos[key]]
+    lap("nominal_cari")
+    return NominalTable(
+        sectors=list(cari_sectors),
+        provinces=provinces,
+        years={k: int(y) for k, y in zip(latest["key"], latest["yil"])},
+        values=values,
+    )
+
+
+def _nominal_table() -> NominalTable:
+    return _derived("nominal_table")
+
+
+def _nominal_shares(table: NominalTable) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """İl × sektör hacim payları ile her ilin nominal toplamı ve dolu sektör sayısı."""
+    total, count = _sequential_nansum(list(table.values.T), shape=(len(table.provinces),))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return table.values / total[:, None], total, count
+
+
+@dataclass
+class SectorScoreTable:
+    """Tüm iller için sektör cazibe skorları.
+
+    provinces: normalize il adı -> {"error": ...} ya da
+    {"yil", "items"} (items skora göre sıralı).
+    """
+    error: str | None = None
+    provinces: dict[str, dict[str, Any]] = field(default_factory=dict)
+
+
+class ScoreParams(NamedTuple):
+    """Skorun yıl penceresi ve hacim payı ağırlığı (büyümenin ağırlığı 1 - w_share)."""
+    years: tuple[int, ...]
+    w_share: float
+
+    @property
+    def label(self) -> str:
+        return f"{self.years[0]}-{self.years[-1]}" if len(self.years) > 1 else str(self.years[0])
+
+    @property
+    def formula(self) -> str:
+        return (
+            f"{self.w_share:g}×min-max(hacim payı) + "
+            f"{round(1.0 - self.w_share, 6):g}×min-max({self.label} ort. reel büyüme)"
+        )
+
+
+SCORE_YEARS = [2021, 2022, 2023]
+DEFAULT_SCORE_PARAMS = ScoreParams(tuple(SCORE_YEARS), 0.5)
+
+
+def parse_year_range(text: str, name: str = "years", available: Iterable[int] | None = None) -> tuple[int, ...]:
+    """"2019-2023" ya da "2023" -> yıllar. Geçersiz değerde Türkçe mesajlı ValueError verir.
+
+    available verilirse aralık, verideki ilk ve son yıl arasında kalmalıdır.
+    """
+    start, sep, end = text.strip().partition("-")
+    try:
+        first, last = int(start), int(end if sep else start)
+    except ValueError:
+        raise ValueError(f"Geçersiz yıl aralığı; örnek: {name}=2019-2023") from None
+    if first > last:
+        raise ValueError("Geçersiz yıl aralığı; başlangıç yılı bitiş yılından büyük olamaz.")
+    years = sorted(available) if available is not None else []
+    low, high = (years[0], years[-1]) if years else (1900, 2100)
+    if first < low or last > high:
+        raise ValueError(f"Yıl bulunamadı. Geçerli yıllar: {low}-{high}")
+    return tuple(range(first, last + 1))
+
+
+def score_params(years: str | None, w_share: float | None) -> ScoreParams | None:
+    """?years=2019-2023 (ya da tek yıl) ve ?w_share=0.3 sorgusunu çözer; varsayılan için None.
+
+    Geçersiz değerde Türkçe mesajlı ValueError verir.
+    """
+    if years is None:
+        window = DEFAULT_SCORE_PARAMS.years
+    else:
+        try:
+            available = _derived("reel_growth").years
+        except Exception:
+            # Reel veri okunamıyorsa hata yanıtını hesaplama üretir
+            available = None
+        window = parse_year_range(years, available=available)
+    if w_share is None:
+        w_share = DEFAULT_SCORE_PARAMS.w_share
+    elif not 0.0 <= w_share <= 1.0:
+        raise ValueError("w_share 0 ile 1 arasında olmalı.")
+    params = ScoreParams(window, float(w_share))
+    return None if params == DEFAULT_SCORE_PARAMS else params
+
+
+async def score_params_async(years: str | None, w_share: float | None) -> ScoreParams | None:
+    """Uç noktalar için score_params: yıl penceresi verilmişse geçerli yıllar reel
+    büyüme tablosundan okunur, tablo gerekirse olay döngüsü dışında kurulur."""
+    if years is None:
+        return score_params(years, w_share)
+    return await run_heavy(score_params, years, w_share)
+
+
+def _build_sector_scores(ds_cari: LoadedDataset, ds_reel: LoadedDataset,
+                         params: ScoreParams = DEFAULT_SCORE_PARAMS) -> SectorScoreTable:
+    """
+    get_oneriler'in 1-3. adımlarını 81 il için tek geçişte hesaplar:
+    - Hacim: son yılın cari değerleri -> il içindeki pay (il × sektör matrisi)
+    - Trend: params.years reel büyüme ortalaması (yıllık toplam dizilerinden)
+    - Skor: w_share * minmax(hacim payı) + (1 - w_share) * minmax(ort. reel büyüme)
+    Hacim payları ve yıllık diziler parametreden bağımsızdır; başka bir pencere
+    ya da ağırlık yalnızca 2-3. adımları yeniden çalıştırır.
+    """
+    df_cari = ds_cari.df
+    if df_cari.shape[1] < 4:
+        return SectorScoreTable(error="Cari verisi beklenen sütun yapısında değil.")
+
+    # 1) Nominal hacimler: her il için en güncel yılın ilk satırı (get_gsyh ile ortak tablo)
+    nominal_table = _nominal_table()
+    cari_names = nominal_table.sectors
+    provinces = nominal_table.provinces
+    shares, total_nominal, n_nominal = _nominal_shares(nominal_table)
+
+    # 2) Reel büyüme ortalaması
+    lap = StageTimer()
+    df_reel = ds_reel.df
+    reel_ok = df_reel.shape[1] >= 6
+    growth = np.full((len(provinces), 0), np.nan)
+    reel_names: list[str] = []
+    if reel_ok:
+        reel_growth = _derived("reel_growth")
+        kept = [j for j, name in enumerate(reel_growth.sectors) if not olmayacak_sector_name(name)]
+        reel_names = [reel_growth.sectors[j] for j in kept]
+        # Uzun tablodan il × sektör ortalaması, cari illerinin sırasına dizilir
+        mean = reel_growth.grouped_mean(params.years)[:, kept]
+        code_of = {k: i for i, k in enumerate(reel_growth.provinces)}
+        growth = np.full((len(provinces), len(kept)), np.nan)
+        for p, key in enumerate(provinces):
+            if key in code_of:
+                growth[p] = mean[code_of[key]]
+    lap("reel_buyume")
+
+    # 3) Ortak sektörler ve skor
+    common = sorted(set(cari_names) & set(reel_names))
+    share_m = shares[:, [cari_names.index(s) for s in common]] if common else np.empty((len(provinces), 0))
+    growth_m = growth[:, [reel_names.index(s) for s in common]] if common else np.empty((len(provinces), 0))
+    mask = ~np.isnan(share_m) & ~np.isnan(growth_m)
+    w_share = params.w_share
+    score_m = w_share * _minmax_rows(share_m, mask) + (1.0 - w_share) * _minmax_rows(growth_m, mask)
+
+    table = SectorScoreTable()
+    for p, key in enumerate(provinces):
+        if key not in nominal_table.years:
+            table.provinces[key] = {"error": "İl için yıl verisi bulunamadı (cari)"}
+            continue
+        if n_nominal[p] == 0:
+            table.provinces[key] = {"error": "Sektör nominal verisi bulunamadı"}
+            continue
+        if total_nominal[p] <= 0:
+            table.provinces[key] = {"error": "Nominal toplam sıfır veya negatif"}
+            continue
+        if not reel_ok:
+            table.provinces[key] = {"error": "Reel verisi beklenen sütun yapısında değil."}
+            continue
+        if key not in ds_reel.index:
+            table.provinces[key] = {"error": "İl bulunamadı (reel)"}
+            continue
+        if not mask[p].any():
+            table.provinces[key] = {"error": "Ortak sektör bulunamadı (cari + reel)"}
+            continue
+
+        items = []
+        for j in np.flatnonzero(mask[p]):
+            share, growth_avg = float(share_m[p, j]), float(growth_m[p, j])
+            items.append({
+                "sektor": common[j],
+                "score": round(float(score_m[p, j]), 4),
+                "nominal_share": round(share, 6),
+                "avg_reel_growth": round(growth_avg, 6),
+                "rationale": [
+                    f"Hacim payı: {share*100:.1f}%",
+                    f"Ortalama reel büyüme ({params.label}): {growth_avg:.2f}%"
+                ]
+            })
+        items.sort(key=lambda x: x["score"], reverse=True)
+        table.provinces[key] = {
+            "yil": nominal_table.years[key],
+            "items": items,
+        }
+    lap("skor")
+    return table
+
+
+def _sector_scores(params: ScoreParams | None = None) -> SectorScoreTable:
+    """Varsayılan parametreler için ara tablo; diğerleri parametre kümesi başına önbellekte."""
+    if params is None or params == DEFAULT_SCORE_PARAMS:
+        return _derived("sector_scores")
+    return cached_payload(
+        ("sector_scores", params), ["cari", "reel", "nominal_table", "reel_growth"],
+        lambda: _build_sector_scores(_get_dataset("cari"), _get_dataset("reel"), params),
+    )
+
+
+@dataclass
+class PopulationCube:
+    """Nüfus küpü: il × yıl × yaş grubu × cinsiyet (int32, eksik hücre -1).
+
+    Yaş ve cinsiyet eksenlerinin ilk elemanı "toplam"dır. Yıllar azalan sıradadır
+    (dosyadaki gibi), en güncel yıl 0. konumdadır.
+    """
+    provinces: list[str]                 # il adı, nüfus dosyasındaki yazım ve sıra
+    years: list[int]
+    age_groups: list[str]                # "toplam", "0-4", ..., "90+"
+    sexes: list[str]                     # "toplam", "erkek", "kadin"
+    values: np.ndarray
+    rows: dict[str, int]                 # normalize il adı -> satır
+
+    def totals(self, year_pos: int = 0) -> np.ndarray:
+        """Her ilin toplam nüfusu (float, eksikse NaN)."""
+        if not self.years:
+            return np.full(len(self.provinces), np.nan)
+        total = self.values[:, year_pos, 0, 0].astype(float)
+        total[total < 0] = np.nan
+        return total
+
+
+def _population_label(text: str) -> str:
+    # "Toplam-Total" -> "toplam", "Kadın-Female" -> "kadin"; yaş grupları ("0-4", "90+") olduğu gibi
+    head = text.split("-")[0].strip()
+    return text.strip() if head[:1].isdigit() else _indicator_slug(head)
+
+
+def _build_nufus_kupu(ds_nufus: LoadedDataset) -> PopulationCube:
+    """Şehirler 3. satırda E'den başlar. Her yıl bloğunda A yıl, B yaş grubu, C cinsiyet satırlarıdır."""
+    pdf = ds_nufus.df
+    city_row = 2
+    start_col = 4
+    provinces: list[str] = []
+    columns: list[int] = []
+    seen = set()
+    for cidx in range(start_col, pdf.shape[1]):
+        val = pdf.iloc[city_row, cidx] if city_row < len(pdf) else None
+        if val is None:
+            continue
+        name = str(val).strip()
+        if not name or name.lower() == "nan" or _normalize_text(name) in seen:
+            continue
+        seen.add(_normalize_text(name))
+        provinces.append(name)
+        columns.append(cidx)
+
+    body = pdf.iloc[city_row + 1:]
+    year_of_row = pd.Series(extract_years(body.iloc[:, 0])).ffill().to_numpy()
+    texts = [body.iloc[:, c].map(lambda v: "" if pd.isna(v) else str(v).strip()) for c in (1, 2)]
+    age_of_row = texts[0].replace("", np.nan).ffill().fillna("").map(lambda t: _population_label(t) if t else "")
+    sex_of_row = texts[1].map(lambda t: _population_label(t) if t else "")
+    valid = ~np.isnan(year_of_row) & (age_of_row != "").to_numpy() & (sex_of_row != "").to_numpy()
+
+    years = sorted({int(y) for y in year_of_row[valid]}, reverse=True)
+    age_groups = list(dict.fromkeys(age_of_row[valid]))
+    sexes = list(dict.fromkeys(sex_of_row[valid]))
+    numbers = _numeric_block(pdf, columns)[city_row + 1:][valid]
+    values = np.full((len(provinces), len(years), len(age_groups), len(sexes)), -1, dtype=np.int32)
+    y_idx = np.searchsorted(-np.asarray(years), -year_of_row[valid])
+    a_idx = age_of_row[valid].map({a: i for i, a in enumerate(age_groups)}).to_numpy()
+    s_idx = sex_of_row[valid].map({x: i for i, x in enumerate(sexes)}).to_numpy()
+    present = ~np.isnan(numbers)
+    # il × satır matrisini küpe yerleştir (satır başına bir yıl/yaş/cinsiyet hücresi)
+    for p in range(len(provinces)):
+        ok = present[:, p]
+        values[p, y_idx[ok], a_idx[ok], s_idx[ok]] = numbers[ok, p].astype(np.int64)
+    return PopulationCube(
+        provinces=provinces,
+        years=years,
+        age_groups=age_groups,
+        sexes=sexes,
+        values=values,
+        rows={_normalize_text(name): i for i, name in enumerate(provinces)},
+    )
+
+
+def _build_province_names(ds_nufus: LoadedDataset) -> list[str]:
+    # Nüfus küpünün il ekseni: nüfus dosyasındaki yazım ve sıra, normalize ada göre tekil
+    return list(_derived("nufus_kupu").provinces)
+
+
+def province_names() -> list[str]:
+    """81 ilin nüfus dosyasındaki yazımıyla, dosya sırasında listesi."""
+    return _derived("province_names")
+
+
+# get_oneriler'in fırsat bölümünü besleyen il bazlı tablolar: normalize il adı -> değer.
+# Tabloda olmayan il, ilgili verisi bulunamamış il demektir.
+
+def _build_tarim_alan(ds_tarim: LoadedDataset) -> dict[str, float]:
+    """İl -> toplam tarım alanı (iller arası sırası siralama tablosunda)."""
+    values = ds_tarim.df["_alan"]
+    table = {}
+    for key, rows in ds_tarim.index.items():
+        try:
+            table[key] = float(values.iloc[rows[0]])
+        except (TypeError, ValueError):
+            continue
+    return table
+
+
+def _build_issizlik_oran(ds_iss: LoadedDataset) -> dict[str, float]:
+    """İl -> ISSIZLIK_YILI işsizlik oranı (iller arası sırası siralama tablosunda)."""
+    values = ds_iss.df["_rate"]
+    table = {}
+    for key, rows in ds_iss.index.items():
+        try:
+            table[key] = float(values.iloc[rows[0]])
+        except (TypeError, ValueError):
+            continue
+    return table
+
+
+_AYLAR = {
+    "ocak": 1, "subat": 2, "mart": 3, "nisan": 4, "mayis": 5, "haziran": 6,
+    "temmuz": 7, "agustos": 8, "eylul": 9, "ekim": 10, "kasim": 11, "aralik": 12,
+}
+
+
+def _month_number(value) -> int | None:
+    """"Ocak - January" / "Şubat\nFebruary" -> 1 / 2; ay adı değilse None."""
+    if not isinstance(value, str):
+        return None
+    words = _indicator_slug(value).split("_")
+    return _AYLAR.get(words[0]) if words else None
+
+
+@dataclass
+class MonthlySeries:
+    """İl × ay satış serisi. Ay ekseni ilk gözlemden son gözleme kesintisizdir.
+
+    cumsum ve counts birikimli dizilerdir (ilk sütun 0); herhangi bir ay
+    aralığının toplamı iki okumayla bulunur.
+    """
+    provinces: list[str]                 # il adı, dosyadaki yazım
+    months: list[str]                    # "2013-01", ... (artan)
+    values: np.ndarray                   # il × ay, veri yoksa NaN
+    cumsum: np.ndarray                   # il × (ay + 1), NaN'ler 0 sayılır
+    counts: np.ndarray                   # il × (ay + 1), dolu ay sayısı
+    rows: dict[str, int]                 # normalize il adı -> satır
+
+    def offset(self, month: str) -> int:
+        """"YYYY-MM" ayının ilk aya uzaklığı (eksen dışında negatif ya da len(months) üstü olabilir)."""
+        year, mon = map(int, month.split("-"))
+        first_year, first_mon = map(int, self.months[0].split("-"))
+        return (year - first_year) * 12 + (mon - first_mon)
+
+    def position(self, month: str) -> int | None:
+        """"YYYY-MM" ayının eksendeki konumu; eksen dışındaysa None."""
+        if not self.months:
+            return None
+        pos = self.offset(month)
+        return pos if 0 <= pos < len(self.months) else None
+
+    def total(self, row: int, start: int, end: int) -> float | None:
+        """[start, end] aylarının (dahil) toplamı; aralıkta hiç veri yoksa None."""
+        start, end = max(start, 0), min(end, len(self.months) - 1)
+        if start > end or self.counts[row, end + 1] == self.counts[row, start]:
+            return None
+        return float(self.cumsum[row, end + 1] - self.cumsum[row, start])
+
+    def year_totals(self, year: int) -> dict[str, float]:
+        """İl -> yılın aylık satışları toplamı (verisi olan iller)."""
+        if not self.months:
+            return {}
+        start, end = self.offset(f"{year}-01"), self.offset(f"{year}-12")
+        table = {}
+        for key, row in self.rows.items():
+            value = self.total(row, start, end)
+            if value is not None:
+                table[key] = value
+        return table
+
+
+def _monthly_series(names: list[str], province: np.ndarray, year: np.ndarray, month: np.ndarray, value: np.ndarray) -> MonthlySeries:
+    """(il, yıl, ay, değer) gözlemlerinden MonthlySeries kurar; NaN değerler atlanır."""
+    ok = ~np.isnan(value)
+    province, value = province[ok], value[ok]
+    stamp = year[ok].astype(int) * 12 + month[ok].astype(int) - 1
+    first = int(stamp.min()) if len(stamp) else 0
+    n_months = int(stamp.max()) - first + 1 if len(stamp) else 0
+    values = np.full((len(names), n_months), np.nan)
+    values[province, stamp - first] = value
+    filled = ~np.isnan(values)
+    zeros = np.zeros((len(names), 1))
+    return MonthlySeries(
+        provinces=names,
+        months=[f"{(first + i) // 12}-{(first + i) % 12 + 1:02d}" for i in range(n_months)],
+        values=values,
+        cumsum=np.hstack([zeros, np.cumsum(np.where(filled, values, 0.0), axis=1)]),
+        counts=np.hstack([zeros.astype(int), np.cumsum(filled, axis=1)]),
+        rows={_normalize_text(name): i for i, name in enumerate(names)},
+    )
+
+
+def _build_konut_aylik(ds_konut: LoadedDataset) -> MonthlySeries:
+    """Şehirler 3. satırda D'den başlar. Ay satırlarında A yıl (yılın ilk ayında), B ay adıdır.
+
+    Yıllık toplam satırları (B boş) alınmaz; ay ve yıl etiketlerden okunur, satır konumu varsayılmaz.
+    """
+    kdf = ds_konut.df
+    columns = [(str(kdf.iloc[2, cols[0]]).strip(), cols[0]) for key, cols in ds_konut.index.items() if key != "nan"]
+    year = pd.Series(extract_years(kdf.iloc[:, 0])).ffill().to_numpy()
+    month = kdf.iloc[:, 1].map(_month_number).to_numpy(dtype=float)
+    rows = np.flatnonzero(~np.isnan(year) & ~np.isnan(month))
+    numbers = _numeric_block(kdf, [c for _, c in columns])[rows]     # ay satırı × il
+    n_rows, n_prov = numbers.shape
+    return _monthly_series(
+        [name for name, _ in columns],
+        np.tile(np.arange(n_prov), n_rows),
+        np.repeat(year[rows], n_prov),
+        np.repeat(month[rows], n_prov),
+        numbers.ravel(),
+    )
+
+
+def _build_yabanci_konut_aylik(ds_yabanci: LoadedDataset) -> MonthlySeries:
+    """Yıl blokları: A yıl (bloğun ilk satırında), B il, D'den itibaren Ocak-Aralık sütunları.
+
+    Blokta yalnızca en çok satış yapılan iller yer alır; "Toplam - Total" ve
+    "Diğer iller - Other provinces" gibi iki dilli toplam satırları alınmaz.
+    """
+    ydf = ds_yabanci.df
+    month_cols: list[tuple[int, int]] = []
+    for r in range(min(len(ydf), 10)):
+        found = [(c, _month_number(v)) for c, v in enumerate(ydf.iloc[r].tolist())]
+        found = [(c, m) for c, m in found if m is not None]
+        if len(found) >= 6:
+            month_cols = found
+            break
+    year = pd.Series(extract_years(ydf.iloc[:, 0])).ffill().to_numpy()
+    labels = ydf.iloc[:, 1].map(lambda v: "" if pd.isna(v) else str(v).strip())
+    keep = (~np.isnan(year)) & (labels != "").to_numpy() & ~labels.str.contains(" - ", regex=False).to_numpy()
+    rows = np.flatnonzero(keep)
+    names = list(dict.fromkeys(labels.iloc[rows]))
+    code = {name: i for i, name in enumerate(names)}
+    numbers = _numeric_block(ydf, [c for c, _ in month_cols])[rows]    # satır × ay
+    n_rows, n_months = numbers.shape
+    return _monthly_series(
+        names,
+        np.repeat([code[labels.iloc[r]] for r in rows], n_months).astype(int),
+        np.repeat(year[rows], n_months),
+        np.tile(np.asarray([m for _, m in month_cols], dtype=float), n_rows),
+        numbers.ravel(),
+    )
+
+
+# get_oneriler'in gayrimenkul fırsatındaki yıl
+KONUT_YILI = 2023
+
+
+def _build_konut_toplam(ds_konut: LoadedDataset) -> dict[str, float]:
+    """İl -> KONUT_YILI konut satışı toplamı (aylık seriden)."""
+    return _derived("konut_aylik").year_totals(KONUT_YILI)
+
+
+def _build_yabanci_konut_toplam(ds_yabanci: LoadedDataset) -> dict[str, float]:
+    """İl -> KONUT_YILI yabancıya konut satışı toplamı (aylık seriden). Her il olmayabilir."""
+    return _derived("yabanci_konut_aylik").year_totals(KONUT_YILI)
+
+
+@dataclass
+class HealthPersonnelCube:
+    """Sağlık personeli küpü: il × meslek × kurum × yıl (boş ya da '-' hücre NaN).
+
+    Kurum ekseninin ilk elemanı meslek satırının kendisidir ("toplam"); diğerleri
+    altındaki Sağlık Bakanlığı / Üniversite / Özel satırlarıdır. Ülke toplamı
+    bloğu da ("Türkiye") bir il satırı olarak yer alır.
+    """
+    provinces: list[str]                 # bloktaki il adı, dosya sırası
+    roles: list[str]                     # meslek kodu, ör. "toplam_hekim", "hemsire"
+    role_names: list[str]
+    institutions: list[str]              # "toplam", "saglik_bakanligi", "universite", "ozel"
+    institution_names: list[str]
+    years: list[int]
+    values: np.ndarray
+    rows: dict[str, int]                 # normalize il adı -> satır
+
+    def latest(self, role: str, institution: str = "toplam") -> np.ndarray:
+        """Her il için mesleğin son yıl değeri; meslek dosyada yoksa tümü NaN."""
+        if role not in self.roles or not self.years:
+            return np.full(len(self.provinces), np.nan)
+        return self.values[:, self.roles.index(role), self.institutions.index(institution), -1]
+
+
+def _personnel_label(text: str) -> str:
+    # "Diş Hekimi(1) - Dentist(1)" -> "Diş Hekimi"
+    return re.sub(r"\(\d+\)", "", text.split(" - ")[0]).strip()
+
+
+def _build_saglik_kupu(ds_sp: LoadedDataset) -> HealthPersonnelCube:
+    """Her il bloğu: A'da il adı, B'de meslek satırları, C'de kurum kırılımı; D'den itibaren yıllar.
+
+    Bloklar sabit ofsetle değil etiketlere göre okunur; meslek satırı gelmeyen
+    A hücreleri (başlık, kaynak ve dipnot satırları) il sayılmaz.
+    """
+    sp = ds_sp.df
+    labels = [sp.iloc[:, c].map(lambda v: "" if pd.isna(v) else str(v).strip()).tolist() for c in range(3)]
+    year_cells = extract_years(pd.Series(sp.iloc[:, 3:].to_numpy(dtype=object).ravel(), dtype=object))
+    year_cells = year_cells.reshape(len(sp), -1)
+    # Yıl başlığı: en çok yıl içeren satır
+    header = int(np.argmax((~np.isnan(year_cells)).sum(axis=1)))
+    year_cols = np.flatnonzero(~np.isnan(year_cells[header]))
+    numbers = _numeric_block(sp, [3 + c for c in year_cols])
+
+    provinces: list[str] = []
+    roles: list[str] = []
+    role_names: list[str] = []
+    institutions = ["toplam"]
+    institution_names = ["Toplam"]
+    cells: list[tuple[int, int, int, int]] = []  # (il, meslek, kurum, satır)
+    block = role = None
+    p = None
+    for r in range(header + 1, len(sp)):
+        a, b, c = labels[0][r], labels[1][r], labels[2][r]
+        if a:
+            block, role, p = _personnel_label(a), None, None
+        elif b and block:
+            if p is None:
+                p = len(provinces)
+                provinces.append(block)
+            name = _personnel_label(b)
+            role = _indicator_slug(name)
+            if role not in roles:
+                roles.append(role)
+                role_names.append(name)
+            cells.append((p, roles.index(role), 0, r))
+        elif c and role is not None:
+            name = _personnel_label(c)
+            slug = _indicator_slug(name)
+            if slug not in institutions:
+                institutions.append(slug)
+                institution_names.append(name)
+            cells.append((p, roles.index(role), institutions.index(slug), r))
+
+    values = np.full((len(provinces), len(roles), len(institutions), len(year_cols)), np.nan)
+    if cells:
+        idx = np.asarray(cells)
+        values[idx[:, 0], idx[:, 1], idx[:, 2]] = numbers[idx[:, 3]]
+    return HealthPersonnelCube(
+        provinces=provinces,
+        roles=roles,
+        role_names=role_names,
+        institutions=institutions,
+        institution_names=institution_names,
+        years=[int(y) for y in year_cells[header, year_cols]],
+        values=values,
+        rows={_normalize_text(name): i for i, name in reversed(list(enumerate(provinces)))},
+    )
+
+
+def _build_saglik_personeli_toplam(ds_sp: LoadedDataset) -> dict[str, tuple[float, float]]:
+    """İl -> (toplam hekim, hemşire) son yıl sayıları; okunamayan hücre 0."""
+    cube = _derived("saglik_kupu")
+    hekim = np.nan_to_num(cube.latest("toplam_hekim"))
+    hemsire = np.nan_to_num(cube.latest("hemsire"))
+    return {key: (float(hekim[i]), float(hemsire[i])) for key, i in cube.rows.items()}
+
+
+def _build_nufus_toplam(ds_nufus: LoadedDataset) -> dict[str, float]:
+    """İl -> en güncel yılın toplam nüfusu (nüfus küpünden)."""
+    cube = _derived("nufus_kupu")
+    totals = cube.totals()
+    return {key: float(totals[i]) for key, i in cube.rows.items() if not np.isnan(totals[i])}
+
+
+def _build_saglik_per_100k(ds_sp: LoadedDataset, ds_nufus: LoadedDataset) -> dict[str, tuple[float | None, float | None]]:
+    """İl -> (100.000 kişiye düşen hekim, hemşire); nüfusu olmayan ilde None."""
+    personel = _derived("saglik_personeli_toplam")
+    nufus = _derived("nufus_toplam")
+    table = {}
+    for key in set(personel) | set(nufus):
+        hekim, hemsire = personel.get(key, (0.0, 0.0))
+        pop = nufus.get(key)
+        if pop is None or pop == 0:
+            table[key] = (None, None)
+        else:
+            table[key] = (hekim / pop * 100000.0, hemsire / pop * 100000.0)
+    return table
+
+
+@dataclass
+class Ranking:
+    """Bir göstergenin iller arası sıralaması; yalnızca değeri olan iller yer alır."""
+    ad: str
+    birim: str
+    values: dict[str, float]       # normalize il adı -> değer
+    percentiles: dict[str, float]  # normalize il adı -> yüzdelik sıra (0-1, _percentile_rank ile aynı)
+    order: list[str]               # değere göre azalan il sırası (eşitlikte dosya sırası)
+
+
+def _ranking(ad: str, birim: str, values: dict[str, float | None]) -> Ranking:
+    values = {k: float(v) for k, v in values.items() if v is not None and not np.isnan(v)}
+    keys = list(values)
+    arr = np.array([values[k] for k in keys], dtype=float)
+    if len(arr) > 1:
+        pct = np.searchsorted(np.sort(arr), arr, side="left") / (len(arr) - 1)
+    else:
+        pct = np.ones(len(arr))
+    return Ranking(
+        ad=ad,
+        birim=birim,
+        values=values,
+        percentiles={k: float(p) for k, p in zip(keys, pct)},
+        order=[keys[i] for i in np.argsort(-arr, kind="stable")],
+    )
+
+
+_ASCII = str.maketrans("çğıöşüÇĞİÖŞÜ", "cgiosuCGIOSU")
+
+
+def _indicator_slug(name: str) -> str:
+    """Sektör adından URL'de kullanılacak gösterge adı: 'Tarım, ormancılık ...' -> 'tarim_ormancilik_...'."""
+    return re.sub(r"[^a-z0-9]+", "_", name.translate(_ASCII).lower()).strip("_")
+
+
+def _build_siralama(*_datasets: LoadedDataset) -> dict[str, Ranking]:
+    """Gösterge adı -> iller arası sıralama. İl tablolarından bir kez, veri yüklenince kurulur."""
+    saglik = _derived("saglik_per_100k")
+    table = {
+        "tarim_alani": _ranking("Toplam tarım alanı", "dekar", _derived("tarim_alan")),
+        "issizlik": _ranking("İşsizlik oranı (2023)", "%", _derived("issizlik_oran")),
+        "konut_satisi": _ranking("Konut satışı (2023)", "adet", _derived("konut_toplam")),
+        "yabanci_konut_satisi": _ranking("Yabancılara konut satışı (2023)", "adet", _derived("yabanci_konut_toplam")),
+        "hekim_100k": _ranking("100.000 kişiye düşen hekim", "kişi", {k: v[0] for k, v in saglik.items()}),
+        "hemsire_100k": _ranking("100.000 kişiye düşen hemşire", "kişi", {k: v[1] for k, v in saglik.items()}),
+    }
+    # Sektörlerin il ekonomisindeki payı (son yıl, cari fiyatlar); toplamı pozitif olmayan iller hariç
+    nominal = _nominal_table()
+    shares, total, _ = _nominal_shares(nominal)
+    for j, sector in enumerate(nominal.sectors):
+        table[f"pay_{_indicator_slug(sector)}"] = _ranking(
+            f"{sector} payı", "oran",
+            {key: shares[i, j] for i, key in enumerate(nominal.provinces) if total[i] > 0},
+        )
+    return table
+
+
+# siralama tablosunu besleyen veri setleri
+SIRALAMA_SOURCES = ["tarim", "issizlik", "konut", "yabanci_konut", "saglik_personeli", "nufus", "cari"]
+
+
+@dataclass
+class IndicatorMatrix:
+    """İl × gösterge yoğun matrisi (eksik değer NaN); /karsilastir buradan satır okur."""
+    provinces: list[str]                 # normalize il adı, satır sırası
+    names: list[str]                     # satırdaki ilin görünen adı
+    indicators: list[tuple[str, str, str]]  # (gösterge, açıklama, birim), sütun sırası
+    values: np.ndarray
+    rows: dict[str, int]                 # normalize il adı -> satır
+
+
+def _build_karsilastirma(*_datasets: LoadedDataset) -> IndicatorMatrix:
+    """Nüfus, siralama göstergeleri ve sektörlerin reel büyümesini il sırasına dizer."""
+    names = province_names()
+    provinces = [_normalize_text(c) for c in names]
+    columns: list[tuple[tuple[str, str, str], dict[str, float]]] = [
+        (("nufus", "Toplam nüfus", "kişi"), _derived("nufus_toplam")),
+    ]
+    for slug, ranking in _derived("siralama").items():
+        columns.append(((slug, ranking.ad, ranking.birim), ranking.values))
+
+    # Sektörlerin SCORE_YEARS reel büyüme ortalaması (aynı adlı sektörlerde ilk sütun)
+    reel_growth = _derived("reel_growth")
+    mean = reel_growth.grouped_mean(SCORE_YEARS)
+    code_of = {k: i for i, k in enumerate(reel_growth.provinces)}
+    label = f"{SCORE_YEARS[0]}-{SCORE_YEARS[-1]}"
+    seen: set[str] = set()
+    for j, sector in enumerate(reel_growth.sectors):
+        slug = f"buyume_{_indicator_slug(sector)}"
+        if olmayacak_sector_name(sector) or slug in seen:
+            continue
+        seen.add(slug)
+        columns.append((
+            (slug, f"{sector} ort. reel büyüme ({label})", "%"),
+            {key: mean[code, j] for key, code in code_of.items()},
+        ))
+
+    values = np.full((len(provinces), len(columns)), np.nan)
+    for c, (_, column) in enumerate(columns):
+        for p, key in enumerate(provinces):
+            v = column.get(key)
+            if v is not None:
+                values[p, c] = v
+    # Hiçbir ilde değeri olmayan gösterge (okunamayan kaynak) yanıta konmaz
+    filled = ~np.isnan(values).all(axis=0)
+    for (meta, _), ok in zip(columns, filled):
+        if not ok:
+            logger.warning("%s göstergesi hiçbir il için okunamadı; karşılaştırmadan çıkarıldı", meta[0])
+    columns = [col for col, ok in zip(columns, filled) if ok]
+    values = values[:, filled]
+    return IndicatorMatrix(
+        provinces=provinces,
+        names=names,
+        indicators=[meta for meta, _ in columns],
+        values=values,
+        rows={key: p for p, key in enumerate(provinces)},
+    )
+
+
+# karsilastirma matrisini besleyen veri setleri
+KARSILASTIRMA_SOURCES = [*SIRALAMA_SOURCES, "reel"]
+
+
+DERIVED_TABLES: dict[str, DerivedTable] = {
+    "nufus_kupu": DerivedTable(["nufus"], _build_nufus_kupu),
+    # province_names ve nufus_toplam nufus_kupu üzerinden kurulur
+    "province_names": DerivedTable(["nufus"], _build_province_names),
+    "nominal_table": DerivedTable(["cari"], _build_nominal_table),
+    "reel_growth": DerivedTable(["reel"], _build_reel_growth),
+    # nominal_table ve reel_growth'u da kullanır; cari ya da reel değişince birlikte yenilenir
+    "sector_scores": DerivedTable(["cari", "reel"], _build_sector_scores),
+    "tarim_alan": DerivedTable(["tarim"], _build_tarim_alan),
+    "issizlik_oran": DerivedTable(["issizlik"], _build_issizlik_oran),
+    "konut_aylik": DerivedTable(["konut"], _build_konut_aylik),
+    "yabanci_konut_aylik": DerivedTable(["yabanci_konut"], _build_yabanci_konut_aylik),
+    # aylık seriler üzerinden kurulur
+    "konut_toplam": DerivedTable(["konut"], _build_konut_toplam),
+    "yabanci_konut_toplam": DerivedTable(["yabanci_konut"], _build_yabanci_konut_toplam),
+    "saglik_kupu": DerivedTable(["saglik_personeli"], _build_saglik_kupu),
+    # saglik_kupu üzerinden kurulur
+    "saglik_personeli_toplam": DerivedTable(["saglik_personeli"], _build_saglik_personeli_toplam),
+    "nufus_toplam": DerivedTable(["nufus"], _build_nufus_toplam),
+    # saglik_personeli_toplam ve nufus_toplam üzerinden kurulur
+    "saglik_per_100k": DerivedTable(["saglik_personeli", "nufus"], _build_saglik_per_100k),
+    # yukarıdaki il tabloları ve nominal_table üzerinden kurulur
+    "siralama": DerivedTable(SIRALAMA_SOURCES, _build_siralama),
+    # province_names, nufus_toplam, siralama ve reel_growth üzerinden kurulur
+    "karsilastirma": DerivedTable(KARSILASTIRMA_SOURCES, _build_karsilastirma),
+}
+
+
+# -------------------- İl yanıtı önbelleği --------------------
+# Hesaplanan yanıtlar, üretildikleri veri seti / ara tablo nesneleriyle birlikte
+# saklanır. Bağımlılıklardan biri yeniden kurulmadıkça yanıt yeniden
+# hesaplanmaz; örneğin yalnızca işsizlik dosyası değişirse /gsyh yanıtları
+# önbellekte kalır, /oneriler yanıtları yeni işsizlik tablosuyla yenilenir.
+
+PAYLOAD_CACHE_SIZE = int(os.environ.get("PAYLOAD_CACHE_SIZE", 2048))
+
+# anahtar -> (bağımlılık adları, bağımlılık nesneleri, yanıt)
+_PAYLOADS: OrderedDict[tuple, tuple[tuple[str, ...], tuple[Any, ...], Any]] = OrderedDict()
+_PAYLOADS_LOCK = threading.Lock()
+
+
+def _dependency(name: str) -> Any:
+    return _derived(name) if name in DERIVED_TABLES else _get_dataset(name)
+
+
+def cached_payload(key: tuple, deps: list[str], build: Callable[..., Any], *args: Any) -> Any:
+    """build(*args) sonucunu, deps (veri seti ya da ara tablo adları) değişmedikçe önbellekten döner.
+
+    Dönen nesne paylaşımlıdır, çağıran taraf değiştirmemelidir.
+    """
+    if _JOB_PROFILING.get():
+        return build(*args)
+    found, current, value = _lookup_payload(key, deps)
+    if found:
+        return value
+    value = build(*args)
+    if current is not None:
+        _store_payload(key, deps, current, value)
+    return value
+
+
+async def cached_payload_async(key: tuple, deps: list[str], build: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+    """cached_payload'ın olay döngüsünden çağrılan hâli; build(*args) beklenir (ör. fan_out)."""
+    if _PROFILE_OUTPUT.get() is not None:
+        return await build(*args)
+    # Bağımlılıkların çözümü veri seti okuma ve ara tablo kurma içerebilir; döngü dışında yapılır
+    found, current, value = await run_local_heavy(_lookup_payload, key, deps)
+    if found:
+        return value
+    value = await build(*args)
+    if current is not None:
+        _store_payload(key, deps, current, value)
+    return value
+
+
+def _lookup_payload(key: tuple, deps: list[str]) -> tuple[bool, tuple[Any, ...] | None, Any]:
+    """(bulundu mu, bağımlılıkların güncel nesneleri, yanıt). Bağımlılık kurulamıyorsa nesneler None."""
+    try:
+        current = tuple(_dependency(d) for d in deps)
+    except Exception:
+        # Bağımlılık kurulamıyor: hata yanıtını build üretsin, önbelleğe alınmasın
+        return False, None, None
+    with _PAYLOADS_LOCK:
+        cached = _PAYLOADS.get(key)
+        if cached is not None and all(a is b for a, b in zip(cached[1], current)):
+            _PAYLOADS.move_to_end(key)
+            return True, current, cached[2]
+    return False, current, None
+
+
+def _store_payload(key: tuple, deps: list[str], current: tuple[Any, ...], value: Any) -> None:
+    with _PAYLOADS_LOCK:
+        _PAYLOADS[key] = (tuple(deps), current, value)
+        _PAYLOADS.move_to_end(key)
+        while len(_PAYLOADS) > PAYLOAD_CACHE_SIZE:
+            _PAYLOADS.popitem(last=False)
+
+
+def province_payload(kind: str, deps: list[str], by_spelling: bool = False) -> Callable:
+    """İl yanıtı üreten fonksiyonu cached_payload ile saran dekoratör.
+
+    Anahtar normalize il adıdır; yanıt il adını istekteki yazımıyla taşıyorsa
+    by_spelling=True ile yazımın kendisi kullanılır. Ek argümanlar (ör. skor
+    parametreleri) anahtara eklenir; None olanlar eklenmez, böylece varsayılan
+    çağrı f(il) ile f(il, None) aynı yanıtı paylaşır.
+    """
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def wrapper(il_adi: str, *args: Any) -> Any:
+            key = il_adi if by_spelling else _normalize_text(il_adi)
+            extra = tuple(a for a in args if a is not None)
+            return cached_payload((kind, key, *extra), deps, func, il_adi, *args)
+        return wrapper
+    return decorator
+
+
+def drop_payloads(datasets: Iterable[str]) -> int:
+    """Verilen veri setlerine (doğrudan ya da ara tablo üzerinden) bağlı yanıtları siler."""
+    datasets = set(datasets)
+    stale = datasets | set(affected_tables(datasets))
+    with _PAYLOADS_LOCK:
+        keys = [k for k, (deps, _, _) in _PAYLOADS.items() if stale.intersection(deps)]
+        for k in keys:
+            del _PAYLOADS[k]
+    return len(keys)
+
+
+def _check_admin_token(token: str | None) -> None:
+    # ADMIN_TOKEN tanımlıysa yönetim uç noktaları X-Admin-Token başlığı ister
+    expected = os.environ.get("ADMIN_TOKEN")
+    if expected and token != expected:
+        raise HTTPException(status_code=403, detail="Yetkisiz")
 
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Türkiye Yatırım ve Enerji Potansiyeli API"}
 
+
+@app.get("/admin/veri")
+def admin_veri_durumu(x_admin_token: str | None = Header(default=None)):
+    """Bellekteki veri setlerinin kaynak dosyası ve sürüm bilgisini listeler."""
+    _check_admin_token(x_admin_token)
+    items = []
+    for name, source in DATASET_SOURCES.items():
+        ds = _DATASETS.get(name)
+        file_name = source.file_name
+        file_path = DATA_PATH / file_name
+        try:
+            stale = ds is None or ds.version != _file_version(file_path)
+        except FileNotFoundError:
+            stale = True
+        items.append({
+            "ad": name,
+            "dosya": file_name,
+            "yuklu": ds is not None,
+            "guncel": not stale,
+            "kaynak": None if ds is None else ds.origin,
+            "mtime_ns": None if ds is None else ds.version[0],
+            "boyut": None if ds is None else ds.version[1],
+            "yuklenme": None if ds is None else ds.loaded_at,
+        })
+    tables = []
+    for name, table in DERIVED_TABLES.items():
+        cached = _DERIVED.get(name)
+        tables.append({
+            "ad": name,
+            "bagimliliklar": table.deps,
+            "kurulu": cached is not None,
+            "guncel": cached is not None and all(_DATASETS.get(d) is ds for d, ds in zip(table.deps, cached[0])),
+            "kurulma": None if cached is None else cached[2],
+        })
+    return {
+        "datasets": items,
+        "derived_tables": tables,
+        "excel_cache_entries": len(_EXCEL_CACHE),
+        "payload_cache_entries": len(_PAYLOADS),
+    }
+
+
+@app.post("/admin/veri/yenile")
+async def admin_veri_yenile(ad: str | None = None, x_admin_token: str | None = Header(default=None)):
+    """Önbelleği elle geçersiz kılar; ad verilmezse tüm veri setleri yeniden okunur."""
+    _check_admin_token(x_admin_token)
+    if ad is not None and ad not in DATASET_SOURCES:
+        raise HTTPException(status_code=404, detail="Veri seti bulunamadı")
+    # Süreç havuzunda yeniden yükleme işçide kalırdı; bu iş her zaman API sürecinde çalışır
+    return await asyncio.to_thread(_reload_datasets, ad)
+
+
+def _reload_datasets(ad: str | None) -> dict[str, Any]:
+    names = invalidate_datasets(None if ad is None else [ad])
+    reloaded, errors = [], {}
+    for name in names:
+        try:
+            _get_dataset(name)
+            reloaded.append(name)
+        except Exception as e:
+            errors[name] = str(e)
+    # Yalnızca yenilenen veri setlerine bağlı ara tablolar ve il yanıtları yeniden hesaplanır
+    dropped = drop_payloads(names)
+    table_errors = rebuild_affected(reloaded)
+    # İşçiler yenilenen veriyi görmez; görüntü güncellenir, havuz yeni işçilerle açılır
+    if FANOUT_WORKERS > 0:
+        shutdown_fanout_executor()
+        start_fanout_executor()
+    restart_heavy_executor()
+    return {
+        "reloaded": reloaded,
+        "errors": errors,
+        "rebuilt": [t for t in affected_tables(reloaded) if t not in table_errors],
+        "table_errors": table_errors,
+        "dropped_payloads": dropped,
+    }
+
 @app.get("/gsyh/{il_adi}")
+async def gsyh_endpoint(il_adi: str, request: Request):
+    return await cached_json(
+        request, ["cari"],
+        lambda: run_single_flight(("gsyh", _normalize_text(il_adi)), get_gsyh, il_adi),
+        materialized=materialized_file("gsyh", _normalize_text(il_adi)),
+    )
+
+
+@province_payload("gsyh", ["cari", "nominal_table"])
 def get_gsyh(il_adi: str):
     try:
-        file_path = DATA_PATH / "cari fiyatli .xls"
         # 4. satır başlık (0-based: 3), B=il, C=yıl, D-> sektörler
-        df = _read_with_header_row(file_path, header_row_index=3)
+        ds = _get_dataset("cari")
+        df = ds.df
 
         if df.shape[1] < 4:
             return {"error": "Beklenen sütun yapısı bulunamadı (en az 4 sütun)"}
 
-        province_series = df.iloc[:, 1].astype(str)
-        year_series = df.iloc[:, 2]
-
-        # İl filtreleme (normalize ederek)
-        target = _normalize_text(il_adi)
-        il_mask = province_series.apply(_normalize_text) == target
-        il_df = df[il_mask].copy()
-        
-        if il_df.empty:
+        # İl filtreleme (normalize edilmiş il indeksi üzerinden)
+        if ds.first(il_adi) is None:
             return {"error": "İl bulunamadı"}
 
-        # En güncel yılı seç
-        il_df["_yil"] = year_series[il_mask].apply(_extract_year)
-        il_df = il_df.dropna(subset=["_yil"])  # yıl olmayan satırları at
-        if il_df.empty:
+        # En güncel yılın sektör değerleri (D sütunundan itibaren, agregalar hariç)
+        nominal_values = _nominal_table().row(il_adi)
+        if nominal_values is None:
             return {"error": "İl için yıl verisi bulunamadı"}
-        latest_year = il_df["_yil"].max()
-        il_row = il_df[il_df["_yil"] == latest_year].iloc[0:1]
-
-        # Sektör kolonları D sütunundan (index 3) itibaren
-        sektor_cols = list(il_row.columns[3:])
-        
-        # Numerik değerlere indirgeme
-        values = []
-        for col in sektor_cols:
-            sektor_name = str(col).strip()
-            if olmayacak_sector_name(sektor_name):
-                continue
-            raw = il_row.iloc[0][col]
-            val = _to_number(raw)
-            if val is None:
-                continue
-            values.append({"sektor": sektor_name, "deger": val})
 
-        return values
+        return [{"sektor": name, "deger": val} for name, val in nominal_values.items()]
 
     except FileNotFoundError:
         return {"error": "Veri dosyası bulunamadı."}
@@ -200,6 +2784,15 @@ def get_gsyh(il_adi: str):
         return {"error": f"Bir hata oluştu: {str(e)}"}
 
 @app.get("/gsyh_reel/{il_adi}")
+async def gsyh_reel_endpoint(il_adi: str, request: Request):
+    return await cached_json(
+        request, ["reel"],
+        lambda: run_single_flight(("gsyh_reel", _normalize_text(il_adi)), get_gsyh_reel, il_adi),
+        materialized=materialized_file("gsyh_reel", _normalize_text(il_adi)),
+    )
+
+
+@province_payload("gsyh_reel", ["reel", "reel_growth"])
 def get_gsyh_reel(il_adi: str):
     """
     'zincir hacim.xls' dosyasından yıllık değişim oranlarını okur.
@@ -211,44 +2804,30 @@ def get_gsyh_reel(il_adi: str):
     Yalnızca 2021, 2022, 2023 yıllarını döndürür.
     """
     try:
-        file_path = DATA_PATH / "zincir hacim.xls"
-        sheet = _pick_sheet_name(file_path)
-        df = pd.read_excel(file_path, sheet_name=sheet, header=3)
+        ds = _get_dataset("reel")
+        df = ds.df
 
         if df.shape[1] < 6:
             return {"error": "Beklenen sütun yapısı bulunamadı"}
 
-        province_series = df.iloc[:, 1].astype(str)
-        target = _normalize_text(il_adi)
-        mask = province_series.apply(_normalize_text) == target
-        il_df = df[mask].copy()
-        if il_df.empty:
+        if ds.first(il_adi) is None:
             return {"error": "İl bulunamadı"}
 
-        # Sektör adları ve oran sütunları
-        sector_cols: list[tuple[int, str]] = []
-        for rate_idx in range(5, len(df.columns), 4):
-            name_idx = rate_idx - 2
-            if name_idx < 0 or name_idx >= len(df.columns):
-                continue
-            sector_name = str(df.columns[name_idx]).strip()
-            if not sector_name or sector_name.lower() == "nan":
-                continue
-            sector_cols.append((rate_idx, sector_name))
+        # Sektör adları ve ilin gözlemleri (tüm dosya için bir kez uzun tabloya çevrilmiş)
+        reel_growth = _derived("reel_growth")
+        il_obs = reel_growth.slice(il_adi)
 
         wanted_years = [2021, 2022, 2023]
-        growth_map: Dict[str, Dict[str, float | None]] = {name: {} for _, name in sector_cols}
+        growth_map: Dict[str, Dict[str, float | None]] = {name: {} for name in reel_growth.sectors}
 
-        for _, row in il_df.iterrows():
-            y = _extract_year(row.iloc[2])
-            if y not in wanted_years:
-                continue
-            for rate_idx, sector_name in sector_cols:
-                val = _to_number(row.iloc[rate_idx])
-                growth_map[sector_name][f"y{y}"] = val if val is not None else None
+        # Aynı yıl için birden çok satır varsa dosyada sonraki satır geçerlidir
+        years = reel_growth.year[il_obs]
+        wanted = np.isin(years, wanted_years)
+        for y, j, val in zip(years[wanted], reel_growth.sector[il_obs][wanted], reel_growth.rate[il_obs][wanted]):
+            growth_map[reel_growth.sectors[j]][f"y{int(y)}"] = None if np.isnan(val) else float(val)
 
         buyume_oranlari: List[Dict[str, Any]] = []
-        for _, sector_name in sector_cols:
+        for sector_name in reel_growth.sectors:
             entry: Dict[str, Any] = {"sektor": sector_name}
             for y in wanted_years:
                 entry[f"y{y}"] = growth_map.get(sector_name, {}).get(f"y{y}")
@@ -262,8 +2841,8 @@ def get_gsyh_reel(il_adi: str):
         return {"error": f"Bir hata oluştu: {str(e)}"}
 
 
-def _build_city_recommendation(il_adi: str) -> Dict[str, Any]:
-    core = get_oneriler(il_adi)
+def _build_city_recommendation(il_adi: str, params: ScoreParams | None = None) -> Dict[str, Any]:
+    core = get_oneriler(il_adi, params)
     if isinstance(core, dict) and core.get("error"):
         return {"il": il_adi, "error": core["error"]}
     il = core.get("il", il_adi)
@@ -295,40 +2874,149 @@ def _build_city_recommendation(il_adi: str) -> Dict[str, Any]:
 
 
 @app.get("/oneriler_tumu")
-def get_oneriler_tumu():
-    try:
-        pop_path = DATA_PATH / "il yaş cinsiyet nufus.xls"
-        pdf = pd.read_excel(pop_path, header=None)
-        pdf = pdf.dropna(axis=0, how='all').dropna(axis=1, how='all')
-        city_row = 2
-        start_col = 4
-        cities = []
-        for cidx in range(start_col, pdf.shape[1]):
-            val = pdf.iloc[city_row, cidx] if city_row < len(pdf) and cidx < pdf.shape[1] else None
-            if val is None:
-                continue
-            name = str(val).strip()
-            if not name or name.lower() == "nan":
-                continue
-            cities.append(name)
+async def oneriler_tumu_endpoint(
+    request: Request, years: str | None = None, w_share: float | None = None, stream: bool = False,
+):
+    try:
+        params = await score_params_async(years, w_share)
+    except ValueError as e:
+        return {"error": str(e)}
+    if stream:
+        # ?stream=1: her il hesaplandıkça bir NDJSON satırı, en sonda {"count": ...}
+        try:
+            cities = await run_heavy(province_names)
+        except FileNotFoundError:
+            return {"error": "Veri dosyası bulunamadı."}
+        except Exception as e:
+            return {"error": f"Bir hata oluştu: {str(e)}"}
+        return ndjson_response(cities, _build_city_recommendation, params, summary=lambda rows: {"count": len(rows)})
+    return await cached_json(
+        request, ONERILER_SOURCES, lambda: oneriler_tumu_fanout(params),
+        materialized=materialized_file("oneriler_tumu") if params is None else None,
+    )
+
+
+def _oneriler_tumu_key(params: ScoreParams | None) -> tuple:
+    return ("oneriler_tumu",) if params is None else ("oneriler_tumu", params)
+
+
+def get_oneriler_tumu(params: ScoreParams | None = None):
+    return cached_payload(_oneriler_tumu_key(params), ["province_names", *ONERILER_TABLES], _build_oneriler_tumu, params)
+
+
+async def oneriler_tumu_fanout(params: ScoreParams | None = None):
+    """get_oneriler_tumu ile aynı yanıt; iller fan_out ile (FANOUT_WORKERS > 0 ise süreç havuzunda) hesaplanır."""
+    return await cached_payload_async(
+        _oneriler_tumu_key(params), ["province_names", *ONERILER_TABLES], _build_oneriler_tumu_fanout, params,
+    )
+
+
+async def _build_oneriler_tumu_fanout(params: ScoreParams | None):
+    try:
+        cities = await run_heavy(province_names)
+        payload = await fan_out(_build_city_recommendation, cities, params)
+        return {"count": len(payload), "items": payload}
+    except FileNotFoundError:
+        return {"error": "Veri dosyası bulunamadı."}
+    except Exception as e:
+        return {"error": f"Bir hata oluştu: {str(e)}"}
 
-        seen = set()
-        ordered_cities = []
-        for c in cities:
-            n = _normalize_text(c)
-            if n in seen:
-                continue
-            seen.add(n)
-            ordered_cities.append(c)
 
-        payload = [_build_city_recommendation(c) for c in ordered_cities]
+def _build_oneriler_tumu(params: ScoreParams | None = None):
+    try:
+        payload = [_build_city_recommendation(c, params) for c in province_names()]
         return {"count": len(payload), "items": payload}
     except FileNotFoundError:
         return {"error": "Veri dosyası bulunamadı."}
     except Exception as e:
         return {"error": f"Bir hata oluştu: {str(e)}"}
 
+@app.get("/siralama/{gosterge}")
+async def siralama_endpoint(gosterge: str, request: Request):
+    return await cached_json(request, SIRALAMA_SOURCES, lambda: run_heavy(get_siralama, gosterge))
+
+
+def get_siralama(gosterge: str):
+    """Göstergenin iller arası sıralaması: değere göre azalan, yüzdelik sırasıyla."""
+    name = gosterge.strip().lower()
+    return cached_payload(("siralama", name), ["siralama", "province_names"], _build_siralama_payload, name)
+
+
+def _build_siralama_payload(name: str):
+    try:
+        table = _derived("siralama")
+        ranking = table.get(name)
+        if ranking is None:
+            return {"error": "Gösterge bulunamadı.", "gostergeler": list(table)}
+        display = {_normalize_text(c): c for c in province_names()}
+        return {
+            "gosterge": name,
+            "ad": ranking.ad,
+            "birim": ranking.birim,
+            "count": len(ranking.order),
+            "items": [
+                {
+                    "sira": i + 1,
+                    "il": display.get(key, key),
+                    "deger": ranking.values[key],
+                    "yuzdelik": round(ranking.percentiles[key], 4),
+                }
+                for i, key in enumerate(ranking.order)
+            ],
+        }
+    except FileNotFoundError:
+        return {"error": "Veri dosyası bulunamadı."}
+    except Exception as e:
+        return {"error": f"Bir hata oluştu: {str(e)}"}
+
+
+@app.get("/karsilastir")
+async def karsilastir_endpoint(request: Request, iller: str = ""):
+    return await cached_json(request, KARSILASTIRMA_SOURCES, lambda: run_heavy(get_karsilastir, iller))
+
+
+def get_karsilastir(iller: str):
+    """?iller=Ankara,Izmir,Bursa: illerin gösterge vektörlerini aynı sütun sırasıyla yan yana döner.
+
+    Matris veri yüklenirken kurulduğundan maliyet yalnızca istenen il sayısına bağlıdır.
+    """
+    requested = [il.strip() for il in iller.split(",") if il.strip()]
+    if not requested:
+        return {"error": "En az bir il verilmelidir; örnek: ?iller=Ankara,Izmir,Bursa"}
+    try:
+        matrix = _derived("karsilastirma")
+        found = []
+        missing = []
+        for il_adi in requested:
+            row = matrix.rows.get(_normalize_text(il_adi))
+            if row is None:
+                missing.append(il_adi)
+                continue
+            found.append({
+                "il": matrix.names[row],
+                "degerler": [None if np.isnan(v) else float(v) for v in matrix.values[row]],
+            })
+        return {
+            "gostergeler": [{"ad": ad, "aciklama": aciklama, "birim": birim} for ad, aciklama, birim in matrix.indicators],
+            "iller": found,
+            "bulunamayan": missing,
+        }
+    except FileNotFoundError:
+        return {"error": "Veri dosyası bulunamadı."}
+    except Exception as e:
+        return {"error": f"Bir hata oluştu: {str(e)}"}
+
+
 @app.get("/oneri/{il_adi}")
+async def oneri_endpoint(il_adi: str, request: Request):
+    return await cached_json(
+        request, ["oneri"],
+        lambda: run_single_flight(("oneri", _normalize_text(il_adi)), get_oneri, il_adi),
+        materialized=materialized_file("oneri", _normalize_text(il_adi)),
+    )
+
+
+@province_payload("oneri", ["oneri"])
 def get_oneri(il_adi: str):
     """
     'yenilenebilir_enerji_onerileri.xlsx' dosyasında:
@@ -339,24 +3027,18 @@ def get_oneri(il_adi: str):
     dökümünü okuyup yapılandırılmış çıktı verir.
     """
     try:
-        file_path = DATA_PATH / "yenilenebilir_enerji_onerileri.xlsx"
         # Başlıkları kullanmadan, pozisyonel okuma (B-H) yapalım
-        xls = pd.ExcelFile(file_path)
-        sheet = xls.sheet_names[0]
-        df_raw = pd.read_excel(file_path, sheet_name=sheet, header=None)
-        df_raw = df_raw.dropna(axis=0, how='all').dropna(axis=1, how='all')
+        ds = _get_dataset("oneri")
+        df_raw = ds.df
         # En az 8 sütun olmalı (A-H). Biz B-H kullanacağız → index 1..7
         if df_raw.shape[1] < 8:
             return {"error": "Öneri dosyası beklenen sütun sayısında değil."}
 
-        province_series = df_raw.iloc[:, 1].astype(str)
-        target = _normalize_text(il_adi)
-        mask = province_series.apply(_normalize_text) == target
-        row_df = df_raw[mask]
-        if row_df.empty:
+        row_pos = ds.first(il_adi)
+        if row_pos is None:
             return {"error": "İl için öneri bulunamadı"}
 
-        row = row_df.iloc[0]
+        row = df_raw.iloc[row_pos]
         suggestions = []
         # C-D
         suggestions.append({
@@ -374,7 +3056,7 @@ def get_oneri(il_adi: str):
             "reason": str(row.iloc[7]).strip(),
         })
 
-        return {"il": province_series[mask].iloc[0], "suggestions": suggestions}
+        return {"il": str(row.iloc[1]), "suggestions": suggestions}
 
     except FileNotFoundError:
         return {"error": "Öneri dosyası bulunamadı."}
@@ -383,296 +3065,91 @@ def get_oneri(il_adi: str):
 
 
 @app.get("/oneriler/{il_adi}")
-def get_oneriler(il_adi: str):
+async def oneriler_endpoint(il_adi: str, request: Request, years: str | None = None, w_share: float | None = None):
+    # ?years=2019-2023&w_share=0.3: skorun yıl penceresi ve hacim payı ağırlığı
+    try:
+        params = await score_params_async(years, w_share)
+    except ValueError as e:
+        return {"error": str(e)}
+    # Yanıt il adını istekteki yazımıyla taşır (il, başlık), bu yüzden yazım da anahtara girer
+    return await cached_json(
+        request, ONERILER_SOURCES,
+        lambda: run_single_flight(("oneriler", _normalize_text(il_adi), il_adi, params), get_oneriler, il_adi, params),
+        materialized=materialized_file("oneriler", il_adi) if params is None else None,
+    )
+
+
+# /oneriler yanıtını besleyen ara tablolar
+ONERILER_TABLES = [
+    "sector_scores", "siralama", "konut_toplam", "yabanci_konut_toplam", "saglik_per_100k",
+]
+
+
+# Yanıt il adını istekteki yazımıyla taşır, bu yüzden anahtar yazımın kendisidir
+@province_payload("oneriler", ONERILER_TABLES, by_spelling=True)
+def get_oneriler(il_adi: str, params: ScoreParams | None = None):
     """
     Sektör cazibe skorunu hesaplar ve sıralı öneri listesi döner.
     - Hacim (cari fiyatlar, son yıl) → il içindeki pay
-    - Trend (reel büyüme, 2021-2023) → 3 yıl ortalaması
+    - Trend (reel büyüme, varsayılan 2021-2023) → pencere ortalaması
     - Skor: 0.5 * minmax(hacim payı) + 0.5 * minmax(ort. reel büyüme)
+    params verilirse pencere ve hacim payı ağırlığı ondan alınır.
     Not: Toplam/GSYH/Vergi gibi agregalar hariç tutulur.
     """
     try:
-        # 1) Nominal hacimler (cari fiyatlar)
-        cari_path = DATA_PATH \
-            / "cari fiyatli .xls"
-        sheet_cari = _pick_sheet_name(cari_path)
-        df_cari_raw = pd.read_excel(cari_path, sheet_name=sheet_cari, header=None)
-        df_cari_raw = df_cari_raw.dropna(axis=0, how='all').dropna(axis=1, how='all')
-        hdr_idx = 3
-        if hdr_idx >= len(df_cari_raw):
-            hdr_idx = 0
-        cari_header = df_cari_raw.iloc[hdr_idx].astype(str).apply(lambda x: x.strip())
-        df_cari = df_cari_raw.iloc[hdr_idx + 1:].copy()
-        df_cari.columns = cari_header
-        df_cari = df_cari.dropna(axis=0, how='all').dropna(axis=1, how='all')
-        df_cari.reset_index(drop=True, inplace=True)
-
-        if df_cari.shape[1] < 4:
-            return {"error": "Cari verisi beklenen sütun yapısında değil."}
-
-        target = _normalize_text(il_adi)
-        il_mask_cari = df_cari.iloc[:, 1].astype(str).apply(_normalize_text) == target
-        il_df_cari = df_cari[il_mask_cari].copy()
-        if il_df_cari.empty:
+        lap = StageTimer()
+        # 1-3) Hacim payı, reel büyüme ve skor: tüm iller için önceden hesaplanmış tablodan
+        scores = _sector_scores(params)
+        if scores.error:
+            return {"error": scores.error}
+        entry = scores.provinces.get(_normalize_text(il_adi))
+        if entry is None:
             return {"error": "İl bulunamadı (cari)"}
+        if "error" in entry:
+            return {"error": entry["error"]}
 
-        il_df_cari["_yil"] = df_cari.iloc[:, 2][il_mask_cari].apply(_extract_year)
-        il_df_cari = il_df_cari.dropna(subset=["_yil"])
-        if il_df_cari.empty:
-            return {"error": "İl için yıl verisi bulunamadı (cari)"}
-        latest_year = int(il_df_cari["_yil"].max())
-        il_row_cari = il_df_cari[il_df_cari["_yil"] == latest_year].iloc[0]
-
-        nominal_values: dict[str, float] = {}
-        for col in list(df_cari.columns[3:]):
-            sektor_name = str(col).strip()
-            if olmayacak_sector_name(sektor_name):
-                continue
-            val = _to_number(il_row_cari[col])
-            if val is None:
-                continue
-            nominal_values[sektor_name] = float(val)
-
-        if not nominal_values:
-            return {"error": "Sektör nominal verisi bulunamadı"}
-
-        total_nominal = sum(v for v in nominal_values.values() if v is not None)
-        if total_nominal <= 0:
-            return {"error": "Nominal toplam sıfır veya negatif"}
-        nominal_share: dict[str, float] = {
-            k: (v / total_nominal) for k, v in nominal_values.items()
-        }
-
-        # 2) Reel büyüme (2021-2023)
-        reel_path = DATA_PATH / "zincir hacim.xls"
-        sheet_reel = _pick_sheet_name(reel_path)
-        df_reel = pd.read_excel(reel_path, sheet_name=sheet_reel, header=3)
-        if df_reel.shape[1] < 6:
-            return {"error": "Reel verisi beklenen sütun yapısında değil."}
-
-        il_mask_reel = df_reel.iloc[:, 1].astype(str).apply(_normalize_text) == target
-        il_df_reel = df_reel[il_mask_reel].copy()
-        if il_df_reel.empty:
-            return {"error": "İl bulunamadı (reel)"}
-
-        # D,H,L,P,... isim; F,J,N,R,... oran
-        sector_cols: list[tuple[int, str]] = []
-        for rate_idx in range(5, len(df_reel.columns), 4):
-            name_idx = rate_idx - 2
-            if name_idx < 0 or name_idx >= len(df_reel.columns):
-                continue
-            sector_name = str(df_reel.columns[name_idx]).strip()
-            if not sector_name or sector_name.lower() == "nan":
-                continue
-            if olmayacak_sector_name(sector_name):
-                continue
-            sector_cols.append((rate_idx, sector_name))
-
-        wanted_years = [2021, 2022, 2023]
-        growth_avg: dict[str, float] = {}
-        for rate_idx, sector_name in sector_cols:
-            vals: list[float] = []
-            for _, row in il_df_reel.iterrows():
-                y = _extract_year(row.iloc[2])
-                if y not in wanted_years:
-                    continue
-                val = _to_number(row.iloc[rate_idx])
-                if val is not None:
-                    vals.append(float(val))
-            if vals:
-                growth_avg[sector_name] = sum(vals) / len(vals)
-
-        # 3) Ortak sektörler ve skor
-        common_sectors = sorted(set(nominal_share.keys()) & set(growth_avg.keys()))
-        if not common_sectors:
-            return {"error": "Ortak sektör bulunamadı (cari + reel)"}
-
-        def _minmax_scale(values: list[float]) -> list[float]:
-            vmin = min(values)
-            vmax = max(values)
-            if vmax - vmin == 0:
-                return [0.5 for _ in values]
-            return [(v - vmin) / (vmax - vmin) for v in values]
-
-        shares = [nominal_share[s] for s in common_sectors]
-        growths = [growth_avg[s] for s in common_sectors]
-        shares_scaled = _minmax_scale(shares)
-        growths_scaled = _minmax_scale(growths)
-
-        items = []
-        for idx, s in enumerate(common_sectors):
-            score = 0.5 * shares_scaled[idx] + 0.5 * growths_scaled[idx]
-            items.append({
-                "sektor": s,
-                "score": round(float(score), 4),
-                "nominal_share": round(float(shares[idx]), 6),
-                "avg_reel_growth": round(float(growths[idx]), 6),
-                "rationale": [
-                    f"Hacim payı: {shares[idx]*100:.1f}%",
-                    f"Ortalama reel büyüme (2021-2023): {growths[idx]:.2f}%"
-                ]
-            })
-
-        items.sort(key=lambda x: x["score"], reverse=True)
+        latest_year = entry["yil"]
+        # Tablo paylaşımlı; yanıta kopyası konur
+        items = [dict(it, rationale=list(it["rationale"])) for it in entry["items"]]
+        lap("skor")
 
         # -------------------- Alan bazlı fırsatlar --------------------
         opportunities: list[dict[str, str]] = []
+        key = _normalize_text(il_adi)
 
-        def _percentile_rank(series_values: list[float], value: float) -> float:
-            vals = [v for v in series_values if v is not None]
-            if not vals:
-                return 0.0
-            vals_sorted = sorted(vals)
-            import bisect
-            pos = bisect.bisect_left(vals_sorted, value)
-            return pos / max(1, len(vals_sorted) - 1) if len(vals_sorted) > 1 else 1.0
-
-        # Tarım alanı (A=il, B=toplam alan)
+        # Tarım alanı (A=il, B=toplam alan) ve iller arası yüzdelik sırası
         try:
-            tarim_path = DATA_PATH / "toplam tarın alanı.xls"
-            tarim_df = pd.read_excel(tarim_path, header=None)
-            tarim_df = tarim_df.dropna(axis=0, how='all').dropna(axis=1, how='all')
-            tarim_df.columns = [*(f"c{i}" for i in range(len(tarim_df.columns)))]
-            tarim_df["_il"] = tarim_df.iloc[:, 0].astype(str)
-            tarim_df["_alan"] = pd.to_numeric(tarim_df.iloc[:, 1], errors="coerce")
-            tarim_df = tarim_df.dropna(subset=["_alan"])
-            tarim_df["_il_norm"] = tarim_df["_il"].apply(_normalize_text)
-            il_tarim_row = tarim_df[tarim_df["_il_norm"] == target]
-            il_tarim_alan = float(il_tarim_row["_alan"].iloc[0]) if not il_tarim_row.empty else None
-            alan_series = [float(x) for x in tarim_df["_alan"].tolist() if pd.notna(x)]
-            alan_prc = _percentile_rank(alan_series, il_tarim_alan) if il_tarim_alan is not None else 0.0
+            tarim_rank = _derived("siralama")["tarim_alani"]
+            il_tarim_alan = tarim_rank.values.get(key)
+            alan_prc = tarim_rank.percentiles.get(key, 0.0)
         except Exception:
             il_tarim_alan = None
             alan_prc = 0.0
-
-        # İşsizlik (B=il, H=2023)
-        try:
-            issizlik_path = DATA_PATH / "işsizlik.xls"
-            iss_df = pd.read_excel(issizlik_path, header=None)
-            iss_df = iss_df.dropna(axis=0, how='all').dropna(axis=1, how='all')
-            iss_df["_il"] = iss_df.iloc[:, 1].astype(str)
-            iss_df["_rate"] = pd.to_numeric(iss_df.iloc[:, 7], errors="coerce")
-            iss_df = iss_df.dropna(subset=["_rate"]) 
-            iss_df["_il_norm"] = iss_df["_il"].apply(_normalize_text)
-            il_iss = iss_df[iss_df["_il_norm"] == target]
-            il_issizlik = float(il_iss["_rate"].iloc[0]) if not il_iss.empty else None
-            iss_series = [float(x) for x in iss_df["_rate"].tolist() if pd.notna(x)]
-            iss_prc = _percentile_rank(iss_series, il_issizlik) if il_issizlik is not None else 0.0
-        except Exception:
-            il_issizlik = None
-            iss_prc = 0.0
+        lap("tarim")
 
         # Konut satış toplamı 2023 (illere göre konut satış.xls)
-        # Şehirler 3. satırda D'den başlar, 2023 ayları 137-148 arası satırlarda; toplamı al
         try:
-            konut_path = DATA_PATH / "illere göre konut satış.xls"
-            kdf = pd.read_excel(konut_path, header=None)
-            kdf = kdf.dropna(axis=0, how='all').dropna(axis=1, how='all')
-            # Row indices are 0-based; şehir isimleri 3. satır (index 2), D sütunu (index 3) -> ileri
-            city_row_idx = 2
-            start_col_idx = 3
-            city_names = kdf.iloc[city_row_idx, start_col_idx:]
-            city_norms = city_names.astype(str).apply(_normalize_text).tolist()
-            try:
-                if target in city_norms:
-                    city_col_offset = city_norms.index(target)
-                    city_col_idx = start_col_idx + city_col_offset
-                    # 2023 ay satırları: 137-148 (1-based) => 136-147 (0-based). Toplamını al
-                    month_start = 136
-                    month_end_inclusive = 147
-                    months_series = pd.to_numeric(kdf.iloc[month_start:month_end_inclusive+1, city_col_idx], errors="coerce")
-                    il_konut_toplam_2023 = float(months_series.dropna().sum()) if not months_series.dropna().empty else None
-                else:
-                    il_konut_toplam_2023 = None
-            except Exception:
-                il_konut_toplam_2023 = None
+            il_konut_toplam_2023 = _derived("konut_toplam").get(key)
         except Exception:
             il_konut_toplam_2023 = None
+        lap("konut")
 
         # Yabancıya konut satış toplamı 2023 (B=il, C=toplam). Her il olmayabilir
         try:
-            yabanci_path = DATA_PATH / "illere göre yabancıya konut satış.xls"
-            ydf = pd.read_excel(yabanci_path, header=None)
-            ydf = ydf.dropna(axis=0, how='all').dropna(axis=1, how='all')
-            ydf["_il"] = ydf.iloc[:, 1].astype(str)
-            ydf["_toplam"] = pd.to_numeric(ydf.iloc[:, 2], errors="coerce")
-            ydf["_il_norm"] = ydf["_il"].apply(_normalize_text)
-            yrow = ydf[ydf["_il_norm"] == target]
-            il_yabanci_konut_2023 = float(yrow["_toplam"].iloc[0]) if not yrow.empty else None
+            il_yabanci_konut_2023 = _derived("yabanci_konut_toplam").get(key)
         except Exception:
             il_yabanci_konut_2023 = None
+        lap("yabanci_konut")
 
         # Hastane yatak/sayı verileri kullanılmıyor (talep gereği kaldırıldı)
 
-        # Sağlık personeli detaylı (A=il, B=görev, Y=2023 adet), her il 46 satır blok
-        try:
-            sp_path = DATA_PATH / "illere göre sağlık personeli.xls"
-            sp = pd.read_excel(sp_path, header=None)
-            sp["_il"] = sp.iloc[:, 0].astype(str)
-            sp["_role"] = sp.iloc[:, 1].astype(str)
-            sp["_cnt"] = pd.to_numeric(sp.iloc[:, 24], errors="coerce")
-            sp["_il_norm"] = sp["_il"].apply(_normalize_text)
-
-            # A sütunundaki şehir satırından 16 ve 26 satır sonrasını oku
-            hekim_toplam = 0.0
-            hemsire_toplam = 0.0
-            start_idx = None
-            for i in range(len(sp)):
-                name = str(sp.iloc[i, 0]).strip()
-                if _normalize_text(name) == target:
-                    start_idx = i
-                    break
-            if start_idx is not None:
-                drow = start_idx + 16
-                nrow = start_idx + 26
-                if 0 <= drow < len(sp):
-                    dv = pd.to_numeric(sp.iloc[drow, 24], errors="coerce")
-                    if pd.notna(dv):
-                        hekim_toplam = float(dv)
-                if 0 <= nrow < len(sp):
-                    nv = pd.to_numeric(sp.iloc[nrow, 24], errors="coerce")
-                    if pd.notna(nv):
-                        hemsire_toplam = float(nv)
-            # Diğer kategoriler kullanılmıyor
-            ebe_toplam = 0.0
-            eczaci_toplam = 0.0
-            dis_toplam = 0.0
-            diger_toplam = 0.0
-        except Exception:
-            hekim_toplam = 0.0
-            hemsire_toplam = 0.0
-            ebe_toplam = 0.0
-            eczaci_toplam = 0.0
-            dis_toplam = 0.0
-            diger_toplam = 0.0
-
-        # Nüfus (şehirler 3. satırda E'den başlar; 4. satırda toplam nüfus)
+        # Sağlık personeli (her il 46 satır blok) ve nüfustan 100.000 kişiye düşen hekim/hemşire
         try:
-            pop_path = DATA_PATH / "il yaş cinsiyet nufus.xls"
-            pdf = pd.read_excel(pop_path, header=None)
-            pdf = pdf.dropna(axis=0, how='all').dropna(axis=1, how='all')
-            city_row = 2
-            pop_row = 3
-            start_col = 4  # E
-            cities_row_vals = pdf.iloc[city_row, start_col:]
-            cities_norm = cities_row_vals.astype(str).apply(_normalize_text).tolist()
-            if target in cities_norm:
-                cidx = start_col + cities_norm.index(target)
-                il_nufus_val = pd.to_numeric(pdf.iloc[pop_row, cidx], errors="coerce")
-                il_nufus = float(il_nufus_val) if pd.notna(il_nufus_val) else None
-            else:
-                il_nufus = None
+            hekim_per_100k, hemsire_per_100k = _derived("saglik_per_100k").get(key, (None, None))
         except Exception:
-            il_nufus = None
-
-        # Per-kapita ölçüler ve göreli değerlendirme (yalnızca doktor ve hemşire)
-        def _safe_rate(numer: float | None, denom: float | None, scale: float = 1.0) -> float | None:
-            if numer is None or denom is None or denom == 0:
-                return None
-            return float(numer) / float(denom) * scale
-
-        hekim_per_100k = _safe_rate(hekim_toplam, il_nufus, 100000.0)
-        hemsire_per_100k = _safe_rate(hemsire_toplam, il_nufus, 100000.0)
+            hekim_per_100k = None
+            hemsire_per_100k = None
+        lap("saglik_personeli")
 
         # Sağlık göstergelerini her durumda göster: düşükse 'düşük', değilse 'yeterli'
         def _fmt_health(label: str, val: float | None, threshold: float) -> str:
@@ -699,11 +3176,12 @@ def get_oneriler(il_adi: str):
                 })
 
         # Tarım fırsatı: alan yüksek (>=70p) ve tarım payı düşük (<=40p)
-        tarim_share = nominal_share.get("Tarım, ormancılık ve balıkçılık")
-        if il_tarim_alan is not None and tarim_share is not None:
-            # dağılım için sadece paylar
-            share_vals = [nominal_share[s] for s in nominal_share.keys() if "Tarım" in s or "Tarım, ormancılık" in s]
-            tarim_share_prc = _percentile_rank(share_vals if share_vals else [tarim_share], tarim_share)
+        # Tarım payının iller arası yüzdelik sırası siralama tablosundan okunur
+        try:
+            tarim_share_prc = _derived("siralama")["pay_tarim_ormancilik_ve_balikcilik"].percentiles.get(key)
+        except Exception:
+            tarim_share_prc = None
+        if il_tarim_alan is not None and tarim_share_prc is not None:
             if alan_prc >= 0.7 and tarim_share_prc <= 0.4:
                 opportunities.append({
                     "title": "Tarım işleme & lojistik",
@@ -848,9 +3326,10 @@ def get_oneriler(il_adi: str):
         }
 
         formula_note = (
-            "Skor = 0.5×min-max(hacim payı) + 0.5×min-max(2021-2023 ort. reel büyüme). "
+            f"Skor = {(params or DEFAULT_SCORE_PARAMS).formula}. "
             "Toplam/GSYH/Vergi gibi agregalar hariç tutulur."
         )
+        lap("anlati")
 
         return {
             "il": il_adi,
@@ -871,133 +3350,538 @@ def get_oneriler(il_adi: str):
         return {"error": f"Bir hata oluştu: {str(e)}"}
 
 
+@app.get("/nufus/{il_adi}")
+async def nufus_endpoint(il_adi: str, request: Request, yil: int | None = None):
+    return await cached_json(request, ["nufus"], lambda: run_heavy(get_nufus, il_adi, yil))
+
+
+def get_nufus(il_adi: str, yil: int | None = None):
+    """İlin yaş piramidi ve bağımlılık oranları (varsayılan en güncel yıl).
+
+    Genç bağımlılık = 0-14 / 15-64, yaşlı bağımlılık = 65+ / 15-64 (yüzde).
+    """
+    try:
+        cube = _derived("nufus_kupu")
+        row = cube.rows.get(_normalize_text(il_adi))
+        if row is None:
+            return {"error": "İl bulunamadı"}
+        if yil is None:
+            yil = cube.years[0]
+        if yil not in cube.years:
+            return {"error": f"Yıl bulunamadı. Geçerli yıllar: {cube.years[-1]}-{cube.years[0]}"}
+        block = cube.values[row, cube.years.index(yil)].astype(np.int64)  # yaş × cinsiyet
+        if (block < 0).any():
+            return {"error": "İl için bu yılın nüfus verisi eksik"}
+
+        groups = cube.age_groups[1:]
+        by_age = block[1:]
+        lower = np.array([int(re.match(r"\d+", g).group()) for g in groups])
+        genc = by_age[lower < 15, 0].sum()
+        calisan = by_age[(lower >= 15) & (lower < 65), 0].sum()
+        yasli = by_age[lower >= 65, 0].sum()
+        erkek, kadin = cube.sexes.index("erkek"), cube.sexes.index("kadin")
+
+        def ratio(part: int) -> float | None:
+            return None if calisan == 0 else round(float(part / calisan * 100.0), 2)
+
+        return {
+            "il": cube.provinces[row],
+            "yil": yil,
+            "toplam": int(block[0, 0]),
+            "erkek": int(block[0, erkek]),
+            "kadin": int(block[0, kadin]),
+            "piramit": [
+                {"yas_grubu": g, "erkek": int(v[erkek]), "kadin": int(v[kadin]), "toplam": int(v[0])}
+                for g, v in zip(groups, by_age)
+            ],
+            "bagimlilik": {"genc": ratio(genc), "yasli": ratio(yasli), "toplam": ratio(genc + yasli)},
+        }
+    except FileNotFoundError:
+        return {"error": "Veri dosyası bulunamadı."}
+    except Exception as e:
+        return {"error": f"Bir hata oluştu: {str(e)}"}
+
+
+@app.get("/saglik/{il_adi}")
+async def saglik_endpoint(
+    il_adi: str, request: Request, rol: str | None = None, kurum: str = "toplam", yil: str | None = None,
+):
+    """?rol=toplam_hekim,hemsire&kurum=ozel&yil=2019-2023 ile süzülebilir; varsayılan tüm meslekler ve yıllar."""
+    return await cached_json(request, ["saglik_personeli"], lambda: run_heavy(get_saglik, il_adi, rol, kurum, yil))
+
+
+def get_saglik(il_adi: str, rol: str | None = None, kurum: str = "toplam", yil: str | None = None):
+    """İlin meslek × yıl sağlık personeli serileri (sağlık personeli küpünden)."""
+    try:
+        cube = _derived("saglik_kupu")
+        row = cube.rows.get(_normalize_text(il_adi))
+        if row is None:
+            return {"error": "İl bulunamadı"}
+        roles = cube.roles if rol is None else [r.strip() for r in rol.split(",") if r.strip()]
+        unknown = [r for r in roles if r not in cube.roles]
+        if unknown:
+            return {"error": f"Bilinmeyen meslek: {', '.join(unknown)}. Geçerli meslekler: {', '.join(cube.roles)}"}
+        if kurum not in cube.institutions:
+            return {"error": f"Bilinmeyen kurum: {kurum}. Geçerli kurumlar: {', '.join(cube.institutions)}"}
+        try:
+            wanted = None if yil is None else set(parse_year_range(yil, "yil", cube.years))
+        except ValueError as e:
+            return {"error": str(e)}
+        cols = [i for i, y in enumerate(cube.years) if wanted is None or y in wanted]
+        k = cube.institutions.index(kurum)
+        series = []
+        for role in roles:
+            r = cube.roles.index(role)
+            values = cube.values[row, r, k, cols]
+            series.append({
+                "rol": role,
+                "ad": cube.role_names[r],
+                "degerler": [None if np.isnan(v) else float(v) for v in values],
+            })
+        return {
+            "il": cube.provinces[row],
+            "kurum": kurum,
+            "years": [cube.years[i] for i in cols],
+            "roller": series,
+        }
+    except FileNotFoundError:
+        return {"error": "Veri dosyası bulunamadı."}
+    except Exception as e:
+        return {"error": f"Bir hata oluştu: {str(e)}"}
+
+
+_MONTH_RE = re.compile(r"^\s*(\d{4})-(\d{1,2})\s*$")
+
+
+def parse_month(text: str, name: str) -> str:
+    """"2023-1" / "2023-01" -> "2023-01"; geçersizse ValueError."""
+    m = _MONTH_RE.match(text)
+    if not m or not 1 <= int(m.group(2)) <= 12:
+        raise ValueError(f"Geçersiz {name}: {text}. Biçim YYYY-AA olmalı (örn. 2023-01)")
+    return f"{m.group(1)}-{int(m.group(2)):02d}"
+
+
+@app.get("/konut/{il_adi}")
+async def konut_endpoint(
+    il_adi: str, request: Request, start: str | None = Query(None, alias="from"), end: str | None = Query(None, alias="to"),
+):
+    """?from=2023-01&to=2023-12 ile ay aralığı seçilir; varsayılan tüm seri."""
+    return await cached_json(
+        request, ["konut", "yabanci_konut"], lambda: run_heavy(get_konut, il_adi, start, end),
+    )
+
+
+def get_konut(il_adi: str, start: str | None = None, end: str | None = None):
+    """İlin aylık konut satışları ve yabancıya satışları; aralık toplamı ve son 12 ay (birikimli seriden)."""
+    try:
+        series = _derived("konut_aylik")
+        foreign = _derived("yabanci_konut_aylik")
+        key = _normalize_text(il_adi)
+        row = series.rows.get(key)
+        if row is None:
+            return {"error": "İl bulunamadı"}
+        if not series.months:
+            return {"error": "Konut satış verisi bulunamadı"}
+        try:
+            start = series.months[0] if start is None else parse_month(start, "from")
+            end = series.months[-1] if end is None else parse_month(end, "to")
+        except ValueError as e:
+            return {"error": str(e)}
+        if start > end:
+            return {"error": "from, to'dan sonra olamaz"}
+        i, j = series.position(start), series.position(end)
+        if i is None or j is None:
+            return {"error": f"Ay bulunamadı. Geçerli aralık: {series.months[0]} - {series.months[-1]}"}
+
+        def summary(store: MonthlySeries, r: int) -> dict:
+            # Yabancıya satış serisinin ay ekseni farklı olabilir; aylar adıyla eşlenir
+            values = []
+            for month in series.months[i:j + 1]:
+                pos = store.position(month)
+                values.append(None if pos is None or np.isnan(store.values[r, pos]) else float(store.values[r, pos]))
+            last = store.offset(end)
+            return {
+                "satis": values,
+                "toplam": store.total(r, store.offset(start), last),
+                # to ayıyla biten 12 ay; seri 12 aydan kısaysa None
+                "son_12_ay": store.total(r, last - 11, last) if 11 <= last < len(store.months) else None,
+            }
+
+        result = {
+            "il": series.provinces[row],
+            "from": start,
+            "to": end,
+            "aylar": series.months[i:j + 1],
+            **summary(series, row),
+        }
+        foreign_row = foreign.rows.get(key)
+        # Yabancıya satış verisi yalnızca en çok satış yapılan illeri kapsar
+        result["yabanci"] = None if foreign_row is None else summary(foreign, foreign_row)
+        return result
+    except FileNotFoundError:
+        return {"error": "Veri dosyası bulunamadı."}
+    except Exception as e:
+        return {"error": f"Bir hata oluştu: {str(e)}"}
+
+
+# -------------------- Harita görselleri --------------------
+# cities/ altındaki "<İl> Map Chart.png" dosyaları il adına hazır bir dizinle
+# eşlenir (ASCII yazımlar ve "K. Maras" gibi kısaltmalar dahil). Her görselin
+# küçük/büyük boyutları WebP ve PNG olarak MAP_CACHE_PATH altına bir kez yazılır;
+# `python -m materialize` hepsini önceden üretir, eksik olan ilk istekte üretilir.
+
+MAP_SIZES = {"kucuk": 160, "buyuk": 480}  # genişlik (px)
+MAP_FORMATS = ("webp", "png")
+# Boyut/kodlama ayarları değişince artırılır; dosya adları, dolayısıyla URL'ler değişir
+MAP_VARIANT_VERSION = 1
+_MAP_FILE_RE = re.compile(r"\s*map\s*chart\.png$", re.IGNORECASE)
+# Dosya adından il adı çıkmayan görseller: dosya anahtarı -> il anahtarı
+_MAP_ALIASES = {"k_maras": "kahramanmaras"}
+
+
+@dataclass
+class MapImage:
+    file: Path
+    digest: str    # özgün dosyanın içerik özeti
+    width: int
+    height: int
+
+
+MAP_PAYLOAD_CACHE_SIZE = int(os.environ.get("MAP_PAYLOAD_CACHE_SIZE", 256))
+
+# (klasör, klasörün mtime'ı), il anahtarı -> görsel
+_MAP_INDEX: tuple[tuple[Path, int], dict[str, MapImage]] | None = None
+# (il anahtarı, özet) -> /harita yanıtının görsel bölümü (LRU)
+_MAP_PAYLOADS: OrderedDict[tuple[str, str], dict] = OrderedDict()
+_MAP_LOCK = threading.Lock()
+
+
+def _map_key(name: str) -> str:
+    """İl adı ya da dosya adından eşleme anahtarı: 'Şanlıurfa' / 'Sanliurfa' -> 'sanliurfa'."""
+    return _indicator_slug(name)
+
+
+def _map_index() -> dict[str, MapImage]:
+    """İl anahtarı -> harita görseli.
+
+    İstek başına yalnızca klasörün mtime'ına bakılır; dosya eklenip silinince ya
+    da yerine taşınınca (kopyalama araçlarının yaptığı gibi) dizin yeniden kurulur.
+    """
+    global _MAP_INDEX
+    try:
+        version = (CITY_IMAGES_PATH, CITY_IMAGES_PATH.stat().st_mtime_ns)
+    except FileNotFoundError:
+        version = (CITY_IMAGES_PATH, -1)
+    with _MAP_LOCK:
+        if _MAP_INDEX is not None and _MAP_INDEX[0] == version:
+            return _MAP_INDEX[1]
+    files = sorted(p for p in CITY_IMAGES_PATH.glob("*.png") if _MAP_FILE_RE.search(p.name)) \
+        if version[1] >= 0 else []
+    index = {}
+    for path in files:
+        data = path.read_bytes()
+        width, height = struct.unpack(">II", data[16:24])  # PNG IHDR
+        key = _map_key(_MAP_FILE_RE.sub("", path.name))
+        index[_MAP_ALIASES.get(key, key)] = MapImage(path, hashlib.sha256(data).hexdigest()[:16], width, height)
+    with _MAP_LOCK:
+        _MAP_INDEX = (version, index)
+    return index
+
+
+def _render_maps(source: Path, sizes: list[tuple[int, int]]) -> dict[tuple[int, str], bytes]:
+    """Görseli bir kez açıp her (genişlik, yükseklik) için MAP_FORMATS kodlamalarını üretir.
+
+    Harita çizimleri az renklidir; 256 renkli palete indirip kayıpsız kodlamak
+    hem PNG'de hem WebP'de kayıplı WebP'den küçük dosya verir.
+    """
+    out: dict[tuple[int, str], bytes] = {}
+    with Image.open(source) as img:
+        img = img.convert("RGBA")
+        # Büyükten küçüğe: her boyut bir öncekinden küçültülür
+        for width, height in sorted(set(sizes), reverse=True):
+            if img.width != width:
+                img = img.resize((width, height), Image.LANCZOS)
+            palette = img.quantize(256, method=Image.Quantize.FASTOCTREE)
+            for fmt in MAP_FORMATS:
+                buf = io.BytesIO()
+                if fmt == "webp":
+                    palette.save(buf, "WEBP", lossless=True, method=4)
+                else:
+                    palette.save(buf, "PNG", optimize=True)
+                out[(width, fmt)] = buf.getvalue()
+    return out
+
+
+def _write_map_file(name: str, body: bytes) -> None:
+    """Geçici dosyaya yazıp yerine taşır; aynı dosyayı üreten iş parçacıkları/süreçler çakışmaz."""
+    target = MAP_CACHE_PATH / name
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=target.parent, prefix=f".{name}.", suffix=".tmp", delete=False) as tmp:
+        tmp.write(body)
+    try:
+        os.replace(tmp.name, target)
+    except OSError:
+        Path(tmp.name).unlink(missing_ok=True)
+        raise
+
+
+def _map_variants(key: str, image: MapImage) -> dict:
+    """Görselin özgün ve küçültülmüş sürümlerini (yoksa üretip) URL'leriyle döner."""
+    with _MAP_LOCK:
+        cached = _MAP_PAYLOADS.get((key, image.digest))
+        if cached is not None:
+            _MAP_PAYLOADS.move_to_end((key, image.digest))
+            return cached
+    original = f"{key}-{image.digest}.png"
+    if not (MAP_CACHE_PATH / original).exists():
+        _write_map_file(original, image.file.read_bytes())
+    sizes: dict[str, tuple[int, int]] = {}
+    names: dict[tuple[int, str], str] = {}
+    if Image is None:
+        logger.warning("Pillow kurulu değil; %s için yalnızca özgün harita görseli verilir", key)
+    else:
+        for label, width in MAP_SIZES.items():
+            width = min(width, image.width)
+            sizes[label] = (width, round(image.height * width / image.width))
+            for fmt in MAP_FORMATS:
+                digest = hashlib.sha256(f"{image.digest}:{MAP_VARIANT_VERSION}:{width}:{fmt}".encode()).hexdigest()[:16]
+                names[(width, fmt)] = f"{key}-{width}-{digest}.{fmt}"
+    missing = [k for k, name in names.items() if not (MAP_CACHE_PATH / name).exists()]
+    if missing:
+        rendered = _render_maps(image.file, [size for size in sizes.values() if any(size[0] == w for w, _ in missing)])
+        for k in missing:
+            _write_map_file(names[k], rendered[k])
+
+    def url(name: str) -> dict:
+        return {"url": f"/harita_gorsel/{name}", "bayt": (MAP_CACHE_PATH / name).stat().st_size}
+
+    payload = {
+        "dosya": image.file.name,
+        "orijinal": {**url(original), "genislik": image.width, "yukseklik": image.height},
+        "boyutlar": {
+            label: {"genislik": w, "yukseklik": h, **{fmt: url(names[(w, fmt)]) for fmt in MAP_FORMATS}}
+            for label, (w, h) in sizes.items()
+        },
+    }
+    with _MAP_LOCK:
+        _MAP_PAYLOADS[(key, image.digest)] = payload
+        _MAP_PAYLOADS.move_to_end((key, image.digest))
+        while len(_MAP_PAYLOADS) > MAP_PAYLOAD_CACHE_SIZE:
+            _MAP_PAYLOADS.popitem(last=False)
+    return payload
+
+
+def write_map_variants(remove_stale: bool = True) -> int:
+    """Tüm illerin harita görsellerini üretir; remove_stale ile artık kullanılmayan dosyaları siler."""
+    keep: set[str] = set()
+    for key, image in _map_index().items():
+        payload = _map_variants(key, image)
+        keep.add(payload["orijinal"]["url"].rsplit("/", 1)[1])
+        for entry in payload["boyutlar"].values():
+            keep.update(entry[fmt]["url"].rsplit("/", 1)[1] for fmt in MAP_FORMATS)
+    if remove_stale and MAP_CACHE_PATH.exists():
+        for path in MAP_CACHE_PATH.iterdir():
+            if path.is_file() and path.name not in keep:
+                path.unlink(missing_ok=True)
+    return len(keep)
+
+
+@app.get("/harita/{il_adi}")
+async def harita_endpoint(il_adi: str):
+    return await run_heavy(get_harita, il_adi)
+
+
+def get_harita(il_adi: str):
+    """İlin harita görselinin özgün ve küçültülmüş (WebP/PNG) sürümlerinin URL'leri."""
+    try:
+        key = _map_key(il_adi)
+        key = _MAP_ALIASES.get(key, key)
+        image = _map_index().get(key)
+        if image is None:
+            return {"error": "İl için harita görseli bulunamadı"}
+        return {"il": il_adi, **_map_variants(key, image)}
+    except Exception as e:
+        return {"error": f"Bir hata oluştu: {str(e)}"}
+
+
 @app.get("/saglik_test")
+async def saglik_test_endpoint(request: Request, il_adi: str | None = None, stream: bool = False):
+    if stream:
+        # ?stream=1: her il hesaplandıkça bir NDJSON satırı, en sonda {"summary": ...}
+        try:
+            cities = await run_heavy(saglik_test_cities, il_adi)
+        except FileNotFoundError:
+            return {"error": "Veri dosyası bulunamadı."}
+        except Exception as e:
+            return {"error": f"Bir hata oluştu: {str(e)}"}
+        return ndjson_response(cities, saglik_test_il, summary=lambda rows: {"summary": _saglik_test_summary(rows)})
+    return await cached_json(
+        request, SAGLIK_TEST_SOURCES, lambda: saglik_test_fanout(il_adi),
+        materialized=materialized_file("saglik_test") if il_adi is None else None,
+    )
+
+
 def saglik_test(il_adi: str | None = None):
     """
     Doktor ve hemşire metrikleri için iller bazında veri mevcudiyet testleri yapar.
     Dönüş: her il için bulunan/bulunamayan parçalar ve nedenleri.
     """
     try:
-        pop_map: dict[str, float] = {}
-        cities_list: list[str] = []
-        try:
-            pop_path = DATA_PATH / "il yaş cinsiyet nufus.xls"
-            pdf = pd.read_excel(pop_path, header=None)
-            pdf = pdf.dropna(axis=0, how='all').dropna(axis=1, how='all')
-            city_row = 2
-            pop_row = 3
-            start_col = 4
-            for cidx in range(start_col, pdf.shape[1]):
-                city_name = str(pdf.iloc[city_row, cidx]) if city_row < len(pdf) and cidx < pdf.shape[1] else None
-                if city_name is None or str(city_name).strip() == "" or str(city_name).strip().lower() == "nan":
-                    continue
-                ncity = _normalize_text(city_name)
-                pop_val = pd.to_numeric(pdf.iloc[pop_row, cidx], errors="coerce") if pop_row < len(pdf) else None
-                if pd.notna(pop_val):
-                    pop_map[ncity] = float(pop_val)
-                    cities_list.append(str(city_name).strip())
-        except Exception:
-            pass
-
-        # sağlık personeli dosyasını oku
-        sp = None
-        try:
-            sp_path = DATA_PATH / "illere göre sağlık personeli.xls"
-            sp = pd.read_excel(sp_path, header=None)
-            sp["_il"] = sp.iloc[:, 0].astype(str)
-            sp["_role"] = sp.iloc[:, 1].astype(str)
-            sp["_cnt"] = pd.to_numeric(sp.iloc[:, 24], errors="coerce")
-            sp["_il_norm"] = sp["_il"].apply(_normalize_text)
-        except Exception:
-            sp = None
-
-        # sağlık personeli dosyasından şehirleri oku
-        derived_cities: list[str] = []
-        if sp is not None:
-            prev_city_norm = None
-            for i in range(len(sp)):
-                raw = sp.iloc[i, 0]
-                if raw is None:
-                    continue
-                name = str(raw).strip()
-                if not name or name.lower() == "nan":
-                    continue
-                cname = _normalize_text(name)
-                if cname != prev_city_norm:
-                    derived_cities.append(name)
-                    prev_city_norm = cname
-        if derived_cities:
-            cities_list = derived_cities
-
-        # Ofsete göre satır okuma: A sütununda şehir satırını bul → +16 ve +26 satır
-
-        results: list[dict[str, object]] = []
-        for city in cities_list:
-            if il_adi is not None and _normalize_text(city) != _normalize_text(il_adi):
-                continue
-            ncity = _normalize_text(city)
-            reasons: list[str] = []
-            pop = pop_map.get(ncity)
-            if pop is None:
-                reasons.append("Nüfus verisi bulunamadı")
-
-            doctor_total = None
-            nurse_total = None
-            if sp is None:
-                reasons.append("Sağlık personeli dosyası okunamadı")
-            else:
-                sidx = None
-                for i in range(len(sp)):
-                    raw = sp.iloc[i, 0]
-                    if raw is None:
-                        continue
-                    if _normalize_text(str(raw)) == ncity:
-                        sidx = i
-                        break
-                if sidx is None:
-                    reasons.append("Şehir satırı bulunamadı (A sütunu)")
-                else:
-                    drow = sidx + 16
-                    nrow = sidx + 26
-                    if 0 <= drow < len(sp):
-                        dv = pd.to_numeric(sp.iloc[drow, 24], errors="coerce")
-                        if pd.notna(dv):
-                            doctor_total = float(dv)
-                    if 0 <= nrow < len(sp):
-                        nv = pd.to_numeric(sp.iloc[nrow, 24], errors="coerce")
-                        if pd.notna(nv):
-                            nurse_total = float(nv)
-                if doctor_total is None:
-                    reasons.append("Doktor (TOPLAM HEKİM) hücresi okunamadı")
-                if nurse_total is None:
-                    reasons.append("Hemşire hücresi okunamadı")
-
-            doctor_per_100k = (doctor_total / pop * 100000.0) if (doctor_total is not None and pop and pop > 0) else None
-            nurse_per_100k = (nurse_total / pop * 100000.0) if (nurse_total is not None and pop and pop > 0) else None
-
-            results.append({
-                "il": city,
-                "population": pop,
-                "doctor_total": doctor_total,
-                "nurse_total": nurse_total,
-                "doctor_per_100k": None if doctor_per_100k is None else round(doctor_per_100k, 2),
-                "nurse_per_100k": None if nurse_per_100k is None else round(nurse_per_100k, 2),
-                "has_doctor": doctor_total is not None,
-                "has_nurse": nurse_total is not None,
-                "reasons": reasons,
-            })
+        pop_map, cities_list, cube = _saglik_test_context()
+        results = [_saglik_test_row(city, pop_map, cube) for city in _filter_cities(cities_list, il_adi)]
+        return {"summary": _saglik_test_summary(results), "results": results}
 
-        # özet sayılar
-        summary = {
-            "total": len(results),
-            "missing_doctor": sum(1 for r in results if r.get("doctor_total") is None),
-            "missing_nurse": sum(1 for r in results if r.get("nurse_total") is None),
-            "missing_population": sum(1 for r in results if r.get("population") in (None, 0)),
-        }
+    except FileNotFoundError:
+        return {"error": "Veri dosyası bulunamadı."}
+    except Exception as e:
+        return {"error": f"Bir hata oluştu: {str(e)}"}
 
-        return {"summary": summary, "results": results}
 
+async def saglik_test_fanout(il_adi: str | None = None):
+    """saglik_test ile aynı yanıt; şehirler fan_out ile (FANOUT_WORKERS > 0 ise süreç havuzunda) hesaplanır."""
+    try:
+        cities = await run_heavy(saglik_test_cities, il_adi)
+        results = await fan_out(saglik_test_il, cities)
+        return {"summary": _saglik_test_summary(results), "results": results}
     except FileNotFoundError:
         return {"error": "Veri dosyası bulunamadı."}
     except Exception as e:
         return {"error": f"Bir hata oluştu: {str(e)}"}
+
+
+def saglik_test_cities(il_adi: str | None = None) -> list[str]:
+    """Akış ve fan_out modunda işlenecek şehirler (saglik_test ile aynı sırada)."""
+    return _filter_cities(_saglik_test_context()[1], il_adi)
+
+
+def saglik_test_il(city: str) -> dict[str, object]:
+    """Tek şehrin saglik_test satırı; akış ve fan_out modunda her şehir ayrı iş olarak çalışır."""
+    pop_map, _, cube = _saglik_test_context()
+    return _saglik_test_row(city, pop_map, cube)
+
+
+def _filter_cities(cities: list[str], il_adi: str | None) -> list[str]:
+    if il_adi is None:
+        return cities
+    return [c for c in cities if _normalize_text(c) == _normalize_text(il_adi)]
+
+
+def _saglik_test_context() -> tuple[dict[str, float], list[str], HealthPersonnelCube | None]:
+    return cached_payload(("saglik_test_context",), SAGLIK_TEST_SOURCES, _build_saglik_test_context)
+
+
+def _build_saglik_test_context() -> tuple[dict[str, float], list[str], HealthPersonnelCube | None]:
+    """(il -> nüfus, şehir listesi, sağlık personeli küpü ya da okunamadıysa None)."""
+    pop_map: dict[str, float] = {}
+    cities_list: list[str] = []
+    try:
+        pop_map = _derived("nufus_toplam")
+        cities_list = [c for c in province_names() if _normalize_text(c) in pop_map]
+    except Exception:
+        pass
+
+    # sağlık personeli küpü; şehirler küpteki il blokları (ülke toplamı dahil)
+    try:
+        cube = _derived("saglik_kupu")
+    except Exception:
+        cube = None
+    if cube is not None and cube.provinces:
+        cities_list = cube.provinces
+    return pop_map, cities_list, cube
+
+
+def _saglik_test_row(city: str, pop_map: dict[str, float], cube: HealthPersonnelCube | None) -> dict[str, object]:
+    # Küpten ilin son yıl toplam hekim ve hemşire sayısı
+    ncity = _normalize_text(city)
+    reasons: list[str] = []
+    pop = pop_map.get(ncity)
+    if pop is None:
+        reasons.append("Nüfus verisi bulunamadı")
+
+    doctor_total = None
+    nurse_total = None
+    if cube is None:
+        reasons.append("Sağlık personeli dosyası okunamadı")
+    else:
+        row = cube.rows.get(ncity)
+        if row is None:
+            reasons.append("Şehir satırı bulunamadı (A sütunu)")
+        else:
+            dv = cube.latest("toplam_hekim")[row]
+            if not np.isnan(dv):
+                doctor_total = float(dv)
+            nv = cube.latest("hemsire")[row]
+            if not np.isnan(nv):
+                nurse_total = float(nv)
+        if doctor_total is None:
+            reasons.append("Doktor (TOPLAM HEKİM) hücresi okunamadı")
+        if nurse_total is None:
+            reasons.append("Hemşire hücresi okunamadı")
+
+    doctor_per_100k = (doctor_total / pop * 100000.0) if (doctor_total is not None and pop and pop > 0) else None
+    nurse_per_100k = (nurse_total / pop * 100000.0) if (nurse_total is not None and pop and pop > 0) else None
+
+    return {
+        "il": city,
+        "population": pop,
+        "doctor_total": doctor_total,
+        "nurse_total": nurse_total,
+        "doctor_per_100k": None if doctor_per_100k is None else round(doctor_per_100k, 2),
+        "nurse_per_100k": None if nurse_per_100k is None else round(nurse_per_100k, 2),
+        "has_doctor": doctor_total is not None,
+        "has_nurse": nurse_total is not None,
+        "reasons": reasons,
+    }
+
+
+def _saglik_test_summary(results: list[dict[str, object]]) -> dict[str, int]:
+    # özet sayılar (akışta hata satırları da sayıya girer)
+    return {
+        "total": len(results),
+        "missing_doctor": sum(1 for r in results if r.get("doctor_total") is None),
+        "missing_nurse": sum(1 for r in results if r.get("nurse_total") is None),
+        "missing_population": sum(1 for r in results if r.get("population") in (None, 0)),
+    }
+
+
+# -------------------- İl özeti (tek istekte sayfa verisi) --------------------
+
+OZET_PARTS = ("gsyh", "gsyh_reel", "oneri", "oneriler")
+OZET_SOURCES = {"gsyh": ["cari"], "gsyh_reel": ["reel"], "oneri": ["oneri"], "oneriler": ONERILER_SOURCES}
+
+
+@app.get("/il/{il_adi}/ozet")
+async def il_ozet_endpoint(il_adi: str, request: Request, include: str | None = None):
+    parts = OZET_PARTS
+    if include:
+        requested = {x.strip() for x in include.split(",") if x.strip()}
+        unknown = sorted(requested - set(OZET_PARTS))
+        if unknown:
+            return {"error": f"Bilinmeyen alan: {', '.join(unknown)}. Geçerli alanlar: {', '.join(OZET_PARTS)}"}
+        parts = tuple(p for p in OZET_PARTS if p in requested)
+    deps = sorted({d for part in parts for d in OZET_SOURCES[part]})
+    return await cached_json(
+        request, deps,
+        lambda: run_single_flight(("ozet", _normalize_text(il_adi), il_adi, parts), get_il_ozet, il_adi, parts),
+        materialized=materialized_file("ozet", il_adi) if parts == OZET_PARTS else None,
+    )
+
+
+def get_il_ozet(il_adi: str, parts: tuple[str, ...] = OZET_PARTS) -> Dict[str, Any]:
+    """
+    İl sayfasının ihtiyaç duyduğu /gsyh, /gsyh_reel, /oneri ve /oneriler yanıtlarını
+    tek yanıtta döner. Her alan ilgili uç noktanın yanıtıyla (hata dahil) aynıdır.
+    - include=gsyh,oneriler gibi virgülle ayrılmış liste ile alanlar seçilebilir
+    - Parçalar tek işte aynı veri seti sürümlerinden hesaplanır; cari son yıl
+      tablosu gsyh ve oneriler arasında ortak kullanılır
+    """
+    builders: dict[str, Callable[[str], Any]] = {
+        "gsyh": get_gsyh,
+        "gsyh_reel": get_gsyh_reel,
+        "oneri": get_oneri,
+        "oneriler": get_oneriler,
+    }
+    payload: Dict[str, Any] = {"il": il_adi}
+    for part in parts:
+        payload[part] = builders[part](il_adi)
+    return payload
@@ -0,0 +1,38 @@
+"""Tüm illerin API yanıtlarını önceden üretip JSON dosyaları olarak yazar.
+
+Kullanım (backend dizininde):
+    python -m materialize                    # MATERIALIZED_PATH altına
+    python -m materialize --out /tmp/paket
+
+Her çalıştırma kod ve veri dosyası sürümlerinden türetilen yeni bir dizine
+yazar ve CURRENT dosyasını o dizine çevirir. API, SERVE_MATERIALIZED=1 ile
+başlatıldığında paket güncel olduğu sürece yanıtları bu dosyalardan verir.
+Harita görsellerinin küçültülmüş sürümleri de MAP_CACHE_PATH altına üretilir.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from main import MAP_CACHE_PATH, MATERIALIZED_PATH, load_datasets, write_map_variants, write_materialized
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="İl yanıtlarını önceden üretip JSON olarak yazar.")
+    parser.add_argument("--out", type=Path, default=MATERIALIZED_PATH, help="Çıktı dizini")
+    parser.add_argument("--keep", type=int, default=2, help="Diskte tutulacak paket sayısı")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    load_datasets()
+    manifest = write_materialized(args.out, keep=args.keep)
+    print(f"{manifest['provinces']} il  sürüm {manifest['version']}")
+    print(f"{args.out} ({time.perf_counter() - start:.1f} sn)")
+    start = time.perf_counter()
+    files = write_map_variants()
+    print(f"{files} harita görseli  {MAP_CACHE_PATH} ({time.perf_counter() - start:.1f} sn)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
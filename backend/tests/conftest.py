@@ -0,0 +1,39 @@
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def heavy_semaphore(monkeypatch):
+    # Semafor ilk bekleyişte olay döngüsüne bağlanır; asyncio.run ile çalışan testler kendi semaforunu açar
+    monkeypatch.setattr(main, "_HEAVY_SEMAPHORE", None)
+
+
+@pytest.fixture(scope="session")
+def app_data():
+    """TÜİK çalışma kitaplarını oturum başına bir kez yükler."""
+    main.load_datasets()
+    return main
+
+
+@pytest.fixture(scope="session")
+def client(app_data):
+    from fastapi.testclient import TestClient
+
+    with TestClient(app_data.app) as c:
+        yield c
+
+
+@pytest.fixture
+def data_copy(app_data, tmp_path, monkeypatch):
+    """Çalışma kitaplarının geçici kopyası (mtime'lar korunur); testler dosyalara dokunabilir."""
+    target = tmp_path / "veri"
+    shutil.copytree(app_data.DATA_PATH, target)
+    monkeypatch.setattr(app_data, "DATA_PATH", target)
+    return target
@@ -0,0 +1,50 @@
+import gzip
+
+import main
+
+
+def test_buyuk_yanit_sikistirilir_ve_saklanir(client):
+    response = client.get("/oneriler_tumu", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"].startswith("Accept-Encoding")
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert main._cached_body(response.headers["etag"]) is not None
+
+
+def test_kucuk_yanit_sikistirilmaz(client):
+    response = client.get("/gsyh/Ankara", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+
+def test_hata_yaniti_govde_onbellegine_girmez(client, monkeypatch):
+    monkeypatch.setattr(main, "COMPRESS_MIN_SIZE", 1)
+    before = len(main._BODIES)
+    response = client.get("/nufus/Ankara", params={"yil": 1990}, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["cache-control"] == "no-store"
+    assert "etag" not in response.headers
+    assert "error" in response.json()
+    assert len(main._BODIES) == before
+
+
+def test_kodlama_secimi():
+    assert main.negotiate_encoding("gzip;q=0.5, br;q=0.9") == ("br" if main.brotli else "gzip")
+    assert main.negotiate_encoding("br;q=0, gzip") == "gzip"
+    assert main.negotiate_encoding("identity") is None
+    assert main.negotiate_encoding(None) is None
+
+
+def test_gzip_govdesi_ayni():
+    body = main.EncodedBody(b'{"a":1}' * 500)
+    assert gzip.decompress(body.get("gzip")) == body.identity
+    assert body.get("gzip") is body.encoded["gzip"]
+
+
+def test_render_json_numpy_pandas():
+    import json
+
+    import numpy as np
+    import pandas as pd
+
+    content = {"a": np.int64(3), "b": np.float32(1.5), "c": [np.float64(2.25)], "d": pd.NaT, "e": {1: "x"}}
+    assert json.loads(main.render_json(content)) == {"a": 3, "b": 1.5, "c": [2.25], "d": None, "e": {"1": "x"}}
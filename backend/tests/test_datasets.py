@@ -0,0 +1,16 @@
+import main
+
+
+def test_ham_sayfa_yuklemeden_sonra_birakilir(app_data, tmp_path, monkeypatch):
+    # Boş görüntü dizini: veri seti Excel'den okunur
+    monkeypatch.setattr(main, "SNAPSHOT_PATH", tmp_path)
+    ds = main._load_dataset("cari")
+    assert ds.origin == "excel"
+    assert not [k for k in main._EXCEL_CACHE if k[0] == str(ds.path)]
+
+
+def test_tum_veri_setleri_yuklu(app_data):
+    assert set(main._DATASETS) == set(main.DATASET_SOURCES)
+    for name, ds in main._DATASETS.items():
+        assert ds.version == main._file_version(ds.path)
+        assert ds.index, name
@@ -0,0 +1,36 @@
+import main
+
+
+def test_etkilenen_tablolar():
+    affected = set(main.affected_tables(["issizlik"]))
+    assert {"issizlik_oran", "siralama", "karsilastirma"} <= affected
+    assert not affected & {"nominal_table", "reel_growth", "konut_aylik", "nufus_kupu"}
+
+    affected = set(main.affected_tables(["konut"]))
+    assert {"konut_aylik", "konut_toplam", "siralama"} <= affected
+    assert "yabanci_konut_aylik" not in affected
+
+
+def test_yalnizca_bagli_tablolar_yeniden_kurulur(app_data):
+    unrelated = {name: main._derived(name) for name in ("nominal_table", "reel_growth", "konut_aylik")}
+    stale = {name: main._derived(name) for name in ("issizlik_oran", "siralama")}
+
+    main.invalidate_datasets(["issizlik"])
+    assert main.rebuild_affected(["issizlik"]) == {}
+
+    for name, table in unrelated.items():
+        assert main._derived(name) is table
+    for name, table in stale.items():
+        assert main._derived(name) is not table
+
+
+def test_bagli_yanitlar_silinir(app_data):
+    main.get_gsyh("Ankara")
+    main.get_oneriler("Ankara")
+    keys = set(main._PAYLOADS)
+    assert any(k[0] == "gsyh" for k in keys) and any(k[0] == "oneriler" for k in keys)
+
+    assert main.drop_payloads(["issizlik"]) > 0
+    kinds = {k[0] for k in main._PAYLOADS}
+    assert "gsyh" in kinds
+    assert "oneriler" not in kinds
@@ -0,0 +1,67 @@
+import asyncio
+import threading
+
+import pytest
+
+import main
+
+
+def test_fan_out_sureci_havuzu_ayni_sonucu_verir(app_data, monkeypatch):
+    keys = app_data.province_names()[:6]
+    expected = asyncio.run(main.fan_out(main.saglik_test_il, keys))
+    monkeypatch.setattr(main, "FANOUT_WORKERS", 2)
+    monkeypatch.setattr(main, "FANOUT_CHUNK", 2)
+    try:
+        main.start_fanout_executor()
+        assert main._FANOUT_EXECUTOR._mp_context.get_start_method() != "fork"
+        got = asyncio.run(main.fan_out(main.saglik_test_il, keys))
+    finally:
+        main.shutdown_fanout_executor()
+    assert got == expected
+
+
+@pytest.mark.parametrize("keys", [[], ["Ankara"]])
+def test_fan_out_havuzsuz(app_data, keys):
+    rows = asyncio.run(main.fan_out(main.saglik_test_il, keys))
+    assert len(rows) == len(keys)
+
+
+def test_bagimliliklar_olay_dongusu_disinda_cozulur(app_data, monkeypatch):
+    threads = []
+    lookup = main._lookup_payload
+
+    def recording_lookup(key, deps):
+        threads.append(threading.get_ident())
+        return lookup(key, deps)
+
+    async def build():
+        return {"ok": True}
+
+    async def scenario():
+        value = await main.cached_payload_async(("test", "dongu"), ["province_names"], build)
+        return value, threading.get_ident()
+
+    monkeypatch.setattr(main, "_lookup_payload", recording_lookup)
+    value, loop_thread = asyncio.run(scenario())
+    assert value == {"ok": True}
+    assert threads and loop_thread not in threads
+
+
+def _worker_origins():
+    return {name: ds.origin for name, ds in main._DATASETS.items()}
+
+
+def test_isciler_anlik_goruntuden_yukler(app_data, tmp_path, monkeypatch):
+    # İşçiler ortamı devralır ve görüntüyü aynı dizinden okur
+    monkeypatch.setenv("SNAPSHOT_PATH", str(tmp_path))
+    monkeypatch.setattr(main, "SNAPSHOT_PATH", tmp_path)
+    monkeypatch.setattr(main, "FANOUT_WORKERS", 1)
+    try:
+        main.start_fanout_executor()
+        origins = main._FANOUT_EXECUTOR.submit(_worker_origins).result()
+    finally:
+        main.shutdown_fanout_executor()
+    assert set(main._read_manifest(tmp_path)["datasets"]) == set(main.DATASET_SOURCES)
+    assert set(origins.values()) == {"snapshot"}
+    # Görüntü güncelken yeniden yazılmaz
+    assert main.ensure_snapshot() == []
@@ -0,0 +1,71 @@
+import shutil
+import threading
+from collections import OrderedDict
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def map_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "MAP_CACHE_PATH", tmp_path)
+    monkeypatch.setattr(main, "_MAP_PAYLOADS", OrderedDict())
+    return tmp_path
+
+
+def test_tum_iller_gorsele_eslenir(app_data):
+    index = main._map_index()
+    missing = [il for il in main.province_names() if main._map_key(il) not in index]
+    assert missing == []
+
+
+def test_kisaltilmis_ad(app_data, map_cache):
+    payload = main.get_harita("K. Maras")
+    assert payload["dosya"] == "K. Maras Map Chart.png"
+    assert main.get_harita("Kahramanmaraş")["orijinal"] == payload["orijinal"]
+    assert "error" in main.get_harita("Yokil")
+
+
+def test_ayni_dosyayi_yazan_is_parcaciklari_cakismaz(map_cache):
+    bodies = [bytes([i]) * 50_000 for i in range(8)]
+    errors = []
+
+    def write(body):
+        try:
+            for _ in range(20):
+                main._write_map_file("ayni.png", body)
+        except Exception as e:  # pragma: no cover - hata testte raporlanır
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(b,)) for b in bodies]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert (map_cache / "ayni.png").read_bytes() in bodies
+    assert [p.name for p in map_cache.iterdir()] == ["ayni.png"]
+
+
+
+def test_dizin_klasor_degismedikce_yeniden_kurulmaz(tmp_path, monkeypatch):
+    source = main.CITY_IMAGES_PATH
+    cities = tmp_path / "iller"
+    cities.mkdir()
+    shutil.copy2(source / "Ankara Map Chart.png", cities)
+    monkeypatch.setattr(main, "CITY_IMAGES_PATH", cities)
+
+    index = main._map_index()
+    assert list(index) == ["ankara"]
+    assert main._map_index() is index
+
+    shutil.copy2(source / "Izmir Map Chart.png", cities)
+    assert sorted(main._map_index()) == ["ankara", "izmir"]
+
+
+def test_yanit_onbellegi_sinirli(app_data, map_cache, monkeypatch):
+    monkeypatch.setattr(main, "MAP_PAYLOAD_CACHE_SIZE", 2)
+    for il in ("Ankara", "Izmir", "Bursa"):
+        assert "error" not in main.get_harita(il)
+    assert [key for key, _ in main._MAP_PAYLOADS] == ["izmir", "bursa"]
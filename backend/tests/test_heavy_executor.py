@@ -0,0 +1,30 @@
+import asyncio
+
+import main
+
+
+def test_surec_havuzu_fork_kullanmaz_ve_yenilenir(app_data, tmp_path, monkeypatch):
+    expected = main.get_gsyh("Ankara")
+    monkeypatch.setenv("SNAPSHOT_PATH", str(tmp_path))
+    monkeypatch.setattr(main, "SNAPSHOT_PATH", tmp_path)
+    monkeypatch.setattr(main, "HEAVY_EXECUTOR", "process")
+    monkeypatch.setattr(main, "HEAVY_WORKERS", 1)
+    main.shutdown_heavy_executor()
+    try:
+        main.start_heavy_executor()
+        first = main._HEAVY_EXECUTOR
+        assert first._mp_context.get_start_method() != "fork"
+        assert asyncio.run(main.run_heavy(main.get_gsyh, "Ankara")) == expected
+
+        # Veri yenilemede işçiler yenilenen veriyi yükleyen yeni bir havuzla değiştirilir
+        main._reload_datasets("issizlik")
+        assert main._HEAVY_EXECUTOR is not first
+        assert asyncio.run(main.run_heavy(main.get_gsyh, "Ankara")) == expected
+    finally:
+        main.shutdown_heavy_executor()
+
+
+def test_is_parcacigi_havuzu_yenilemede_korunur(app_data):
+    executor = main._heavy_executor()
+    main.restart_heavy_executor()
+    assert main._heavy_executor() is executor
@@ -0,0 +1,28 @@
+def test_etag_ve_304(client):
+    first = client.get("/gsyh/Ankara")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"].startswith("public")
+
+    again = client.get("/gsyh/Ankara", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+
+    other = client.get("/gsyh/Bursa", headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+
+def test_if_modified_since_yok_sayilir(client):
+    # Last-Modified veri dosyalarının zamanıdır; kod güncellemesi sonrası eski yanıt 304 ile verilmemeli
+    first = client.get("/gsyh/Ankara")
+    again = client.get("/gsyh/Ankara", headers={"If-Modified-Since": first.headers["last-modified"]})
+    assert again.status_code == 200
+
+
+def test_hata_yaniti_saklanmaz(client):
+    response = client.get("/nufus/Ankara", params={"yil": 1990})
+    assert response.status_code == 200
+    assert "error" in response.json()
+    assert response.headers["cache-control"] == "no-store"
+    assert "etag" not in response.headers
+    assert "last-modified" not in response.headers
@@ -0,0 +1,32 @@
+def test_ozet_tum_alanlar(client):
+    body = client.get("/il/Ankara/ozet").json()
+    assert set(body) == {"il", "gsyh", "gsyh_reel", "oneri", "oneriler"}
+    assert body["il"] == "Ankara"
+    for part in ("gsyh", "gsyh_reel", "oneri", "oneriler"):
+        assert body[part] == client.get(f"/{part}/Ankara").json()
+
+
+def test_ozet_alan_secimi(client):
+    body = client.get("/il/Izmir/ozet", params={"include": "oneriler, gsyh"}).json()
+    assert set(body) == {"il", "gsyh", "oneriler"}
+    assert body["gsyh"] == client.get("/gsyh/Izmir").json()
+
+
+def test_ozet_secim_etag_ayri(client):
+    full = client.get("/il/Bursa/ozet")
+    subset = client.get("/il/Bursa/ozet", params={"include": "gsyh"})
+    assert full.headers["etag"] != subset.headers["etag"]
+
+
+def test_ozet_bilinmeyen_alan(client):
+    response = client.get("/il/Ankara/ozet", params={"include": "gsyh,hava_durumu"})
+    assert response.status_code == 200
+    assert response.json() == {
+        "error": "Bilinmeyen alan: hava_durumu. Geçerli alanlar: gsyh, gsyh_reel, oneri, oneriler",
+    }
+
+
+def test_ozet_bilinmeyen_il(client):
+    body = client.get("/il/Atlantis/ozet").json()
+    assert body["il"] == "Atlantis"
+    assert all("error" in body[part] for part in ("gsyh", "gsyh_reel", "oneri", "oneriler"))
@@ -0,0 +1,22 @@
+import numpy as np
+
+
+def test_her_gostergede_en_az_bir_deger_var(app_data):
+    matrix = app_data._derived("karsilastirma")
+    filled = ~np.isnan(matrix.values)
+    empty = [ad for (ad, _, _), ok in zip(matrix.indicators, filled.any(axis=0)) if not ok]
+    assert empty == []
+
+
+def test_karsilastir_issizlik_dolu(app_data):
+    payload = app_data.get_karsilastir("Ankara,Bursa,Yokil")
+    names = [g["ad"] for g in payload["gostergeler"]]
+    col = names.index("issizlik")
+    assert [row["il"] for row in payload["iller"]] == ["Ankara", "Bursa"]
+    assert all(row["degerler"][col] is not None for row in payload["iller"])
+    assert all(len(row["degerler"]) == len(names) for row in payload["iller"])
+    assert payload["bulunamayan"] == ["Yokil"]
+
+
+def test_karsilastir_bos_istek(app_data):
+    assert "error" in app_data.get_karsilastir(" , ")
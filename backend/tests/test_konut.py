@@ -0,0 +1,25 @@
+import pytest
+
+import main
+
+
+def test_konut_yil_toplami_ara_tabloyla_ayni(app_data):
+    result = main.get_konut("Ankara", f"{main.KONUT_YILI}-01", f"{main.KONUT_YILI}-12")
+    assert len(result["aylar"]) == 12
+    assert result["toplam"] == pytest.approx(sum(result["satis"]))
+    assert result["son_12_ay"] == result["toplam"]
+    assert result["toplam"] == main._derived("konut_toplam")["ankara"]
+
+
+def test_konut_varsayilan_tum_seri(app_data):
+    series = main._derived("konut_aylik")
+    result = main.get_konut("Ankara")
+    assert result["aylar"] == series.months
+    assert result["from"] == series.months[0] and result["to"] == series.months[-1]
+
+
+def test_konut_hatalari(app_data):
+    assert main.get_konut("Ankara", "2023-05", "2023-01") == {"error": "from, to'dan sonra olamaz"}
+    assert main.get_konut("Ankara", "2023/01")["error"].startswith("Geçersiz from: 2023/01")
+    assert main.get_konut("Ankara", "1990-01", "1990-12")["error"].startswith("Ay bulunamadı")
+    assert main.get_konut("Atlantis") == {"error": "İl bulunamadı"}
@@ -0,0 +1,80 @@
+import json
+import shutil
+from collections import OrderedDict
+
+import pytest
+
+import main
+import materialize
+
+
+@pytest.fixture
+def bundle(app_data, tmp_path, monkeypatch):
+    """Geçici dizine yazılmış ve sunulan güncel paket."""
+    out = tmp_path / "paket"
+    manifest = main.write_materialized(out)
+    monkeypatch.setattr(main, "MATERIALIZED_PATH", out)
+    monkeypatch.setattr(main, "SERVE_MATERIALIZED", True)
+    monkeypatch.setattr(main, "_MATERIALIZED_MANIFEST", None)
+    main._read_materialized.cache_clear()
+    main._BODIES.clear()
+    yield out / manifest["version"]
+    main._read_materialized.cache_clear()
+    main._BODIES.clear()
+
+
+def _mark(bundle, rel_path):
+    # Paketteki dosyayı işaretler: yanıt bu içerikle gelirse dosyadan verilmiştir
+    (bundle / rel_path).write_bytes(json.dumps({"paket": rel_path}).encode())
+    return {"paket": rel_path}
+
+
+def test_paket_icerigi(bundle):
+    assert (bundle.parent / "CURRENT").read_text(encoding="utf-8") == bundle.name
+    manifest = json.loads((bundle / "manifest.json").read_text(encoding="utf-8"))
+    assert manifest["provinces"] == 81
+    assert manifest["code"] == main._CODE_VERSION
+    gsyh = json.loads((bundle / main.materialized_file("gsyh", "ankara")).read_text(encoding="utf-8"))
+    assert gsyh == json.loads(main.render_json(main.get_gsyh("Ankara")))
+    for rel_path in ("oneriler_tumu.json", "saglik_test.json", main.materialized_file("ozet", "Ankara")):
+        assert (bundle / rel_path).exists()
+
+
+def test_guncel_paketten_verilir(client, bundle):
+    marker = _mark(bundle, main.materialized_file("gsyh", "ankara"))
+    assert client.get("/gsyh/Ankara").json() == marker
+    marker = _mark(bundle, "oneriler_tumu.json")
+    assert client.get("/oneriler_tumu").json() == marker
+    # Parametreli istekler paketten verilmez
+    assert client.get("/oneriler_tumu", params={"w_share": 0.3}).json() != marker
+
+
+def test_veri_degisince_paket_atlanir(client, data_copy, bundle):
+    gsyh_marker = _mark(bundle, main.materialized_file("gsyh", "ankara"))
+    oneri_marker = _mark(bundle, main.materialized_file("oneri", "ankara"))
+    cari = data_copy / main.DATASET_SOURCES["cari"].file_name
+    stat = cari.stat()
+    cari.touch()
+    assert cari.stat().st_mtime_ns != stat.st_mtime_ns
+
+    live = client.get("/gsyh/Ankara").json()
+    assert live != gsyh_marker
+    assert live == json.loads(main.render_json(main.get_gsyh("Ankara")))
+    # Yalnızca değişen dosyaya bağlı yanıtlar atlanır
+    assert client.get("/oneri/Ankara").json() == oneri_marker
+
+
+def test_materialize_komutu(app_data, tmp_path, monkeypatch):
+    cities = tmp_path / "iller"
+    cities.mkdir()
+    for name in ("Ankara Map Chart.png", "Izmir Map Chart.png"):
+        shutil.copy2(main.CITY_IMAGES_PATH / name, cities / name)
+    monkeypatch.setattr(main, "CITY_IMAGES_PATH", cities)
+    monkeypatch.setattr(main, "MAP_CACHE_PATH", tmp_path / "harita")
+    monkeypatch.setattr(main, "_MAP_PAYLOADS", OrderedDict())
+
+    out = tmp_path / "paket"
+    assert materialize.main(["--out", str(out)]) == 0
+    version = (out / "CURRENT").read_text(encoding="utf-8")
+    assert (out / version / "manifest.json").exists()
+    assert len(list((tmp_path / "harita").iterdir())) == 2 * (1 + len(main.MAP_SIZES) * len(main.MAP_FORMATS))
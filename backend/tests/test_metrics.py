@@ -0,0 +1,45 @@
+import re
+
+
+def _request_count(client, route):
+    text = client.get("/metrics").text
+    m = re.search(rf'^anka_request_seconds_count{{route="{re.escape(route)}"}} (\d+)$', text, re.MULTILINE)
+    return int(m.group(1)) if m else 0
+
+
+def test_server_timing_asamalari(client):
+    # Önbellekte olmayan bir parametre kümesi: hesaplama aşamaları başlıkta görünür
+    response = client.get("/oneriler/Ankara", params={"years": "2018-2022", "w_share": 0.37})
+    assert response.status_code == 200
+    parts = dict(p.strip().split(";dur=") for p in response.headers["server-timing"].split(","))
+    assert {"skor", "tarim", "konut", "saglik_personeli", "anlati", "total"} <= set(parts)
+    assert all(float(v) >= 0 for v in parts.values())
+
+
+def test_metrics_sayaclari_artar(client):
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE anka_request_seconds histogram" in response.text
+    assert "# TYPE anka_stage_seconds histogram" in response.text
+
+    before = _request_count(client, "/gsyh/{il_adi}")
+    client.get("/gsyh/Ankara")
+    client.get("/gsyh/Izmir")
+    assert _request_count(client, "/gsyh/{il_adi}") == before + 2
+
+
+def test_profile_cprofile_ozeti_doner(client):
+    response = client.get("/gsyh/Bursa", params={"profile": "1"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert response.headers["cache-control"] == "no-store"
+    assert response.text.startswith("Toplam:")
+    assert "function calls" in response.text
+    assert "get_gsyh" in response.text
+
+
+def test_profile_yonetici_anahtari_ister(client, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "gizli")
+    assert client.get("/gsyh/Bursa", params={"profile": "1"}).status_code == 403
+    response = client.get("/gsyh/Bursa", params={"profile": "1"}, headers={"X-Admin-Token": "gizli"})
+    assert response.text.startswith("Toplam:")
@@ -0,0 +1,40 @@
+import json
+
+
+def _stream_lines(client, url, **params):
+    with client.stream("GET", url, params={"stream": 1, **params}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert response.headers["cache-control"] == "no-store"
+        return [json.loads(line) for line in response.iter_lines() if line]
+
+
+def test_oneriler_tumu_akisi(client, app_data):
+    rows = _stream_lines(client, "/oneriler_tumu")
+    *items, last = rows
+    assert last == {"count": len(items)}
+    assert len(items) == len(app_data.province_names())
+    # Sıra tamamlanma sırasıdır; içerik akışsız yanıtla aynıdır
+    full = client.get("/oneriler_tumu").json()["items"]
+    assert sorted(items, key=lambda r: r["il"]) == sorted(full, key=lambda r: r["il"])
+
+
+def test_saglik_test_akisi(client):
+    *items, last = _stream_lines(client, "/saglik_test", il_adi="Ankara")
+    assert [r["il"] for r in items] == ["Ankara"]
+    assert last == {"summary": client.get("/saglik_test", params={"il_adi": "Ankara"}).json()["summary"]}
+
+
+def test_akis_hata_satiri_akisi_kesmez(client, app_data, monkeypatch):
+    build = app_data._build_city_recommendation
+
+    def failing(city, params):
+        if city == "Ankara":
+            raise RuntimeError("deneme")
+        return build(city, params)
+
+    monkeypatch.setattr(app_data, "_build_city_recommendation", failing)
+    *items, last = _stream_lines(client, "/oneriler_tumu")
+    errors = [r for r in items if "error" in r]
+    assert errors == [{"il": "Ankara", "error": "Bir hata oluştu: deneme"}]
+    assert last == {"count": len(items)}
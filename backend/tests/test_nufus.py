@@ -0,0 +1,25 @@
+import pytest
+
+import main
+
+
+def test_nufus_piramidi_toplami_tutar(app_data):
+    result = main.get_nufus("Ankara")
+    assert result["yil"] == main._derived("nufus_kupu").years[0]
+    assert result["erkek"] + result["kadin"] == result["toplam"]
+    assert sum(g["toplam"] for g in result["piramit"]) == result["toplam"]
+    assert sum(g["erkek"] for g in result["piramit"]) == result["erkek"]
+    assert result["bagimlilik"]["toplam"] == pytest.approx(
+        result["bagimlilik"]["genc"] + result["bagimlilik"]["yasli"], abs=0.02,
+    )
+
+
+def test_nufus_hatalari(app_data):
+    assert main.get_nufus("Atlantis") == {"error": "İl bulunamadı"}
+    assert main.get_nufus("Ankara", 1990)["error"].startswith("Yıl bulunamadı. Geçerli yıllar:")
+
+
+def test_nufus_kupu_81_il(app_data):
+    cube = main._derived("nufus_kupu")
+    assert len(cube.provinces) == 81
+    assert cube.age_groups[0] == "toplam" and cube.sexes[0] == "toplam"
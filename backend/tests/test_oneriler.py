@@ -0,0 +1,23 @@
+import main
+
+
+def _titles(payload):
+    return {o["title"] for o in payload["opportunities"]}
+
+
+def test_tarim_firsati_siralamadan_okunur(app_data):
+    siralama = main._derived("siralama")
+    alan = siralama["tarim_alani"].percentiles
+    pay = siralama["pay_tarim_ormancilik_ve_balikcilik"].percentiles
+    fired = 0
+    for il in main.province_names():
+        key = main._normalize_text(il)
+        payload = main.get_oneriler(il)
+        expected = key in alan and key in pay and alan[key] >= 0.7 and pay[key] <= 0.4
+        assert ("Tarım işleme & lojistik" in _titles(payload)) == expected, il
+        fired += expected
+    assert fired > 0
+
+
+def test_ankara_tarim_firsati(app_data):
+    assert "Tarım işleme & lojistik" in _titles(main.get_oneriler("Ankara"))
@@ -0,0 +1,48 @@
+"""parse_numbers / extract_years, hücre hücre _to_number / _extract_year ile aynı sonucu vermeli."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import main
+
+EDGE_CASES = [
+    "1.234,56", "1,5", "1.5", "12.345.678", "1.234.567,89", "%12,5", "12,5 %", " 1 234",
+    " 42 ", "", "   ", "-", "..", "abc", "2023(r)", "(1)", "1e3", "-0,5", "+7", "inf", "nan",
+    "1_000", "0x10", None, np.nan, 0, 7, -3.25, 1e400, np.int64(5), np.float32(2.5), True,
+    pd.Timestamp("2023-05-01"), "2023", "Yıl 2019-2023", "1899", "2101", 1899.6, 2023.4, 2100.5,
+]
+
+
+def _scalar(values: list, fn) -> np.ndarray:
+    return np.array([np.nan if (r := fn(v)) is None else float(r) for v in values], dtype=float)
+
+
+def _assert_same(vector: np.ndarray, scalar: np.ndarray) -> None:
+    np.testing.assert_array_equal(vector, scalar)   # NaN'ler eşit sayılır
+
+
+@pytest.mark.parametrize("dtype", [object, None])
+def test_kenar_durumlar(dtype):
+    cells = EDGE_CASES if dtype is object else [c for c in EDGE_CASES if isinstance(c, (int, float))]
+    series = pd.Series(cells, dtype=dtype)
+    _assert_same(main.parse_numbers(series), _scalar(list(series), main._to_number))
+    _assert_same(main.extract_years(series), _scalar(list(series), main._extract_year))
+
+
+def test_sayisal_sutun():
+    series = pd.Series([1.0, np.nan, 2023.0, -4.5])
+    _assert_same(main.parse_numbers(series), _scalar(list(series), main._to_number))
+    _assert_same(main.extract_years(series), _scalar(list(series), main._extract_year))
+
+
+def test_gercek_calisma_kitaplari(app_data):
+    checked = 0
+    for name in main.DATASET_SOURCES:
+        df = main._get_dataset(name).df
+        for i in range(df.shape[1]):
+            column = df.iloc[:, i]
+            cells = list(column)
+            _assert_same(main.parse_numbers(column), _scalar(cells, main._to_number))
+            _assert_same(main.extract_years(column), _scalar(cells, main._extract_year))
+            checked += 1
+    assert checked > 100
@@ -0,0 +1,17 @@
+import numpy as np
+
+import main
+
+
+def test_reel_buyume_grup_ortalamasi_satir_taramasiyla_ayni(app_data):
+    table = main._derived("reel_growth")
+    years = [2019, 2020, 2021]
+    means = table.grouped_mean(years)
+    assert means.shape == (len(table.provinces), len(table.sectors))
+
+    p = table.provinces.index(main._normalize_text("Ankara"))
+    rows = table.slice("Ankara")
+    for s in range(len(table.sectors)):
+        mask = (table.sector[rows] == s) & np.isin(table.year[rows], years) & ~np.isnan(table.rate[rows])
+        expected = table.rate[rows][mask].mean() if mask.any() else np.nan
+        np.testing.assert_allclose(means[p, s], expected, equal_nan=True)
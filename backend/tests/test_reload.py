@@ -0,0 +1,49 @@
+import main
+
+
+def test_degisen_dosya_yeniden_yuklenir(data_copy):
+    before = main._get_dataset("issizlik")
+    tables = {name: main._derived(name) for name in ("issizlik_oran", "siralama", "nominal_table")}
+    cari = main._get_dataset("cari")
+
+    path = data_copy / main.DATASET_SOURCES["issizlik"].file_name
+    path.touch()
+
+    after = main._get_dataset("issizlik")
+    assert after is not before
+    assert after.version == main._file_version(path)
+    assert main._get_dataset("cari") is cari
+    assert main._derived("issizlik_oran") is not tables["issizlik_oran"]
+    assert main._derived("siralama") is not tables["siralama"]
+    assert main._derived("nominal_table") is tables["nominal_table"]
+
+
+def test_yonetici_yenileme(client):
+    before = main._get_dataset("issizlik")
+    siralama = main._derived("siralama")
+    nominal = main._derived("nominal_table")
+
+    response = client.post("/admin/veri/yenile", params={"ad": "issizlik"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["reloaded"] == ["issizlik"]
+    assert body["errors"] == {} and body["table_errors"] == {}
+    assert {"issizlik_oran", "siralama", "karsilastirma"} <= set(body["rebuilt"])
+
+    assert main._get_dataset("issizlik") is not before
+    assert main._derived("siralama") is not siralama
+    assert main._derived("nominal_table") is nominal
+
+    status = client.get("/admin/veri").json()
+    entry = next(d for d in status["datasets"] if d["ad"] == "issizlik")
+    assert entry["yuklu"] and entry["guncel"]
+    assert all(t["guncel"] for t in status["derived_tables"] if t["ad"] in body["rebuilt"])
+
+
+def test_yonetici_uc_noktalari_korunur(client, monkeypatch):
+    assert client.post("/admin/veri/yenile", params={"ad": "yok"}).status_code == 404
+    monkeypatch.setenv("ADMIN_TOKEN", "gizli")
+    assert client.post("/admin/veri/yenile", params={"ad": "issizlik"}).status_code == 403
+    assert client.get("/admin/veri").status_code == 403
+    response = client.post("/admin/veri/yenile", params={"ad": "issizlik"}, headers={"X-Admin-Token": "gizli"})
+    assert response.json()["reloaded"] == ["issizlik"]
@@ -0,0 +1,29 @@
+import numpy as np
+
+import main
+
+
+def test_saglik_suzme(app_data):
+    result = main.get_saglik("Ankara", rol="toplam_hekim,hemsire", yil="2019-2023")
+    assert result["years"] == [2019, 2020, 2021, 2022, 2023]
+    assert [r["rol"] for r in result["roller"]] == ["toplam_hekim", "hemsire"]
+    assert all(len(r["degerler"]) == 5 for r in result["roller"])
+
+    cube = main._derived("saglik_kupu")
+    everything = main.get_saglik("Ankara")
+    assert everything["years"] == cube.years
+    assert len(everything["roller"]) == len(cube.roles)
+
+
+def test_saglik_hatalari(app_data):
+    assert main.get_saglik("Ankara", rol="astronot")["error"].startswith("Bilinmeyen meslek: astronot")
+    assert main.get_saglik("Ankara", kurum="vakif")["error"].startswith("Bilinmeyen kurum: vakif")
+    assert main.get_saglik("Atlantis") == {"error": "İl bulunamadı"}
+
+
+def test_saglik_kurumlari_toplami_asmaz(app_data):
+    cube = main._derived("saglik_kupu")
+    total = cube.values[:, :, 0, :]
+    parts = np.nansum(cube.values[:, :, 1:, :], axis=2)
+    known = ~np.isnan(total)
+    assert (parts[known] <= total[known] + 1e-9).all()
@@ -0,0 +1,44 @@
+import asyncio
+import threading
+import time
+
+import main
+
+_calls = 0
+_calls_lock = threading.Lock()
+
+
+def _slow_sum(a, b):
+    global _calls
+    with _calls_lock:
+        _calls += 1
+    time.sleep(0.2)
+    return {"toplam": a + b}
+
+
+def test_eszamanli_istekler_tek_hesap_bekler():
+    global _calls
+    _calls = 0
+
+    async def scenario():
+        return await asyncio.gather(*(main.run_single_flight(("test", "ayni"), _slow_sum, 1, 2) for _ in range(8)))
+
+    results = asyncio.run(scenario())
+    assert _calls == 1
+    assert all(r is results[0] for r in results)
+    assert results[0] == {"toplam": 3}
+    assert ("test", "ayni") not in main._IN_FLIGHT
+
+
+def test_farkli_anahtarlar_ayri_hesaplanir():
+    global _calls
+    _calls = 0
+
+    async def scenario():
+        return await asyncio.gather(
+            main.run_single_flight(("test", "a"), _slow_sum, 1, 1),
+            main.run_single_flight(("test", "b"), _slow_sum, 2, 2),
+        )
+
+    assert asyncio.run(scenario()) == [{"toplam": 2}, {"toplam": 4}]
+    assert _calls == 2
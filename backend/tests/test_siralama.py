@@ -0,0 +1,17 @@
+def test_issizlik_siralamasi_tum_illeri_kapsar(app_data):
+    ranking = app_data._derived("siralama")["issizlik"]
+    assert len(ranking.values) == 81
+    assert "turkiye" not in ranking.values
+    assert all(0 < v < 100 for v in ranking.values.values())
+
+
+def test_siralama_issizlik_uc_noktasi(app_data):
+    payload = app_data.get_siralama("issizlik")
+    assert payload["count"] == 81
+    assert [item["sira"] for item in payload["items"]] == list(range(1, 82))
+
+
+def test_issizlik_yuzdeligi_oneriler_icin_dolu(app_data):
+    percentiles = app_data._derived("siralama")["issizlik"].percentiles
+    assert min(percentiles.values()) == 0.0
+    assert max(percentiles.values()) == 1.0
@@ -0,0 +1,43 @@
+import json
+
+import pandas as pd
+import pytest
+
+import main
+
+
+@pytest.mark.parametrize("name", list(main.DATASET_SOURCES))
+def test_arrow_kodlama_tabloyu_korur(app_data, name):
+    df = main._dataset(name)
+    pd.testing.assert_frame_equal(main._decode_frame(main._encode_frame(df)), df)
+
+
+def test_goruntu_yaz_oku(app_data, tmp_path, monkeypatch):
+    names = ["issizlik", "konut", "nufus"]
+    manifest = main.write_snapshot(names, tmp_path)
+    assert set(manifest["datasets"]) == set(names)
+    monkeypatch.setattr(main, "SNAPSHOT_PATH", tmp_path)
+    for name in names:
+        file_path = main.DATA_PATH / main.DATASET_SOURCES[name].file_name
+        df = main._load_from_snapshot(name, file_path)
+        assert df is not None
+        pd.testing.assert_frame_equal(df, main.DATASET_SOURCES[name].loader(file_path))
+        assert main._load_dataset(name).origin == "snapshot"
+
+
+def test_bayat_goruntu_kullanilmaz(app_data, tmp_path, monkeypatch):
+    main.write_snapshot(["issizlik"], tmp_path)
+    manifest_path = tmp_path / "manifest.json"
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    manifest["datasets"]["issizlik"]["sha256"] = "0" * 64
+    manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+    monkeypatch.setattr(main, "SNAPSHOT_PATH", tmp_path)
+    file_path = main.DATA_PATH / main.DATASET_SOURCES["issizlik"].file_name
+    assert main._load_from_snapshot("issizlik", file_path) is None
+    assert main._load_dataset("issizlik").origin == "excel"
+
+
+def test_eski_bicim_reddedilir(tmp_path):
+    manifest = {"format": main.SNAPSHOT_FORMAT - 1, "datasets": {}}
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest), encoding="utf-8")
+    assert main._read_manifest(tmp_path) is None
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+
+import pytest
+
+import main
+
+
+def test_gecerli_aralik():
+    assert main.parse_year_range("2019-2021") == (2019, 2020, 2021)
+    assert main.parse_year_range("2023") == (2023,)
+
+
+def test_ters_aralik():
+    with pytest.raises(ValueError, match="büyük olamaz"):
+        main.parse_year_range("2023-2019")
+
+
+def test_veri_disi_aralik_gecerli_yillari_soyler():
+    with pytest.raises(ValueError, match="Geçerli yıllar: 2004-2023"):
+        main.parse_year_range("1800-1900", "yil", range(2004, 2024))
+    with pytest.raises(ValueError, match="Geçerli yıllar"):
+        main.parse_year_range("1800-1900")
+
+
+def test_bicim_hatasi():
+    with pytest.raises(ValueError, match="örnek: yil=2019-2023"):
+        main.parse_year_range("abc", "yil")
+
+
+def test_uc_noktalar_sinirlari_bildirir(app_data):
+    assert "Geçerli yıllar: 2002-2023" in main.get_saglik("Ankara", yil="1800-1900")["error"]
+    with pytest.raises(ValueError, match="Geçerli yıllar: 2004-2023"):
+        main.score_params("1990-1995", None)
+    assert main.score_params("2019-2023", 0.3).years == (2019, 2020, 2021, 2022, 2023)
+
+
+def test_yil_penceresi_olay_dongusu_disinda_dogrulanir(app_data, monkeypatch):
+    threads = []
+    derived = main._derived
+
+    def recording_derived(name):
+        threads.append(threading.get_ident())
+        return derived(name)
+
+    async def scenario():
+        params = await main.score_params_async("2019-2023", None)
+        return params, threading.get_ident()
+
+    monkeypatch.setattr(main, "_derived", recording_derived)
+    params, loop_thread = asyncio.run(scenario())
+    assert params.years == (2019, 2020, 2021, 2022, 2023)
+    assert threads and loop_thread not in threads
+    with pytest.raises(ValueError, match="Geçerli yıllar: 2004-2023"):
+        asyncio.run(main.score_params_async("1990-1995", None))
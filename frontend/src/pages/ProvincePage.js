@@ -105,31 +105,32 @@ const ProvincePage = () => {
     return cities.find((c) => normalized(c.name) === normalized(provinceName));
   }, [provinceName]);
 
-  const imageCandidates = useMemo(() => {
-    const trMap = { 'ı': 'i', 'İ': 'I', 'ğ': 'g', 'Ğ': 'G', 'ü': 'u', 'Ü': 'U', 'ş': 's', 'Ş': 'S', 'ö': 'o', 'Ö': 'O', 'ç': 'c', 'Ç': 'C' };
-    const ascii = (provinceName || "").split("").map(ch => trMap[ch] ?? ch).join("")
-      .normalize('NFD').replace(/\p{Diacritic}/gu, '');
-    const orig = provinceName || "";
-    const bases = [ascii, orig].filter(Boolean);
-    const suffixes = [
-      " Map Chart.png",
-      " Map chart.png",
-      " map chart.png",
-      " MapChart.png",
-      " mapchart.png",
-    ];
-    const urls = [];
-    for (const b of bases) {
-      for (const s of suffixes) {
-        const fileName = `${b}${s}`;
-        urls.push(`http://127.0.0.1:8000/cities/${encodeURIComponent(fileName)}`);
-      }
-    }
-    return urls;
+  // Harita görseli: il adı sunucuda dosyaya eşlenir, küçültülmüş WebP/PNG URL'leri döner
+  const [mapImage, setMapImage] = useState(null);
+  useEffect(() => {
+    let cancelled = false;
+    setMapImage(null);
+    setMapImgError(false);
+    axios.get(`http://127.0.0.1:8000/harita/${encodeURIComponent(provinceName)}`)
+      .then((res) => {
+        if (!cancelled && res.data && !res.data.error) setMapImage(res.data);
+      })
+      .catch(() => {});
+    return () => { cancelled = true; };
   }, [provinceName]);
 
-  const [imgIdx, setImgIdx] = useState(0);
-  useEffect(() => { setImgIdx(0); setMapImgError(false); }, [provinceName, imageCandidates.length]);
+  const mapSources = useMemo(() => {
+    if (!mapImage) return null;
+    const base = 'http://127.0.0.1:8000';
+    const sizes = Object.values(mapImage.boyutlar || {});
+    if (sizes.length === 0) {
+      // Sunucuda Pillow yoksa yalnızca özgün görsel gelir
+      return { webp: null, png: null, src: `${base}${mapImage.orijinal.url}` };
+    }
+    const srcSet = (fmt) => sizes.map((b) => `${base}${b[fmt].url} ${b.genislik}w`).join(', ');
+    const largest = sizes.reduce((a, b) => (b.genislik > a.genislik ? b : a));
+    return { webp: srcSet('webp'), png: srcSet('png'), src: `${base}${largest.png.url}` };
+  }, [mapImage]);
 
   const handleSectorClick = (sectorName) => {
     const details = sectorDetaylari[sectorName.trim()];
@@ -143,17 +144,16 @@ const ProvincePage = () => {
       setLoading(true);
       setError(null);
       try {
-        const gsyhUrl = `http://127.0.0.1:8000/gsyh/${provinceName}`;
-        const reelUrl = `http://127.0.0.1:8000/gsyh_reel/${provinceName}`;
-        const oneriUrl = `http://127.0.0.1:8000/oneri/${provinceName}`;
-        const onerilerUrl = `http://127.0.0.1:8000/oneriler/${provinceName}`;
-        
-        const [gsyhRes, reelRes, oneriRes, onerilerRes] = await Promise.all([
-          axios.get(gsyhUrl),
-          axios.get(reelUrl),
-          axios.get(oneriUrl),
-          axios.get(onerilerUrl),
-        ]);
+        // /gsyh, /gsyh_reel, /oneri ve /oneriler yanıtları tek istekte gelir
+        const ozetUrl = `http://127.0.0.1:8000/il/${provinceName}/ozet`;
+        const ozetRes = await axios.get(ozetUrl);
+        const ozet = ozetRes.data || {};
+        const [gsyhRes, reelRes, oneriRes, onerilerRes] = [
+          ozet.gsyh,
+          ozet.gsyh_reel,
+          ozet.oneri,
+          ozet.oneriler,
+        ].map((data) => ({ data: data || {} }));
 
         if (gsyhRes.data && !gsyhRes.data.error) {
             setGsyhData(gsyhRes.data);
@@ -277,19 +277,17 @@ const ProvincePage = () => {
         <Link to="/" style={{ color: 'white' }}>&larr; Haritaya Dön</Link>
       </div>
       {/* Üst: İl harita görseli ve adı */}
-      {imageCandidates && imageCandidates.length > 0 && (
-        <img
-          src={imageCandidates[Math.min(imgIdx, imageCandidates.length - 1)]}
-          alt={`${provinceName} harita`}
-          style={{ width: 420, maxWidth: '80vw', marginBottom: 8 }}
-          onError={() => {
-            if (imgIdx < imageCandidates.length - 1) {
-              setImgIdx(imgIdx + 1);
-            } else {
-              setMapImgError(true);
-            }
-          }}
-        />
+      {mapSources && !mapImgError && (
+        <picture>
+          {mapSources.webp && <source type="image/webp" srcSet={mapSources.webp} sizes="420px" />}
+          {mapSources.png && <source type="image/png" srcSet={mapSources.png} sizes="420px" />}
+          <img
+            src={mapSources.src}
+            alt={`${provinceName} harita`}
+            style={{ width: 420, maxWidth: '80vw', marginBottom: 8 }}
+            onError={() => setMapImgError(true)}
+          />
+        </picture>
       )}
       <h2 style={{ letterSpacing: 2, marginTop: 0 }}>{provinceName.toUpperCase()}</h2>
 